@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Claim index benchmark: recall of contradiction prefiltering, and latency.
+
+Indexes every claim in benchmarks/fixtures/claim_pairs.json at once, ranks
+all pairs, and reports what fraction of the labeled contradictions land in
+the top k (every other pair counts as non-contradicting), next to the number
+of detect_contradiction calls an exhaustive sweep would need. Latency is
+measured on synthetic claim sets built from the fixture vocabulary.
+
+    python benchmarks/bench_claim_index.py --k 10 20 40 --sizes 50 200 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.claim_index import ClaimIndex
+
+FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "claim_pairs.json")
+
+
+def load_fixture(path: str):
+    with open(path) as f:
+        pairs = json.load(f)
+    claims = []
+    for pair in pairs:
+        for text in (pair["a"], pair["b"]):
+            if text not in claims:
+                claims.append(text)
+    positives = {
+        tuple(sorted((claims.index(pair["a"]), claims.index(pair["b"]))))
+        for pair in pairs if pair["contradicts"]
+    }
+    return claims, positives
+
+
+def bench_recall(claims, positives, ks):
+    index = ClaimIndex()
+    index.add(claims)
+    total_pairs = len(claims) * (len(claims) - 1) // 2
+    rows = []
+    for k in ks:
+        found = {(i, j) for i, j, _ in index.candidate_pairs(top_k=k)}
+        rows.append({
+            "k": k,
+            "recall": len(found & positives) / len(positives),
+            "precision": len(found & positives) / max(len(found), 1),
+            "calls_saved": 1 - k / total_pairs,
+        })
+    return total_pairs, rows
+
+
+def synthetic_claims(claims, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = sorted({word for claim in claims for word in claim.rstrip(".").split()})
+    return [
+        f"{rng.choice(claims).rstrip('.')} {' '.join(rng.sample(words, 3))}."
+        for _ in range(n)
+    ]
+
+
+def bench_latency(claims, sizes, k: int, repeats: int):
+    rows = []
+    for n in sizes:
+        sample = synthetic_claims(claims, n)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            index = ClaimIndex()
+            index.add(sample)
+            index.candidate_pairs(top_k=k)
+            timings.append(time.perf_counter() - start)
+        rows.append({"claims": n, "pairs": n * (n - 1) // 2, "median_ms": statistics.median(timings) * 1000})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Claim index recall and latency benchmark.")
+    parser.add_argument("--fixture", default=FIXTURE)
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 20, 40, 80])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    claims, positives = load_fixture(args.fixture)
+    total_pairs, recall_rows = bench_recall(claims, positives, args.k)
+
+    print(f"\n{len(claims)} claims, {total_pairs} pairs, {len(positives)} labeled contradictions\n")
+    print(f"{'top k':>8} {'recall':>8} {'precision':>10} {'calls saved':>12}")
+    for row in recall_rows:
+        print(f"{row['k']:>8} {row['recall']:>8.0%} {row['precision']:>10.0%} {row['calls_saved']:>12.1%}")
+
+    print(f"\n{'claims':>8} {'pairs':>10} {'index + rank':>14}")
+    for row in bench_latency(claims, args.sizes, max(args.k), args.repeats):
+        print(f"{row['claims']:>8} {row['pairs']:>10} {row['median_ms']:>11.1f} ms")
+    print()
+
+
+if __name__ == "__main__":
+    main()
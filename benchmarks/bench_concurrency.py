@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Sessions-per-worker benchmark: Flask (threaded) vs ASGI (asyncio).
+
+Drives N concurrent dialogue sessions through web/app_enhanced.py and
+web/app_asgi.py against a fake Anthropic client with fixed latency, and
+reports how many sessions one worker actually keeps in flight.
+
+    python benchmarks/bench_concurrency.py --sessions 200 --threads 8 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "web"))
+
+from benchmarks import fake_anthropic
+
+
+def run_session(client, turns: int):
+    client.post('/api/start', json={'topic': 'justice'})
+    for i in range(turns):
+        client.post('/api/respond', json={'message': f"Justice is fairness ({i})"})
+
+
+def bench_flask(sessions: int, turns: int, threads: int) -> dict:
+    """One gthread-style worker: a fixed pool of threads serving all sessions."""
+    import app_enhanced
+
+    stats = fake_anthropic.FakeAnthropic.in_flight
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: run_session(app_enhanced.app.test_client(), turns), range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    return {"elapsed": elapsed, "calls": stats.total, "peak_in_flight": stats.peak}
+
+
+async def run_session_async(client, turns: int):
+    await client.post('/api/start', json={'topic': 'justice'})
+    for i in range(turns):
+        await client.post('/api/respond', json={'message': f"Justice is fairness ({i})"})
+
+
+def bench_asgi(sessions: int, turns: int) -> dict:
+    """One asyncio worker: every session is a coroutine on a single event loop."""
+    import app_asgi
+
+    stats = fake_anthropic.FakeAsyncAnthropic.in_flight
+
+    async def main():
+        await asyncio.gather(*(
+            run_session_async(app_asgi.app.test_client(), turns) for _ in range(sessions)
+        ))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+
+    return {"elapsed": elapsed, "calls": stats.total, "peak_in_flight": stats.peak}
+
+
+def report(label: str, result: dict):
+    print(f"{label:<22} {result['elapsed']:8.2f}s  "
+          f"{result['calls'] / result['elapsed']:8.1f} calls/s  "
+          f"peak concurrent sessions: {result['peak_in_flight']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=8, help="threads in the Flask worker")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake API latency in seconds")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ANTHROPIC_API_KEY", "fake")
+    fake_anthropic.install(latency=args.latency)
+
+    print(f"{args.sessions} sessions x {args.turns + 1} calls, {args.latency}s per call\n")
+    report(f"Flask ({args.threads} threads)", bench_flask(args.sessions, args.turns, args.threads))
+    report("ASGI (1 event loop)", bench_asgi(args.sessions, args.turns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Dialogue store benchmark: concurrent writers on one SQLite file.
+
+Starts --processes worker processes (standing in for gunicorn workers), each
+with --threads threads, and has every thread append --turns turns to its
+own sessions through SessionJournal, the way the web apps commit exchanges.
+Reports turns written per second, append latency percentiles and writes
+that failed because the database stayed locked past the busy timeout.
+
+    python benchmarks/bench_dialogue_store.py --processes 4 --threads 8 --turns 200
+    python benchmarks/bench_dialogue_store.py --sync FULL
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.dialogue_store import DialogueStore, SessionJournal
+
+TURN = "Justice is giving each their due, but who decides what is due? " * 4
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def write_session(store: DialogueStore, session_id: str, turns: int):
+    """One session's turns, one exchange (two rows) per commit; returns (latencies, busy errors)."""
+    journal = SessionJournal(store, session_id)
+    journal.start("What is justice?", "socratic", False)
+    history, latencies, busy = [], [], 0
+    for i in range(0, turns, 2):
+        history.append({"role": "user", "content": f"{TURN}({i})"})
+        history.append({"role": "assistant", "content": f"{TURN}({i + 1})"})
+        start = time.perf_counter()
+        try:
+            journal.sync(history)
+        except sqlite3.OperationalError:
+            busy += 1
+            del history[-2:]
+            continue
+        latencies.append(time.perf_counter() - start)
+    return latencies, busy
+
+
+def run_worker(args):
+    path, worker, threads, turns, synchronous = args
+    store = DialogueStore(path, synchronous=synchronous)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda t: write_session(store, f"w{worker}-t{t}", turns), range(threads)))
+    latencies = [latency for result in results for latency in result[0]]
+    return latencies, sum(result[1] for result in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent append throughput of the dialogue store.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="writer threads per process")
+    parser.add_argument("--turns", type=int, default=200, help="turns per session (one session per thread)")
+    parser.add_argument("--sync", default="NORMAL", choices=["OFF", "NORMAL", "FULL"],
+                        help="SQLite synchronous setting")
+    parser.add_argument("--path", help="database file (default: a temporary file)")
+    args = parser.parse_args()
+
+    directory = None
+    if args.path:
+        path = args.path
+    else:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, "dialogues.sqlite")
+    DialogueStore(path)  # create the schema before the workers race for it
+
+    jobs = [(path, worker, args.threads, args.turns, args.sync) for worker in range(args.processes)]
+    start = time.perf_counter()
+    with Pool(args.processes) as pool:
+        results = pool.map(run_worker, jobs)
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for result in results for latency in result[0]]
+    busy = sum(result[1] for result in results)
+    stats = DialogueStore(path).stats()
+    print(f"{args.processes} processes x {args.threads} threads, {args.turns} turns per session, "
+          f"synchronous={args.sync}")
+    print(f"turns written: {stats['turns']} in {elapsed:.2f}s ({stats['turns'] / elapsed:,.0f} turns/s)")
+    if latencies:
+        print(f"append (one exchange): p50 {percentile(latencies, 50) * 1000:.2f} ms, "
+              f"p99 {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"busy errors: {busy}")
+    print(f"file: {stats['bytes'] / 1024:,.0f} KiB for {stats['sessions']} sessions")
+    if directory:
+        directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Start-up benchmark: import time of each entry point, measured in fresh
+interpreters with `python -X importtime`, and the web app's first request.
+
+For every target it reports the median import time over --runs runs, the
+modules that cost the most, and whether any module that should only load
+on first use (the anthropic SDK, httpx, numpy) was imported at start-up.
+The first request is timed against the fake backend, so it shows what the
+deferred imports and client construction cost when they do happen.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --check --max-import-ms 400
+
+With --check the exit status is 1 if a deferred module is imported at
+start-up or an import takes longer than --max-import-ms, so it can guard
+against regressions in CI.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "cli": "cli.main",
+    "web": "app_enhanced",
+    "asgi": "app_asgi",
+    "classic": "app",
+    "core": "core.socrates",
+}
+
+# Loaded on first use only; importing one at start-up is a regression
+DEFERRED = ("anthropic", "httpx", "numpy")
+
+PRELUDE = f"import sys; sys.path[:0] = [{ROOT!r}, {os.path.join(ROOT, 'web')!r}]; "
+
+FIRST_REQUEST = PRELUDE + """
+import time
+start = time.perf_counter()
+import app_enhanced
+imported = time.perf_counter()
+from benchmarks import fake_anthropic
+fake_anthropic.install(latency=0)
+client = app_enhanced.app.test_client()
+client.post('/api/start', json={'topic': 'justice'})
+client.post('/api/respond', json={'message': 'Justice is fairness'})
+done = time.perf_counter()
+print(f"{(imported - start) * 1000:.1f} {(done - imported) * 1000:.1f}")
+"""
+
+
+def import_times(module: str) -> dict:
+    """{module: (self_us, cumulative_us)} from one fresh interpreter."""
+    env = {**os.environ, "OPENING_POOL_SIZE": "0"}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PRELUDE + f"import {module}"],
+                            capture_output=True, text=True, env=env, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def bench_target(module: str, runs: int, top: int) -> dict:
+    totals, self_times = [], defaultdict(list)
+    for _ in range(runs):
+        times = import_times(module)
+        totals.append(times[module][1] / 1000)
+        for name, (own, _) in times.items():
+            self_times[name].append(own / 1000)
+    heaviest = sorted(((statistics.median(v), k) for k, v in self_times.items()), reverse=True)[:top]
+    loaded = set(self_times)
+    return {
+        "import_ms": statistics.median(totals),
+        "modules": len(loaded),
+        "heaviest": [(name, ms) for ms, name in heaviest],
+        "deferred_loaded": sorted(name for name in DEFERRED if name in loaded),
+    }
+
+
+def bench_first_request(runs: int) -> dict:
+    env = {**os.environ, "OPENING_POOL_SIZE": "0", "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY", "fake")}
+    imports, requests = [], []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", FIRST_REQUEST], capture_output=True, text=True,
+                                env=env, cwd=ROOT)
+        if result.returncode != 0:
+            raise RuntimeError(f"first request failed:\n{result.stderr[-2000:]}")
+        imported, first = map(float, result.stdout.split()[-2:])
+        imports.append(imported)
+        requests.append(first)
+    return {"import_ms": statistics.median(imports), "first_requests_ms": statistics.median(requests)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time and first-request benchmark.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="heaviest modules to list per target")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--check", action="store_true",
+                        help="exit 1 if a deferred module loads at start-up or --max-import-ms is exceeded")
+    parser.add_argument("--max-import-ms", type=float)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'target':<8} {'module':<16} {'import ms':>10} {'modules':>8}  deferred loaded")
+    results = {}
+    for target in args.targets:
+        module = TARGETS[target]
+        row = results[target] = bench_target(module, args.runs, args.top)
+        print(f"{target:<8} {module:<16} {row['import_ms']:>10.1f} {row['modules']:>8}  "
+              f"{', '.join(row['deferred_loaded']) or '-'}")
+        if row["deferred_loaded"]:
+            failures.append(f"{target}: imports {', '.join(row['deferred_loaded'])} at start-up")
+        if args.max_import_ms and row["import_ms"] > args.max_import_ms:
+            failures.append(f"{target}: {row['import_ms']:.0f} ms import > {args.max_import_ms:.0f} ms")
+
+    for target, row in results.items():
+        print(f"\nheaviest modules ({target}, self time):")
+        for name, ms in row["heaviest"]:
+            print(f"  {ms:8.1f} ms  {name}")
+
+    first = bench_first_request(args.runs)
+    print(f"\nweb: import {first['import_ms']:.1f} ms, then start + first respond "
+          f"{first['first_requests_ms']:.1f} ms (includes loading the SDK, fake backend)")
+
+    if args.check and failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark suite, run against the deterministic fake backend.
+
+Reports, for web/app_enhanced.py:
+
+- latency percentiles (p50/p95/p99) and throughput per endpoint, with
+  concurrent sessions each doing start -> respond (plain and streamed) ->
+  analyze -> threat analysis -> export, and an occasional debate
+- input tokens sent per turn as one dialogue grows
+- memory per live session (session store estimate and tracemalloc)
+
+Results are written to benchmarks/results/<time>-<commit>.json so runs can
+be compared across commits:
+
+    python benchmarks/bench_suite.py --sessions 40 --turns 6 --latency lognormal 0.05 0.5
+    python benchmarks/bench_suite.py --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "web"))
+
+from benchmarks import fake_anthropic
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+THREAT = "We rely on a VPN and an EDR agent on every laptop; the internal network is trusted."
+
+
+class Timings:
+    """Thread-safe latency samples per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, client, endpoint: str, payload=None):
+        start = time.perf_counter()
+        response = client.post(endpoint, json=payload or {})
+        response.get_data()  # drain streamed bodies
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples[endpoint].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[endpoint] += 1
+        return response
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def run_session(app, timings: Timings, turns: int, debate: bool):
+    client = app.test_client()
+    timings.call(client, '/api/start', {'topic': 'justice'})
+    for i in range(turns):
+        endpoint = '/api/respond/stream' if i % 2 else '/api/respond'
+        timings.call(client, endpoint, {'message': f"Justice is giving each their due ({i})"})
+    timings.call(client, '/api/analyze')
+    timings.call(client, '/api/threat/analyze', {'description': THREAT})
+    timings.call(client, '/api/export')
+    if debate:
+        timings.call(client, '/api/debate/start', {'turns': 2})
+
+
+def bench_endpoints(app, sessions: int, turns: int, threads: int) -> dict:
+    timings = Timings()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda n: run_session(app, timings, turns, debate=n % 5 == 0), range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for endpoint, samples in sorted(timings.samples.items()):
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": timings.errors[endpoint],
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "throughput_rps": len(samples) / elapsed,
+        }
+    return {"elapsed": elapsed, "endpoints": endpoints}
+
+
+def bench_tokens(app, checkpoints) -> list:
+    """Input tokens per turn as one dialogue grows: the dialogue call, and every call in the turn."""
+    client = app.test_client()
+    client.post('/api/start', json={'topic': 'justice'})
+    rows = []
+    for turn in range(1, max(checkpoints) + 1):
+        logged = len(fake_anthropic.FakeAnthropic.log)
+        body = client.post('/api/respond', json={'message': f"Perhaps justice is harmony ({turn})"}).get_json()
+        if turn in checkpoints:
+            calls = fake_anthropic.FakeAnthropic.log[logged:]
+            rows.append({
+                "turn": turn,
+                "dialogue_input_tokens": (body.get("usage") or {}).get("input_tokens", 0),
+                "turn_input_tokens": sum(call["input_tokens"] for call in calls),
+                "calls": len(calls),
+            })
+    return rows
+
+
+def bench_memory(app, sessions: int, turns: int) -> dict:
+    """Bytes per live session after `turns` turns each."""
+    import app_enhanced
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    clients = []
+    for _ in range(sessions):
+        client = app.test_client()
+        client.post('/api/start', json={'topic': 'justice'})
+        for i in range(turns):
+            client.post('/api/respond', json={'message': f"Justice is fairness ({i})"})
+        clients.append(client)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    store = app_enhanced.sessions.stats()
+    return {
+        "sessions": sessions,
+        "turns": turns,
+        "tracemalloc_bytes_per_session": allocated / sessions,
+        "store_bytes_per_session": store["total_bytes"] / max(store["live_sessions"], 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save(result: dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(RESULTS_DIR, f"{stamp}-{result['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def change(new: float, old: float) -> str:
+    if not old:
+        return ""
+    return f"{(new - old) / old:+6.0%}"
+
+
+def report(result: dict, baseline: dict = None):
+    base_endpoints = (baseline or {}).get("endpoints", {})
+    print(f"\n{'endpoint':<24} {'reqs':>6} {'errs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for endpoint, row in result["endpoints"].items():
+        old = base_endpoints.get(endpoint, {})
+        print(f"{endpoint:<24} {row['requests']:>6} {row['errors']:>5} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['p99_ms']:>9.1f} {row['throughput_rps']:>8.1f}  {change(row['p95_ms'], old.get('p95_ms'))}")
+
+    base_tokens = {row["turn"]: row for row in (baseline or {}).get("tokens", [])}
+    print(f"\n{'turn':>6} {'dialogue tokens':>16} {'all calls':>10} {'calls':>6}")
+    for row in result["tokens"]:
+        old = base_tokens.get(row["turn"], {})
+        print(f"{row['turn']:>6} {row['dialogue_input_tokens']:>16} {row['turn_input_tokens']:>10} "
+              f"{row['calls']:>6}  {change(row['turn_input_tokens'], old.get('turn_input_tokens'))}")
+
+    memory = result["memory"]
+    old = (baseline or {}).get("memory", {})
+    print(f"\nmemory per session ({memory['sessions']} sessions x {memory['turns']} turns): "
+          f"{memory['tracemalloc_bytes_per_session'] / 1024:.1f} KiB allocated, "
+          f"{memory['store_bytes_per_session'] / 1024:.1f} KiB estimated by the session store  "
+          f"{change(memory['tracemalloc_bytes_per_session'], old.get('tracemalloc_bytes_per_session'))}")
+    if baseline:
+        print(f"\n(changes are against {baseline['commit']}, run {baseline['time']})")
+    print()
+
+
+def parse_latency(values):
+    if len(values) == 1:
+        return float(values[0])
+    return (values[0], *map(float, values[1:]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint latency, token and memory benchmark.")
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--threads", type=int, default=16, help="threads in the Flask worker")
+    parser.add_argument("--latency", nargs="+", default=["lognormal", "0.05", "0.5"],
+                        help="seconds, or a distribution: lognormal MEDIAN SIGMA | uniform LOW HIGH")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-turns", type=int, nargs="+", default=[1, 5, 10, 20, 40])
+    parser.add_argument("--memory-sessions", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ANTHROPIC_API_KEY", "fake")
+    settings = {
+        "latency": parse_latency(args.latency),
+        "tokens_per_second": args.tokens_per_second,
+        "error_rate": args.error_rate,
+    }
+    fake_anthropic.install(seed=args.seed, **settings)
+
+    import app_enhanced
+
+    app = app_enhanced.app
+    result = {
+        "commit": git_commit(),
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {**vars(args), "latency": settings["latency"]},
+    }
+    print(f"{args.sessions} sessions x {args.turns} turns on {args.threads} threads, latency {settings['latency']}")
+    result.update(bench_endpoints(app, args.sessions, args.turns, args.threads))
+
+    fake_anthropic.install(seed=args.seed, latency=0, tokens_per_second=None)
+    result["tokens"] = bench_tokens(app, set(args.token_turns))
+    for session_id, _ in app_enhanced.sessions.items():
+        app_enhanced.sessions.pop(session_id)
+    result["memory"] = bench_memory(app, args.memory_sessions, args.turns)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(result, baseline)
+    if not args.no_save:
+        print(f"saved {os.path.relpath(save(result), ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
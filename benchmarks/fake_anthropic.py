@@ -0,0 +1,403 @@
+"""
+Fake Anthropic clients for benchmarks.
+Stand-ins for anthropic.Anthropic / anthropic.AsyncAnthropic that sleep
+instead of calling the API, so performance can be measured for free.
+
+The backend is deterministic for a given seed:
+
+- latency: a fixed number of seconds, or a distribution such as
+  ("lognormal", median, sigma) or ("uniform", low, high)
+- tokens_per_second: streamed replies trickle out at this output rate
+- error_rate / error_statuses: inject 429/529/500 responses
+- structured requests (forced tool calls) get canned, schema-valid JSON for
+  the analyzer method named by the tool; plain requests get `reply`
+
+Every call is logged (method, input/output tokens, latency) in FakeAnthropic.log.
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+DEFAULT_REPLY = "What do you mean by that? Could you give me an example?"
+
+# Schema-valid replies for each structured method (see core/structured.py)
+CANNED: Dict[str, Dict] = {
+    "analyze_dialogue": {
+        "claims": [
+            {"id": 1, "text": "Justice is fairness", "speaker": "user", "turn": 1},
+            {"id": 2, "text": "Fairness depends on the situation", "speaker": "user", "turn": 3},
+        ],
+        "contradictions": [{"claim_1_id": 1, "claim_2_id": 2, "explanation": "Fixed versus situational"}],
+        "fallacies": [],
+        "argument_strength": "moderate",
+        "consistency_score": 70,
+        "aporia_reached": False,
+        "key_insights": ["The user treats fairness as both fixed and relative"],
+    },
+    "incremental_analysis": {
+        "new_claims": [{"text": "Justice is fairness", "speaker": "user", "turn": 1}],
+        "fallacies": [],
+        "argument_strength": "moderate",
+        "consistency_score": 80,
+        "aporia_reached": False,
+        "key_insights": ["Fairness is doing a lot of work"],
+    },
+    "detect_contradiction": {"contradicts": False, "explanation": "Compatible claims", "severity": "none"},
+    "extract_claims": {"items": ["Justice is fairness", "Fairness is giving each their due"]},
+    "assess_sophistication": {
+        "vocabulary": 55, "argumentation": 60, "self_awareness": 50, "depth": 45,
+        "overall_score": 55, "level": "intermediate",
+        "indicators": ["Uses examples"], "recommendations": ["Press on definitions"],
+    },
+    "judge_debate": {
+        "winner": "draw",
+        "scores": {},
+        "analysis": "Evenly matched",
+        "best_moment": "What is justice, if not power?",
+        "verdict": "Neither side prevailed",
+    },
+    "analyze_threat_model": {
+        "assumptions": [{"assumption": "The network is trusted", "question": "Trusted by whom?"}],
+        "gaps": [{"gap": "Insider threat", "risk": "Data exfiltration"}],
+        "questions": ["What happens when the firewall fails?"],
+        "alternative_perspectives": [{"perspective": "Attacker", "implication": "Targets the weakest link"}],
+        "severity": "medium",
+    },
+    "interrogate_control": {
+        "effectiveness": "medium",
+        "security_theater_risk": 40,
+        "key_assumptions": ["Users report phishing"],
+        "bypass_scenarios": [{"scenario": "Session token theft", "likelihood": "medium"}],
+        "probing_questions": ["What does this control not see?"],
+        "verdict": "This control reduces some risk",
+        "recommendations": ["Measure detection rate"],
+    },
+    "challenge_assumptions": {"items": ["Secure against whom?", "What would change your mind?"]},
+    "red_team_questions": {
+        "philosophical": [{"question": "Who is trusted, and why?", "targets": "Trust boundaries"}],
+        "red_team": [{"question": "Where are credentials stored?", "attack_vector": "Credential theft"}],
+        "blind_spots": ["Third-party integrations"],
+        "recommendations": ["Test the backup restore path"],
+    },
+    "compliance_vs_security": {
+        "security_improvement": "minimal",
+        "compliance_score": "passes",
+        "gap_analysis": "Logs are kept but never reviewed",
+        "security_theater_elements": ["Annual checkbox review"],
+        "actual_risk_reduction": "Small",
+        "questions_to_ask": ["Who reads the logs?"],
+        "verdict": "Compliant, barely safer",
+    },
+}
+
+
+def _estimate_tokens(value) -> int:
+    text = value if isinstance(value, str) else json.dumps(value)
+    return len(text) // 4 + 1
+
+
+def _canned(method: str, request: Dict) -> Dict:
+    if method == "detect_contradictions":
+        prompt = request["messages"][-1]["content"]
+        return {"items": [
+            {"pair": ref, "contradicts": n % 3 == 0, "explanation": "Canned verdict",
+             "severity": "implicit" if n % 3 == 0 else "none"}
+            for n, ref in enumerate(re.findall(r"^(p\d+):", prompt, re.M))
+        ]}
+    return CANNED.get(method, {})
+
+
+class FakeAPIError(Exception):
+    """Raised for injected errors when the SDK's own error classes cannot be built."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Injected {status_code}")
+        self.status_code = status_code
+
+
+def _injected_error(status: int) -> Exception:
+    try:
+        import anthropic
+        import httpx
+        request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+        response = httpx.Response(status, headers={"retry-after": "0"}, request=request)
+        if status == 429:
+            return anthropic.RateLimitError("Injected rate limit", response=response, body=None)
+        return anthropic.APIStatusError(f"Injected {status}", response=response, body=None)
+    except Exception:
+        return FakeAPIError(status)
+
+
+class InFlight:
+    """Counts concurrent fake calls and remembers the peak."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+        self.total = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.total += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+class _Backend:
+    """Shared behaviour of the sync and async fakes; settings are class attributes of the owner."""
+
+    def __init__(self, owner):
+        self._owner = owner
+
+    def plan(self, request: Dict) -> Dict:
+        """Decide everything about one call up front: latency, error, reply."""
+        owner = self._owner
+        with owner._lock:
+            rng = owner._rng
+            latency = _sample(owner.latency, rng)
+            error = None
+            if owner.error_rate and rng.random() < owner.error_rate:
+                error = rng.choice(owner.error_statuses)
+
+        tool = (request.get("tool_choice") or {}).get("name")
+        if tool:
+            payload = _canned(tool, request)
+            text = json.dumps(payload)
+        else:
+            payload, text = None, owner.reply
+
+        input_tokens = _estimate_tokens(request.get("system", "")) + _estimate_tokens(request.get("messages", []))
+        output_tokens = _estimate_tokens(text)
+        entry = {"method": tool or "text", "input_tokens": input_tokens, "output_tokens": output_tokens,
+                 "latency": latency, "error": error}
+        with owner._lock:
+            owner.log.append(entry)
+        return {"latency": latency, "error": error, "tool": tool, "payload": payload, "text": text,
+                "usage": (input_tokens, output_tokens)}
+
+    def message(self, plan: Dict) -> SimpleNamespace:
+        if plan["tool"]:
+            block = SimpleNamespace(type="tool_use", id="toolu_fake", name=plan["tool"], input=plan["payload"])
+        else:
+            block = SimpleNamespace(type="text", text=plan["text"])
+        input_tokens, output_tokens = plan["usage"]
+        return SimpleNamespace(
+            content=[block],
+            usage=SimpleNamespace(
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cache_creation_input_tokens=0,
+                cache_read_input_tokens=0
+            )
+        )
+
+    def chunks(self, plan: Dict) -> List[str]:
+        if plan["tool"]:
+            text = plan["text"]
+            return [text[i:i + 16] for i in range(0, len(text), 16)]
+        return [word + " " for word in plan["text"].split(" ")]
+
+    def chunk_delay(self, chunk: str) -> float:
+        rate = self._owner.tokens_per_second
+        return _estimate_tokens(chunk) / rate if rate else 0.0
+
+
+def _sample(latency, rng: random.Random) -> float:
+    if isinstance(latency, (int, float)):
+        return float(latency)
+    kind, *params = latency
+    if kind == "fixed":
+        return float(params[0])
+    if kind == "uniform":
+        return rng.uniform(params[0], params[1])
+    if kind == "lognormal":
+        median, sigma = params
+        return rng.lognormvariate(math.log(median), sigma)
+    if kind == "exponential":
+        return rng.expovariate(1 / params[0])
+    raise ValueError(f"Unknown latency distribution: {kind}")
+
+
+def _event(plan: Dict, chunk: str) -> SimpleNamespace:
+    if plan["tool"]:
+        delta = SimpleNamespace(type="input_json_delta", partial_json=chunk)
+    else:
+        delta = SimpleNamespace(type="text_delta", text=chunk)
+    return SimpleNamespace(type="content_block_delta", delta=delta)
+
+
+class _FakeStream:
+    def __init__(self, backend: _Backend, request: Dict):
+        self._backend = backend
+        self._plan = backend.plan(request)
+
+    def __enter__(self):
+        with self._backend._owner.in_flight:
+            time.sleep(self._plan["latency"])
+        if self._plan["error"]:
+            raise _injected_error(self._plan["error"])
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for chunk in self._backend.chunks(self._plan):
+            time.sleep(self._backend.chunk_delay(chunk))
+            yield _event(self._plan, chunk)
+
+    @property
+    def text_stream(self):
+        for event in self:
+            if event.delta.type == "text_delta":
+                yield event.delta.text
+
+    def get_final_message(self):
+        return self._backend.message(self._plan)
+
+
+class _FakeMessages:
+    def __init__(self, owner):
+        self._backend = _Backend(owner)
+        self._owner = owner
+
+    def create(self, **kwargs):
+        plan = self._backend.plan(kwargs)
+        with self._owner.in_flight:
+            time.sleep(plan["latency"] + sum(self._backend.chunk_delay(c) for c in self._backend.chunks(plan)))
+        if plan["error"]:
+            raise _injected_error(plan["error"])
+        return self._backend.message(plan)
+
+    def stream(self, **kwargs):
+        return _FakeStream(self._backend, kwargs)
+
+    def count_tokens(self, **kwargs):
+        return SimpleNamespace(input_tokens=_estimate_tokens(kwargs.get("system", ""))
+                               + _estimate_tokens(kwargs.get("messages", [])))
+
+
+class _FakeSettings:
+    latency = 0.5
+    tokens_per_second: Optional[float] = None
+    error_rate = 0.0
+    error_statuses = (429, 529, 500)
+    reply = DEFAULT_REPLY
+
+    @classmethod
+    def configure(cls, seed: int = 0, **settings):
+        """Set backend behaviour (latency, tokens_per_second, error_rate, ...) and reseed."""
+        for name, value in settings.items():
+            if not hasattr(cls, name):
+                raise ValueError(f"Unknown fake setting: {name}")
+            setattr(cls, name, value)
+        cls._rng = random.Random(seed)
+        cls.log = []
+        cls.in_flight = InFlight()
+
+
+class FakeAnthropic(_FakeSettings):
+    """Synchronous fake: each call blocks the calling thread for its latency."""
+
+    _lock = threading.Lock()
+    _rng = random.Random(0)
+    log: List[Dict] = []
+    in_flight = InFlight()
+
+    def __init__(self, *args, **kwargs):
+        self.messages = _FakeMessages(type(self))
+
+    def close(self):
+        pass
+
+
+class _AsyncFakeStream:
+    def __init__(self, backend: _Backend, request: Dict):
+        self._backend = backend
+        self._plan = backend.plan(request)
+
+    async def __aenter__(self):
+        with self._backend._owner.in_flight:
+            await asyncio.sleep(self._plan["latency"])
+        if self._plan["error"]:
+            raise _injected_error(self._plan["error"])
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for chunk in self._backend.chunks(self._plan):
+            await asyncio.sleep(self._backend.chunk_delay(chunk))
+            yield _event(self._plan, chunk)
+
+    @property
+    async def text_stream(self):
+        async for event in self:
+            if event.delta.type == "text_delta":
+                yield event.delta.text
+
+    async def get_final_message(self):
+        return self._backend.message(self._plan)
+
+
+class _AsyncFakeMessages:
+    def __init__(self, owner):
+        self._backend = _Backend(owner)
+        self._owner = owner
+
+    async def create(self, **kwargs):
+        plan = self._backend.plan(kwargs)
+        with self._owner.in_flight:
+            await asyncio.sleep(plan["latency"] + sum(self._backend.chunk_delay(c) for c in self._backend.chunks(plan)))
+        if plan["error"]:
+            raise _injected_error(plan["error"])
+        return self._backend.message(plan)
+
+    def stream(self, **kwargs):
+        return _AsyncFakeStream(self._backend, kwargs)
+
+    async def count_tokens(self, **kwargs):
+        return SimpleNamespace(input_tokens=_estimate_tokens(kwargs.get("system", ""))
+                               + _estimate_tokens(kwargs.get("messages", [])))
+
+
+class FakeAsyncAnthropic(_FakeSettings):
+    """Async fake: each call awaits its latency without holding a thread."""
+
+    _lock = threading.Lock()
+    _rng = random.Random(0)
+    log: List[Dict] = []
+    in_flight = InFlight()
+
+    def __init__(self, *args, **kwargs):
+        self.messages = _AsyncFakeMessages(type(self))
+
+    async def close(self):
+        pass
+
+
+def install(latency=0.5, seed: int = 0, **settings):
+    """
+    Replace the SDK client classes with the fakes. Call before the first
+    client is built. `latency` is seconds or a distribution tuple; other
+    settings: tokens_per_second, error_rate, error_statuses, reply.
+    """
+    import anthropic
+
+    for fake in (FakeAnthropic, FakeAsyncAnthropic):
+        fake.configure(seed=seed, latency=latency, **settings)
+    anthropic.Anthropic = FakeAnthropic
+    anthropic.AsyncAnthropic = FakeAsyncAnthropic
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Socratic Dialogue Corpus Analysis
+Runs argument analysis and sophistication assessment over a JSONL archive.
+
+    python3 cli/main.py analyze dialogues.jsonl --output analysis.jsonl --workers 8
+    # interrupted? run the same command again to resume
+"""
+
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py analyze",
+                                     description="Analyze an archive of dialogues (JSONL).")
+    parser.add_argument("input", help="JSONL file, one {\"id\", \"history\"} dialogue per line")
+    parser.add_argument("--output", default="analysis.jsonl",
+                        help="JSONL file results are appended to")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="dialogues analyzed concurrently")
+    parser.add_argument("--queue-size", type=int,
+                        help="dialogues read ahead of the workers (default: 2 x workers)")
+    parser.add_argument("--fake-latency", type=float,
+                        help="use the local fake client with this latency (seconds); no API calls")
+    args = parser.parse_args(argv)
+
+    if args.fake_latency is not None:
+        from benchmarks import fake_anthropic
+        fake_anthropic.install(args.fake_latency)
+    elif not os.environ.get("ANTHROPIC_API_KEY"):
+        print("⚠️  ANTHROPIC_API_KEY not set.")
+        sys.exit(1)
+
+    from core.corpus import CorpusPipeline
+
+    pipeline = CorpusPipeline(args.input, args.output, checkpoint_path=args.checkpoint,
+                              workers=args.workers, queue_size=args.queue_size)
+    start, _ = pipeline.resume_point()
+    print(f"\n📚 Analyzing {args.input} from line {start + 1}, {args.workers} at a time\n")
+
+    def on_result(result):
+        done = pipeline.stats["processed"] + pipeline.stats["errors"]
+        status = f"error: {result['error']}" if "error" in result else "ok"
+        print(f"  [{done}] {result['id']} — {status}")
+
+    try:
+        stats = pipeline.run(on_result=on_result)
+    except KeyboardInterrupt:
+        print("\n\nInterrupted. Results so far are saved; rerun to resume.")
+        stats = pipeline.stats
+
+    print(f"\n{stats['processed']} analyzed, {stats['errors']} failed, "
+          f"{stats['skipped']} already done, {stats['retried']} retried after an earlier error → {args.output}")
+    if stats["errors"]:
+        print("Failed dialogues are retried when you run the same command again.")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -95,6 +95,14 @@ def select_topic(dialogue: SocraticDialogue) -> bool:
     return True
 
 
+def print_stream(deltas):
+    """Print text deltas as they arrive, keeping the reply indented."""
+    print("   ", end="", flush=True)
+    for delta in deltas:
+        print(delta.replace("\n", "\n   "), end="", flush=True)
+    print("\n")
+
+
 def run_dialogue(dialogue: SocraticDialogue):
     mode_data = list_modes().get(dialogue.mode, list_modes()["socratic"])
     security_label = " [SECURITY]" if dialogue.is_security else ""
@@ -104,8 +112,7 @@ def run_dialogue(dialogue: SocraticDialogue):
     print("-" * 40)
     
     print(f"\n🏛️  {mode_data['name'].upper()}:")
-    opening = dialogue.get_opening()
-    print(f"   {opening}\n")
+    print_stream(dialogue.get_opening_stream())
     
     while True:
         try:
@@ -140,11 +147,23 @@ def run_dialogue(dialogue: SocraticDialogue):
             continue
         
         print(f"\n🏛️  {mode_data['name'].upper()}:")
-        response = dialogue.respond(user_input)
-        print(f"   {response}\n")
+        print_stream(dialogue.respond_stream(user_input))
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "analyze":
+        from cli.corpus import main as analyze_corpus
+        analyze_corpus(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "sessions":
+        from cli.sessions import main as analyze_sessions
+        analyze_sessions(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "tournament":
+        from cli.tournament import main as run_tournament
+        run_tournament(sys.argv[2:])
+        return
+
     print_header()
     
     if not os.environ.get("ANTHROPIC_API_KEY"):
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Socratic Dialogue Session Analysis
+Argument analysis and sophistication assessment over every session in the
+dialogue store, with running totals as each session completes.
+
+    python3 cli/main.py sessions --store dialogues.sqlite --workers 8
+    # run again later: only sessions that changed since are analyzed
+"""
+
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def print_totals(totals):
+    print(f"\n{totals['sessions']} sessions: {totals['analyzed']} analyzed, {totals['unchanged']} unchanged, "
+          f"{totals['too_short']} too short, {totals['errors']} failed")
+    if totals["stopped"]:
+        print(f"  Stopped early: {totals['stopped']}")
+    for label, key in (("Consistency", "consistency_score"), ("Sophistication", "sophistication_score")):
+        score = totals[key]
+        if score:
+            print(f"  {label:<15} mean {score['mean']}  (min {score['min']}, max {score['max']})")
+    if totals["argument_strength"]:
+        print(f"  {'Strength':<15} " + ", ".join(f"{k} {v}" for k, v in sorted(totals["argument_strength"].items())))
+    if totals["levels"]:
+        print(f"  {'Levels':<15} " + ", ".join(f"{k} {v}" for k, v in sorted(totals["levels"].items())))
+    if totals["fallacies_per_session"] is not None:
+        print(f"  {'Fallacies':<15} {totals['fallacies_per_session']} per session"
+              + (f"; most common: {', '.join(f'{t} ({n})' for t, n in totals['top_fallacies'])}"
+                 if totals["top_fallacies"] else ""))
+    print(f"  {'Contradictions':<15} {totals['contradictions']}, aporia reached in {totals['aporia_reached']}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py sessions",
+                                     description="Analyze every stored dialogue session.")
+    parser.add_argument("--store", default=os.environ.get("DIALOGUE_STORE_PATH"),
+                        help="dialogue store file (default: $DIALOGUE_STORE_PATH)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="sessions analyzed concurrently")
+    parser.add_argument("--since", type=float,
+                        help="only sessions active after this Unix time")
+    parser.add_argument("--force", action="store_true",
+                        help="analyze sessions again even if unchanged since their last analysis")
+    parser.add_argument("--fake-latency", type=float,
+                        help="use the local fake client with this latency (seconds); no API calls")
+    args = parser.parse_args(argv)
+
+    if not args.store or not os.path.exists(args.store):
+        print("⚠️  No dialogue store. Pass --store or set DIALOGUE_STORE_PATH.")
+        sys.exit(1)
+    if args.fake_latency is not None:
+        from benchmarks import fake_anthropic
+        fake_anthropic.install(args.fake_latency)
+    elif not os.environ.get("ANTHROPIC_API_KEY"):
+        print("⚠️  ANTHROPIC_API_KEY not set.")
+        sys.exit(1)
+
+    from core.dialogue_store import DialogueStore
+    from core.session_analysis import AnalysisRunning, SessionAnalyzer
+
+    analyzer = SessionAnalyzer(DialogueStore(args.store), workers=args.workers)
+    print(f"\n📊 Analyzing sessions in {args.store}, {args.workers} at a time\n")
+
+    totals = None
+    try:
+        for update in analyzer.run(since=args.since, force=args.force):
+            totals = update["totals"]
+            status = f"error: {update['error']}" if update["status"] == "error" else update["status"]
+            print(f"  [{totals['sessions']}] {update['session']} — {status}")
+    except KeyboardInterrupt:
+        print("\n\nInterrupted. Finished sessions are recorded; rerun to continue.")
+    except AnalysisRunning as e:
+        print(f"⚠️  {e}.")
+        sys.exit(1)
+
+    if totals is None:
+        print("No sessions found.\n")
+    else:
+        print_totals(totals)
+
+
+if __name__ == "__main__":
+    main()
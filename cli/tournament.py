@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Socratic Dialogue Tournament
+Round-robin AI vs AI debates across philosophical modes, with Elo ratings.
+
+    python3 cli/main.py tournament --results tournament.jsonl --concurrency 8
+    # interrupted? run the same command again to resume
+"""
+
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.socrates import MODES
+from core.tournament import DEFAULT_TOPICS, Tournament, round_robin
+
+
+def print_standings(standings):
+    print("\n" + "=" * 60)
+    print("  STANDINGS")
+    print("=" * 60)
+    for i, row in enumerate(standings, 1):
+        name = MODES[row["mode"]]["name"]
+        print(f"  {i}. {name:<14} {row['rating']:7.1f}   "
+              f"W {row.get('wins', 0):<3} D {row.get('draws', 0):<3} L {row.get('losses', 0):<3}")
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py tournament",
+                                     description="Run a round-robin debate tournament.")
+    parser.add_argument("--results", default="tournament.jsonl",
+                        help="JSONL file results are appended to (and resumed from)")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--topic", dest="topics", action="append",
+                        help="debate topic (repeatable); defaults to a built-in set")
+    parser.add_argument("--positions", nargs=2, default=["Yes", "No"], metavar=("A", "B"))
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="maximum debates in flight at once")
+    parser.add_argument("--fake-latency", type=float,
+                        help="use the local fake client with this latency (seconds); no API calls")
+    args = parser.parse_args(argv)
+
+    if args.fake_latency is not None:
+        from benchmarks import fake_anthropic
+        fake_anthropic.install(args.fake_latency)
+    elif not os.environ.get("ANTHROPIC_API_KEY"):
+        print("⚠️  ANTHROPIC_API_KEY not set.")
+        sys.exit(1)
+
+    matches = round_robin(args.modes, args.topics or DEFAULT_TOPICS,
+                          tuple(args.positions), args.rounds)
+    tournament = Tournament(args.results, concurrency=args.concurrency, turns=args.turns)
+    pending = tournament.pending(matches)
+
+    print(f"\n🏛️  Tournament: {len(matches)} debates, {len(matches) - len(pending)} already played, "
+          f"{args.concurrency} at a time\n")
+
+    done = 0
+
+    def on_result(result):
+        nonlocal done
+        done += 1
+        a, b = MODES[result["mode_a"]]["name"], MODES[result["mode_b"]]["name"]
+        if "error" in result:
+            outcome = f"error: {result['error']}"
+        else:
+            winner = result["judgment"].get("winner", "draw")
+            outcome = "draw" if winner not in MODES else f"{MODES[winner]['name']} wins"
+        print(f"  [{done}/{len(pending)}] {a} vs {b} — {result['topic']} — {outcome}")
+
+    try:
+        standings = tournament.run(matches, on_result=on_result)
+    except KeyboardInterrupt:
+        print("\n\nInterrupted. Results so far are saved; rerun to resume.")
+        standings = tournament.elo.standings()
+
+    print_standings(standings)
+
+
+if __name__ == "__main__":
+    main()
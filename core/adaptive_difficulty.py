@@ -3,16 +3,21 @@ Adaptive Difficulty System
 Adjusts philosopher's questioning depth based on user sophistication.
 """
 
-import anthropic
-from typing import List, Dict, Optional
-import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Dict, Optional
+import threading
+from .clients import get_client
+from .scheduler import ANALYSIS
+from .structured import StructuredOutputError, parse_structured, response_payload, structured_request
 
 
 class UserProfiler:
     """Profiles user sophistication based on their responses."""
 
     def __init__(self, api_key: Optional[str] = None):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = get_client(api_key, ANALYSIS)
         self.model = "claude-sonnet-4-20250514"
 
     def assess_sophistication(self, history: List[Dict[str, str]]) -> Dict:
@@ -20,18 +25,31 @@ class UserProfiler:
         Assess user's philosophical sophistication based on dialogue history.
         Returns level (beginner/intermediate/advanced) and indicators.
         """
-        if len(history) < 2:
+        assessment_prompt = self._assessment_prompt(history)
+        if assessment_prompt is None:
             return {"level": "beginner", "score": 30, "indicators": []}
 
+        try:
+            response = self.client.messages.create(**self._request(assessment_prompt))
+            return self._parse_assessment(response_payload(response))
+
+        except Exception as e:
+            return {"level": "intermediate", "score": 50, "indicators": [], "error": str(e)}
+
+    def _assessment_prompt(self, history: List[Dict[str, str]]) -> Optional[str]:
+        """Build the assessment prompt, or None if there is too little to judge."""
+        if len(history) < 2:
+            return None
+
         # Get only user messages
         user_messages = [msg["content"] for msg in history if msg["role"] == "user"]
 
         if len(user_messages) < 2:
-            return {"level": "beginner", "score": 30, "indicators": []}
+            return None
 
         combined_text = " ".join(user_messages[-5:])  # Last 5 messages
 
-        assessment_prompt = f"""Assess the philosophical sophistication of this speaker based on their responses.
+        return f"""Assess the philosophical sophistication of this speaker based on their responses.
 
 Speaker's responses:
 {combined_text}
@@ -56,25 +74,22 @@ Respond in JSON:
 
 Be fair but accurate. Most people start as beginners."""
 
+    def _request(self, assessment_prompt: str) -> Dict:
+        return structured_request({
+            "model": self.model,
+            "max_tokens": 800,
+            "messages": [{"role": "user", "content": assessment_prompt}]
+        }, "assess_sophistication")
+
+    def _parse_assessment(self, payload: Any) -> Dict:
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=800,
-                messages=[{"role": "user", "content": assessment_prompt}]
-            )
-
-            content = response.content[0].text
-            json_match = re.search(r'\{[\s\S]*\}', content)
-
-            if json_match:
-                import json
-                assessment = json.loads(json_match.group())
-                return assessment
-            else:
-                return {"level": "intermediate", "score": 50, "indicators": []}
+            return parse_structured(payload, "assess_sophistication")
+        except StructuredOutputError:
+            return {"level": "intermediate", "score": 50, "indicators": []}
 
-        except Exception as e:
-            return {"level": "intermediate", "score": 50, "indicators": [], "error": str(e)}
+
+# Shared by all sessions: reassessments run here, off the request path
+_reassessment_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="reassess")
 
 
 class AdaptiveSocraticDialogue:
@@ -85,19 +100,84 @@ class AdaptiveSocraticDialogue:
         self.profiler = UserProfiler(api_key=api_key)
         self.current_level = "beginner"
         self.difficulty_score = 30
+        self._reassessment = None  # in-flight Future/Task, if any
+        self._reassessment_seq = 0
+        # Reentrant: a future that is already done runs its done callback,
+        # which takes this lock, inside add_done_callback
+        self._reassessment_lock = threading.RLock()
 
     def update_difficulty(self):
         """Update difficulty based on conversation history."""
         if len(self.base_dialogue.history) >= 4:
             assessment = self.profiler.assess_sophistication(self.base_dialogue.history)
-            self.current_level = assessment.get("level", "intermediate")
-            self.difficulty_score = assessment.get("overall_score", 50)
+            self._apply_assessment(assessment)
             return assessment
         return None
 
+    def _apply_assessment(self, assessment: Dict):
+        self.current_level = assessment.get("level", "intermediate")
+        self.difficulty_score = assessment.get("overall_score", 50)
+
+    def schedule_reassessment(self) -> bool:
+        """
+        Reassess difficulty in the background; the new level applies from
+        the next turn. Returns False if one is already running for this
+        session (requests are coalesced) or there is too little history.
+        """
+        def start(token):
+            future = _reassessment_pool.submit(
+                contextvars.copy_context().run, self.profiler.assess_sophistication, token[2])
+            future.add_done_callback(lambda f: self._finish_reassessment(token, f))
+            return future
+
+        return self._begin_reassessment(start) is not None
+
+    def _begin_reassessment(self, start: Optional[Callable[[tuple], Any]] = None) -> Optional[tuple]:
+        """
+        Claim the next sequence number; start(token) launches the Future/Task,
+        which is recorded under the same lock so no caller sees one without the other.
+        """
+        history = self.base_dialogue.history
+        if len(history) < 4:
+            return None
+        with self._reassessment_lock:
+            if self._reassessment is not None and not self._reassessment.done():
+                return None
+            self._reassessment_seq += 1
+            # Snapshot: the profiler must not read a list the request thread is appending to
+            token = self._reassessment_seq, history, list(history)
+            if start is not None:
+                self._reassessment = start(token)
+            return token
+
+    def _finish_reassessment(self, token: tuple, future):
+        seq, history, _ = token
+        if future.cancelled() or future.exception() is not None:
+            return
+        assessment = future.result()
+        with self._reassessment_lock:
+            # Drop stale results: a newer reassessment was started, the
+            # dialogue was reset or its topic changed (new history list),
+            # or the assessment failed. Turns added meanwhile do not make it
+            # stale; they are judged by the next reassessment.
+            if (seq != self._reassessment_seq
+                    or history is not self.base_dialogue.history
+                    or "error" in assessment):
+                return
+            self._apply_assessment(assessment)
+
     def get_adapted_system_prompt(self) -> str:
         """Get system prompt adjusted for current difficulty level."""
-        base_prompt = self.base_dialogue.get_system_prompt()
+        return self._adapted_static_prompt() + self.base_dialogue._dynamic_prompt()
+
+    def _adapted_static_prompt(self) -> str:
+        """
+        Persona prompt plus the difficulty block. Both are fixed per level,
+        so they sit before the topic inside the cached system prefix.
+        """
+        # Call through the class: while responding, the instance attribute
+        # is overridden with this very method.
+        base_prompt = type(self.base_dialogue)._static_prompt(self.base_dialogue)
 
         level_adjustments = {
             "beginner": """
@@ -132,23 +212,37 @@ DIFFICULTY: ADVANCED
         adjustment = level_adjustments.get(self.current_level, level_adjustments["intermediate"])
         return base_prompt + "\n\n" + adjustment
 
+    def _reassessment_due(self) -> bool:
+        """Every 3 turns, reassess difficulty."""
+        return len(self.base_dialogue.history) % 6 == 0 and len(self.base_dialogue.history) > 0
+
+    @contextmanager
+    def _adapted_prompt(self):
+        """Temporarily override the base dialogue's static system prompt."""
+        original_static_prompt = self.base_dialogue._static_prompt
+        self.base_dialogue._static_prompt = self._adapted_static_prompt
+        try:
+            yield
+        finally:
+            # Restore original method
+            self.base_dialogue._static_prompt = original_static_prompt
+
     def respond(self, user_input: str) -> str:
         """Respond with adaptive difficulty."""
-        # Every 3 turns, reassess difficulty
-        if len(self.base_dialogue.history) % 6 == 0 and len(self.base_dialogue.history) > 0:
-            self.update_difficulty()
-
-        # Temporarily override system prompt
-        original_get_prompt = self.base_dialogue.get_system_prompt
-        self.base_dialogue.get_system_prompt = self.get_adapted_system_prompt
+        if self._reassessment_due():
+            self.schedule_reassessment()
 
         # Get response using base dialogue
-        response = self.base_dialogue.respond(user_input)
+        with self._adapted_prompt():
+            return self.base_dialogue.respond(user_input)
 
-        # Restore original method
-        self.base_dialogue.get_system_prompt = original_get_prompt
+    def respond_stream(self, user_input: str) -> Iterator[str]:
+        """Stream a response with adaptive difficulty, yielding text deltas."""
+        if self._reassessment_due():
+            self.schedule_reassessment()
 
-        return response
+        with self._adapted_prompt():
+            yield from self.base_dialogue.respond_stream(user_input)
 
     def get_difficulty_info(self) -> Dict:
         """Get current difficulty information for UI display."""
@@ -0,0 +1,44 @@
+"""
+Admin Access
+The /api/admin/* routes expose every user's dialogues and can start paid
+analysis runs, so they only answer requests that carry the ADMIN_TOKEN
+secret, as `Authorization: Bearer <token>` or an `X-Admin-Token` header.
+With no ADMIN_TOKEN set they are closed to everyone.
+
+Both web apps call admin_denied from a before_request hook.
+"""
+
+import hmac
+import os
+from typing import Dict, Mapping, Optional, Tuple
+
+ADMIN_PREFIX = "/api/admin/"
+
+
+def admin_token() -> Optional[str]:
+    """The configured admin secret, read per request so it can be rotated."""
+    return os.environ.get("ADMIN_TOKEN") or None
+
+
+def presented_token(headers: Mapping[str, str]) -> Optional[str]:
+    """The token a request carries, if any."""
+    authorization = headers.get("Authorization", "")
+    if authorization.startswith("Bearer "):
+        return authorization[len("Bearer "):].strip()
+    return headers.get("X-Admin-Token")
+
+
+def admin_denied(path: str, headers: Mapping[str, str]) -> Optional[Tuple[Dict, int]]:
+    """
+    None when the request may proceed: it is not for an admin route, or it
+    carries the admin token. Otherwise the (error body, status) to answer.
+    """
+    if not path.startswith(ADMIN_PREFIX):
+        return None
+    expected = admin_token()
+    if expected is None:
+        return {"error": "Admin routes are disabled; set ADMIN_TOKEN to enable them"}, 403
+    given = presented_token(headers)
+    if not given or not hmac.compare_digest(given.encode("utf-8"), expected.encode("utf-8")):
+        return {"error": "Admin token required"}, 401
+    return None
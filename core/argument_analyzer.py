@@ -3,24 +3,274 @@ Argument Analyzer - Logical structure and argumentation analysis
 Analyzes dialogues for claims, contradictions, fallacies, and argument structure.
 """
 
-import anthropic
-from typing import List, Dict, Optional, Tuple
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, List, Dict, Optional, Tuple, Union
 import json
-import re
+from . import telemetry
+from .clients import get_client
+from .scheduler import ANALYSIS
+from .context_window import estimate_tokens
+from .response_cache import get_response_cache, is_cacheable, normalize_text
+from .structured import (
+    SCHEMAS, StructuredOutputError, StructuredStream, extract_json, parse_structured,
+    response_payload, structured_request, validate,
+)
+
+
+# Returned when the model's reply does not match the schema; never cached
+UNPARSED_CONTRADICTION = {"contradicts": False, "explanation": "Could not analyze", "severity": "none"}
+
+# Limits for one batched contradiction request
+BATCH_MAX_PROMPT_TOKENS = 6000
+BATCH_MAX_OUTPUT_TOKENS = 4000
+BATCH_TOKENS_PER_VERDICT = 80
+
+# Candidate pairs checked per incremental run (new claims against all others)
+INCREMENTAL_CHECK_PAIRS = 10
 
 
 class ArgumentAnalyzer:
     """Analyzes philosophical dialogues for logical structure and quality."""
 
     def __init__(self, api_key: Optional[str] = None):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = get_client(api_key, ANALYSIS)
         self.model = "claude-sonnet-4-20250514"
+        self.cache = get_response_cache()
 
     def analyze_dialogue(self, history: List[Dict[str, str]]) -> Dict:
         """
         Comprehensive analysis of the dialogue structure.
         Returns claims, contradictions, fallacies, and argument quality metrics.
         """
+        insufficient = self._check_history(history)
+        if insufficient is not None:
+            return insufficient
+
+        try:
+            response = self.client.messages.create(**self._analysis_request(history))
+            return self._parse_analysis(response_payload(response))
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def analyze_dialogue_stream(self, history: List[Dict[str, str]]) -> Iterator[Tuple[str, Dict]]:
+        """
+        analyze_dialogue, streamed: yields ("partial", analysis so far) each
+        time a claim, contradiction or field completes, then ("result", analysis).
+        """
+        insufficient = self._check_history(history)
+        if insufficient is not None:
+            yield "result", insufficient
+            return
+
+        try:
+            stream = StructuredStream()
+            for partial in stream.run(self.client, self._analysis_request(history)):
+                yield "partial", partial
+            yield "result", self._parse_analysis(response_payload(stream.final))
+
+        except Exception as e:
+            yield "result", {"error": str(e)}
+
+    def detect_contradiction(self, claim1: str, claim2: str) -> Dict:
+        """Check if two claims contradict each other."""
+        try:
+            request = self._contradiction_request(normalize_text(claim1), normalize_text(claim2))
+            return self._call("detect_contradiction", request, self._parse_contradiction)
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def find_contradictions(self, claims: List[str], top_k: int = 10, new_from: int = 0) -> List[Dict]:
+        """
+        Check a set of claims for contradictions without an O(n^2) sweep: a
+        local ClaimIndex ranks every pair and only the top_k are checked, in
+        one batched request. Claim IDs are positions in `claims`. With
+        new_from, only pairs involving a claim at or after that position are
+        ranked (claims added since an earlier check).
+        """
+        pairs = self._candidate_pairs(claims, top_k, new_from)
+        verdicts = self.detect_contradictions({
+            (first, second): (claims[first], claims[second]) for first, second, _ in pairs
+        })
+        return [
+            self._contradiction_entry(first, second, score, verdicts[(first, second)])
+            for first, second, score in pairs
+            if verdicts[(first, second)].get("contradicts")
+        ]
+
+    def detect_contradictions(self, pairs: Union[Dict[Any, Tuple[str, str]], List[Tuple[str, str]]],
+                              concurrency: int = 4, max_retries: int = 2) -> Dict[Any, Dict]:
+        """
+        Check many claim pairs, several per request. `pairs` maps pair IDs to
+        (claim1, claim2); a list uses positions as IDs. Pairs are split into
+        chunks that fit the prompt and output limits and the chunks run
+        concurrently. A chunk that fails, or whose reply leaves pairs out, is
+        retried with just those pairs. Returns a verdict per pair ID, or an
+        error dict for pairs that still failed after max_retries.
+        """
+        results, todo = self._batch_lookup(pairs)
+        attempt = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while todo:
+                chunks = self._batch_chunks(todo)
+                # Each chunk runs in a copy of this context, so its calls keep the trace ID
+                contexts = [contextvars.copy_context() for _ in chunks]
+                outcomes = pool.map(lambda chunk, context: context.run(self._run_batch_chunk, chunk),
+                                    chunks, contexts)
+                todo = self._batch_collect(chunks, outcomes, results, attempt, max_retries)
+                attempt += 1
+        return results
+
+    def _run_batch_chunk(self, chunk: List[Tuple]) -> Union[Dict, Exception]:
+        try:
+            response = self.client.messages.create(**self._batch_request(chunk))
+            return self._parse_batch(response_payload(response), chunk)
+        except Exception as e:
+            return e
+
+    def _batch_lookup(self, pairs) -> Tuple[Dict, List[Tuple]]:
+        """Split pairs into cached verdicts and (pair_id, claim1, claim2, key) still to check."""
+        if not isinstance(pairs, dict):
+            pairs = dict(enumerate(pairs))
+
+        results, todo = {}, []
+        for pair_id, (claim1, claim2) in pairs.items():
+            claim1, claim2 = normalize_text(claim1), normalize_text(claim2)
+            # Keyed by the pair's request on its own (prompt, schema, model), so
+            # editing the batch prompt invalidates cached verdicts
+            key = self.cache.key("detect_contradictions", self._batch_request([(pair_id, claim1, claim2, None)]))
+            cached = self.cache.get("detect_contradictions", key)
+            if cached is not None:
+                results[pair_id] = cached
+            else:
+                todo.append((pair_id, claim1, claim2, key))
+        return results, todo
+
+    def _batch_chunks(self, todo: List[Tuple]) -> List[List[Tuple]]:
+        """Greedily pack pairs into chunks under the prompt and output token limits."""
+        max_pairs = max(1, BATCH_MAX_OUTPUT_TOKENS // BATCH_TOKENS_PER_VERDICT)
+        chunks, chunk, chunk_tokens = [], [], 0
+        for item in todo:
+            tokens = estimate_tokens(item[1]) + estimate_tokens(item[2]) + 10
+            if chunk and (len(chunk) >= max_pairs or chunk_tokens + tokens > BATCH_MAX_PROMPT_TOKENS):
+                chunks.append(chunk)
+                chunk, chunk_tokens = [], 0
+            chunk.append(item)
+            chunk_tokens += tokens
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _batch_request(self, chunk: List[Tuple]) -> Dict:
+        listing = "\n\n".join(
+            f"p{n}:\n  Claim 1: {claim1}\n  Claim 2: {claim2}"
+            for n, (_, claim1, claim2, _) in enumerate(chunk, 1)
+        )
+        prompt = f"""For each numbered pair below, decide whether the two claims contradict each other.
+
+{listing}
+
+Give exactly one verdict per pair:
+[
+    {{"pair": "p1", "contradicts": true|false, "explanation": "brief explanation", "severity": "direct|implicit|none"}}
+]"""
+
+        return structured_request({
+            "model": self.model,
+            "max_tokens": min(BATCH_MAX_OUTPUT_TOKENS, BATCH_TOKENS_PER_VERDICT * len(chunk) + 100),
+            "messages": [{"role": "user", "content": prompt}]
+        }, "detect_contradictions")
+
+    def _parse_batch(self, payload: Any, chunk: List[Tuple]) -> Dict[str, Dict]:
+        """Valid verdicts by local pair ref ("p1", ...); malformed entries are dropped."""
+        # Validated per entry, so one bad verdict only costs a retry of its own pair
+        try:
+            entries = extract_json(payload) if isinstance(payload, str) else payload
+        except StructuredOutputError as e:
+            telemetry.record_parse_failure("detect_contradictions", e)
+            raise
+        if isinstance(entries, dict):
+            entries = entries.get("items", [])
+        if not isinstance(entries, list):
+            return {}
+
+        verdicts = {}
+        refs = {f"p{n}" for n in range(1, len(chunk) + 1)}
+        entry_schema = SCHEMAS["detect_contradictions"]["properties"]["items"]["items"]
+        for entry in entries:
+            errors = validate(entry, entry_schema)
+            if errors or entry["pair"] not in refs:
+                telemetry.record_parse_failure(
+                    "detect_contradictions", StructuredOutputError("; ".join(errors) or "unknown pair"))
+                continue
+            verdicts[entry["pair"]] = {
+                "contradicts": entry["contradicts"],
+                "explanation": str(entry.get("explanation", "")),
+                "severity": entry["severity"]
+            }
+        return verdicts
+
+    def _batch_collect(self, chunks: List[List[Tuple]], outcomes, results: Dict,
+                       attempt: int, max_retries: int) -> List[Tuple]:
+        """Record each chunk's verdicts; return the pairs to retry."""
+        retry = []
+        for chunk, outcome in zip(chunks, outcomes):
+            for n, (pair_id, _, _, key) in enumerate(chunk, 1):
+                verdict = outcome.get(f"p{n}") if isinstance(outcome, dict) else None
+                if verdict is not None:
+                    results[pair_id] = verdict
+                    self.cache.set("detect_contradictions", key, verdict)
+                elif attempt < max_retries:
+                    retry.append(chunk[n - 1])
+                else:
+                    error = str(outcome) if isinstance(outcome, Exception) else "No verdict returned for pair"
+                    results[pair_id] = {"error": error}
+        return retry
+
+    def _candidate_pairs(self, claims: List[str], top_k: int, new_from: int = 0) -> List[Tuple[int, int, float]]:
+        # Imported here: numpy is only needed once contradictions are checked
+        from .claim_index import ClaimIndex
+
+        index = ClaimIndex()
+        index.add(claims)
+        return index.candidate_pairs(top_k=top_k, new_from=new_from)
+
+    @staticmethod
+    def _contradiction_entry(first: int, second: int, score: float, verdict: Dict) -> Dict:
+        return {
+            "claim_1_id": first,
+            "claim_2_id": second,
+            "explanation": verdict.get("explanation", ""),
+            "severity": verdict.get("severity", "implicit"),
+            "index_score": round(score, 3)
+        }
+
+    def extract_claims(self, text: str) -> List[str]:
+        """Extract explicit claims from a piece of text."""
+        try:
+            request = self._claims_request(normalize_text(text))
+            return self._call("extract_claims", request, self._parse_claims)
+
+        except Exception as e:
+            return []
+
+    def _call(self, method: str, request: Dict, parse):
+        """Serve from the response cache, or call the API and cache a parsed result."""
+        key = self.cache.key(method, request)
+        cached = self.cache.get(method, key)
+        if cached is not None:
+            return cached
+
+        response = self.client.messages.create(**request)
+        result = parse(response_payload(response))
+        if is_cacheable(result) and result != UNPARSED_CONTRADICTION:
+            self.cache.set(method, key, result)
+        return result
+
+    def _check_history(self, history: List[Dict[str, str]]) -> Optional[Dict]:
+        """Return the early result for a dialogue too short to analyze, else None."""
         if len(history) < 2:
             return {"error": "Not enough dialogue history to analyze"}
 
@@ -29,7 +279,9 @@ class ArgumentAnalyzer:
 
         if len(user_messages) < 2:
             return {"claims": [], "contradictions": [], "fallacies": [], "quality": "insufficient"}
+        return None
 
+    def _analysis_request(self, history: List[Dict[str, str]]) -> Dict:
         # Build analysis prompt
         dialogue_text = self._format_dialogue(history)
 
@@ -57,28 +309,19 @@ Provide analysis in JSON format:
 
 Focus on the user's claims and reasoning. Be precise and fair."""
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2000,
-                messages=[{"role": "user", "content": analysis_prompt}]
-            )
-
-            # Extract JSON from response
-            content = response.content[0].text
-            json_match = re.search(r'\{[\s\S]*\}', content)
-
-            if json_match:
-                analysis = json.loads(json_match.group())
-                return analysis
-            else:
-                return {"error": "Could not parse analysis", "raw": content}
+        return structured_request({
+            "model": self.model,
+            "max_tokens": 2000,
+            "messages": [{"role": "user", "content": analysis_prompt}]
+        }, "analyze_dialogue")
 
-        except Exception as e:
-            return {"error": str(e)}
+    def _parse_analysis(self, payload: Any, method: str = "analyze_dialogue") -> Dict:
+        try:
+            return parse_structured(payload, method)
+        except StructuredOutputError:
+            return {"error": "Could not parse analysis", "raw": payload}
 
-    def detect_contradiction(self, claim1: str, claim2: str) -> Dict:
-        """Check if two claims contradict each other."""
+    def _contradiction_request(self, claim1: str, claim2: str) -> Dict:
         prompt = f"""Do these two claims contradict each other? Respond in JSON.
 
 Claim 1: {claim1}
@@ -91,25 +334,19 @@ Format:
     "severity": "direct|implicit|none"
 }}"""
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=300,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            content = response.content[0].text
-            json_match = re.search(r'\{[\s\S]*\}', content)
-
-            if json_match:
-                return json.loads(json_match.group())
-            return {"contradicts": False, "explanation": "Could not analyze", "severity": "none"}
+        return structured_request({
+            "model": self.model,
+            "max_tokens": 300,
+            "messages": [{"role": "user", "content": prompt}]
+        }, "detect_contradiction")
 
-        except Exception as e:
-            return {"error": str(e)}
+    def _parse_contradiction(self, payload: Any) -> Dict:
+        try:
+            return parse_structured(payload, "detect_contradiction")
+        except StructuredOutputError:
+            return dict(UNPARSED_CONTRADICTION)
 
-    def extract_claims(self, text: str) -> List[str]:
-        """Extract explicit claims from a piece of text."""
+    def _claims_request(self, text: str) -> Dict:
         prompt = f"""Extract the explicit claims or assertions from this text.
 Return as a JSON array of strings.
 
@@ -119,21 +356,16 @@ Format: ["claim 1", "claim 2", ...]
 
 Only include factual or normative claims, not questions or acknowledgments."""
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=500,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            content = response.content[0].text
-            json_match = re.search(r'\[[\s\S]*\]', content)
+        return structured_request({
+            "model": self.model,
+            "max_tokens": 500,
+            "messages": [{"role": "user", "content": prompt}]
+        }, "extract_claims")
 
-            if json_match:
-                return json.loads(json_match.group())
-            return []
-
-        except Exception as e:
+    def _parse_claims(self, payload: Any) -> List[str]:
+        try:
+            return parse_structured(payload, "extract_claims")
+        except StructuredOutputError:
             return []
 
     def generate_argument_graph(self, analysis: Dict) -> Dict:
@@ -182,6 +414,207 @@ Only include factual or normative claims, not questions or acknowledgments."""
         return "\n\n".join(lines)
 
 
+class IncrementalArgumentAnalyzer(ArgumentAnalyzer):
+    """
+    Stateful analyzer for one dialogue. Keeps a claim store with stable IDs
+    and sends only the turns added since the last run, so each analysis costs
+    in proportion to the new turns rather than to the whole dialogue. The
+    prompt carries no earlier claims: new claims are checked against the
+    store with find_contradictions, which sends only the top-ranked pairs.
+
+    analyze_dialogue returns the same structure as ArgumentAnalyzer, so
+    generate_argument_graph works unchanged.
+    """
+
+    def __init__(self, api_key: Optional[str] = None):
+        super().__init__(api_key=api_key)
+        self._generation = 0
+        self.reset()
+
+    def reset(self):
+        self.claims: List[Dict] = []
+        self.contradictions: List[Dict] = []
+        self.fallacies: List[Dict] = []
+        self.summary = {
+            "argument_strength": "weak",
+            "consistency_score": 100,
+            "aporia_reached": False,
+            "key_insights": []
+        }
+        self.analyzed_upto = 0
+        self.checked_claims = 0  # claims already checked for contradictions
+        self._last_seen = None  # content of history[analyzed_upto - 1]
+        self._generation += 1
+
+    def analyze_dialogue(self, history: List[Dict[str, str]]) -> Dict:
+        """Analyze turns added since the last call and merge them into the store."""
+        insufficient = self._check_history(history)
+        if insufficient is not None:
+            return insufficient
+
+        request = self._delta_request(history)
+        if request is None:
+            return self.snapshot(new_turns=0)
+
+        start, upto, kwargs = request
+        try:
+            response = self.client.messages.create(**kwargs)
+            result = self._merge(response_payload(response), start, upto, history)
+            if result is None:
+                self._check_contradictions()
+                result = self.snapshot(new_turns=upto - start)
+            return result
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def analyze_dialogue_stream(self, history: List[Dict[str, str]]) -> Iterator[Tuple[str, Dict]]:
+        """Streamed analyze_dialogue: partials are the delta for the new turns."""
+        insufficient = self._check_history(history)
+        if insufficient is not None:
+            yield "result", insufficient
+            return
+
+        request = self._delta_request(history)
+        if request is None:
+            yield "result", self.snapshot(new_turns=0)
+            return
+
+        start, upto, kwargs = request
+        try:
+            stream = StructuredStream()
+            for partial in stream.run(self.client, kwargs):
+                yield "partial", partial
+            result = self._merge(response_payload(stream.final), start, upto, history)
+            if result is None:
+                self._check_contradictions()
+                result = self.snapshot(new_turns=upto - start)
+            yield "result", result
+
+        except Exception as e:
+            yield "result", {"error": str(e)}
+
+    def snapshot(self, new_turns: int = 0) -> Dict:
+        """The merged analysis, in analyze_dialogue's format."""
+        return {
+            "claims": [dict(claim) for claim in self.claims],
+            "contradictions": [dict(c) for c in self.contradictions],
+            "fallacies": [dict(f) for f in self.fallacies],
+            **self.summary,
+            "key_insights": list(self.summary["key_insights"]),
+            "analyzed_turns": self.analyzed_upto,
+            "new_turns": new_turns
+        }
+
+    def _sync(self, history: List[Dict[str, str]]):
+        """Start over if the history was replaced (reset or new topic) since the last run."""
+        if self.analyzed_upto > len(history) or (
+                self.analyzed_upto and history[self.analyzed_upto - 1]["content"] != self._last_seen):
+            self.reset()
+
+    def _delta_request(self, history: List[Dict[str, str]]) -> Optional[tuple]:
+        self._sync(history)
+        start, upto = self.analyzed_upto, len(history)
+        if upto <= start:
+            return None
+
+        context = ""
+        if start > 0:
+            context = f"Preceding turn, for context only:\n{self._format_turn(start, history[start - 1])}\n\n"
+        new_turns = "\n\n".join(
+            self._format_turn(i, msg) for i, msg in enumerate(history[start:upto], start + 1)
+        )
+
+        prompt = f"""You are incrementally analyzing a philosophical dialogue for logical structure.
+
+Current assessment: strength {self.summary["argument_strength"]}, consistency {self.summary["consistency_score"]}, aporia {"reached" if self.summary["aporia_reached"] else "not reached"}.
+Contradictions found so far: {len(self.contradictions)}.
+Key insights so far: {json.dumps(self.summary["key_insights"])}
+
+{context}New turns:
+{new_turns}
+
+Analyze ONLY the new turns. Provide JSON:
+{{
+    "new_claims": [
+        {{"text": "brief claim", "speaker": "user", "turn": {start + 1}}}
+    ],
+    "fallacies": [
+        {{"turn": {start + 1}, "type": "ad hominem", "explanation": "attacks character not argument"}}
+    ],
+    "argument_strength": "weak|moderate|strong",
+    "consistency_score": 0-100,
+    "aporia_reached": true|false,
+    "key_insights": ["updated insight 1", "updated insight 2"]
+}}
+
+State each claim on its own, so it can be compared with claims from other turns.
+Update the assessment and insights to cover the whole dialogue so far.
+Focus on the user's claims and reasoning. Be precise and fair."""
+
+        return start, upto, structured_request({
+            "model": self.model,
+            "max_tokens": 1200,
+            "messages": [{"role": "user", "content": prompt}]
+        }, "incremental_analysis")
+
+    def _merge(self, payload: Any, start: int, upto: int, history: List[Dict[str, str]]) -> Optional[Dict]:
+        """Add the delta to the store; returns the result to use instead if it was not merged."""
+        delta = self._parse_analysis(payload, "incremental_analysis")
+        if "error" in delta:
+            return delta
+        if self.analyzed_upto != start:
+            # Another analysis of the same turns finished first
+            return self.snapshot(new_turns=0)
+
+        next_id = max((claim["id"] for claim in self.claims), default=0) + 1
+        for claim in delta.get("new_claims", []):
+            self.claims.append({
+                "id": next_id,
+                "text": claim.get("text", ""),
+                "speaker": claim.get("speaker", "user"),
+                "turn": claim.get("turn", upto)
+            })
+            next_id += 1
+
+        self.fallacies.extend(delta.get("fallacies", []))
+        for field in self.summary:
+            if field in delta:
+                self.summary[field] = delta[field]
+
+        self.analyzed_upto = upto
+        self._last_seen = history[upto - 1]["content"]
+        return None
+
+    def _check_contradictions(self):
+        """Check the claims added since the last check against all the others."""
+        pending = self._unchecked_claims()
+        if pending is not None:
+            generation, texts, new_from = pending
+            self._record_contradictions(
+                generation, self.find_contradictions(texts, INCREMENTAL_CHECK_PAIRS, new_from))
+
+    def _unchecked_claims(self) -> Optional[tuple]:
+        """(generation, all claim texts, position of the first unchecked claim), marking them checked."""
+        if self.checked_claims >= len(self.claims):
+            return None
+        new_from, self.checked_claims = self.checked_claims, len(self.claims)
+        return self._generation, [claim["text"] for claim in self.claims], new_from
+
+    def _record_contradictions(self, generation: int, found: List[Dict]):
+        if generation != self._generation:
+            return  # the store was reset while the pairs were being checked
+        for entry in found:
+            entry["claim_1_id"] = self.claims[entry["claim_1_id"]]["id"]
+            entry["claim_2_id"] = self.claims[entry["claim_2_id"]]["id"]
+            self.contradictions.append(entry)
+
+    @staticmethod
+    def _format_turn(number: int, msg: Dict[str, str]) -> str:
+        speaker = "User" if msg["role"] == "user" else "Philosopher"
+        return f"Turn {number} ({speaker}): {msg['content']}"
+
+
 def quick_analyze(history: List[Dict[str, str]], api_key: Optional[str] = None) -> Dict:
     """Quick analysis function for easy import."""
     analyzer = ArgumentAnalyzer(api_key=api_key)
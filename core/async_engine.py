@@ -0,0 +1,489 @@
+"""
+Async Engine
+asyncio counterparts of the core classes, built on anthropic.AsyncAnthropic.
+Same public API as the synchronous classes, with every API-calling method awaitable.
+"""
+
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .clients import get_async_client
+from .scheduler import ANALYSIS, BATCH
+from .context_window import ContextWindow
+from .prompt_cache import usage_dict
+from .response_cache import is_cacheable, normalize_text
+from .structured import StructuredStream, response_payload
+from .socrates import SocraticDialogue
+from .adaptive_difficulty import UserProfiler, AdaptiveSocraticDialogue
+from .argument_analyzer import (
+    INCREMENTAL_CHECK_PAIRS, UNPARSED_CONTRADICTION, ArgumentAnalyzer, IncrementalArgumentAnalyzer,
+)
+from .threat_interrogator import ThreatInterrogator
+from .debate_mode import DebateModerator
+
+
+class AsyncContextWindow(ContextWindow):
+    """ContextWindow that folds turns with the async client."""
+
+    async def update(self, history: List[Dict[str, str]]):
+        request = self._fold_request(history)
+        if request is None:
+            return
+        upto, kwargs = request
+        try:
+            response = await self.client.messages.create(**kwargs)
+        except Exception:
+            return
+        self._apply(response.content[0].text, upto)
+
+
+class AsyncSocraticDialogue(SocraticDialogue):
+    """
+    SocraticDialogue whose replies are awaited instead of blocking. Journal
+    writes (core.dialogue_store) run in a worker thread, so a worker waiting
+    on another's SQLite write lock does not stall the event loop; set_topic,
+    use_opening and reset are awaitable for that reason.
+    """
+
+    def __init__(self, api_key: Optional[str] = None):
+        super().__init__(api_key=api_key)
+        self.client = get_async_client(api_key)
+        self.context = AsyncContextWindow(self.client, self.model)
+
+    async def set_topic(self, topic_key: str, custom_topic: str = None, security: bool = False):
+        self._set_topic(topic_key, custom_topic, security)
+        await self._in_thread(self._start_journal)
+        return self.topic
+
+    async def use_opening(self, opening: str) -> str:
+        self._add_opening(opening)
+        await self._in_thread(self._commit)
+        return opening
+
+    async def reset(self):
+        self._reset()
+        await self._in_thread(self._start_journal)
+
+    async def _in_thread(self, write):
+        # Without a journal there is nothing to write: skip the thread hop
+        if self.journal is not None:
+            await asyncio.to_thread(write)
+
+    async def respond(self, user_input: str) -> str:
+        self.history.append({
+            "role": "user",
+            "content": user_input
+        })
+        await self.context.update(self.history)
+
+        try:
+            response = await self.client.messages.create(**self._request())
+        except Exception:
+            # Leave history alternating; the user can resend
+            self.history.pop()
+            raise
+        self.last_usage = usage_dict(response.usage)
+
+        assistant_message = response.content[0].text
+        self.history.append({
+            "role": "assistant",
+            "content": assistant_message
+        })
+        await self._in_thread(self._commit)
+
+        return assistant_message
+
+    async def respond_stream(self, user_input: str) -> AsyncIterator[str]:
+        """
+        Stream the philosopher's reply as text deltas.
+        The full reply is committed to history once the stream finishes;
+        if it fails midway, the user turn is dropped and nothing is kept.
+        """
+        self.history.append({
+            "role": "user",
+            "content": user_input
+        })
+        await self.context.update(self.history)
+
+        chunks = []
+        completed = False
+        try:
+            async with self.client.messages.stream(**self._request()) as stream:
+                async for text in stream.text_stream:
+                    chunks.append(text)
+                    yield text
+                self.last_usage = usage_dict((await stream.get_final_message()).usage)
+            completed = True
+        finally:
+            if self._end_stream(chunks, completed):
+                await self._in_thread(self._commit)
+
+    async def get_opening(self) -> str:
+        """Get the philosopher's opening question for the topic."""
+        return await self.respond(self._opening_prompt())
+
+    def get_opening_stream(self) -> AsyncIterator[str]:
+        """Stream the philosopher's opening question for the topic."""
+        return self.respond_stream(self._opening_prompt())
+
+
+class AsyncUserProfiler(UserProfiler):
+    """UserProfiler on the async client."""
+
+    def __init__(self, api_key: Optional[str] = None):
+        super().__init__(api_key=api_key)
+        self.client = get_async_client(api_key, ANALYSIS)
+
+    async def assess_sophistication(self, history: List[Dict[str, str]]) -> Dict:
+        assessment_prompt = self._assessment_prompt(history)
+        if assessment_prompt is None:
+            return {"level": "beginner", "score": 30, "indicators": []}
+
+        try:
+            response = await self.client.messages.create(**self._request(assessment_prompt))
+            return self._parse_assessment(response_payload(response))
+
+        except Exception as e:
+            return {"level": "intermediate", "score": 50, "indicators": [], "error": str(e)}
+
+
+class AsyncAdaptiveSocraticDialogue(AdaptiveSocraticDialogue):
+    """Adaptive difficulty over an AsyncSocraticDialogue."""
+
+    def __init__(self, base_dialogue: AsyncSocraticDialogue, api_key: Optional[str] = None):
+        super().__init__(base_dialogue, api_key=api_key)
+        self.profiler = AsyncUserProfiler(api_key=api_key)
+
+    async def update_difficulty(self):
+        """Update difficulty based on conversation history."""
+        if len(self.base_dialogue.history) >= 4:
+            assessment = await self.profiler.assess_sophistication(self.base_dialogue.history)
+            self._apply_assessment(assessment)
+            return assessment
+        return None
+
+    def schedule_reassessment(self) -> bool:
+        """Reassess difficulty in a background task; applies from the next turn."""
+        def start(token):
+            task = asyncio.get_running_loop().create_task(self.profiler.assess_sophistication(token[2]))
+            task.add_done_callback(lambda t: self._finish_reassessment(token, t))
+            return task
+
+        return self._begin_reassessment(start) is not None
+
+    async def respond(self, user_input: str) -> str:
+        """Respond with adaptive difficulty."""
+        if self._reassessment_due():
+            self.schedule_reassessment()
+
+        with self._adapted_prompt():
+            return await self.base_dialogue.respond(user_input)
+
+    async def respond_stream(self, user_input: str) -> AsyncIterator[str]:
+        """Stream a response with adaptive difficulty, yielding text deltas."""
+        if self._reassessment_due():
+            self.schedule_reassessment()
+
+        with self._adapted_prompt():
+            async for delta in self.base_dialogue.respond_stream(user_input):
+                yield delta
+
+
+class AsyncArgumentAnalyzer(ArgumentAnalyzer):
+    """ArgumentAnalyzer on the async client."""
+
+    def __init__(self, api_key: Optional[str] = None):
+        super().__init__(api_key=api_key)
+        self.client = get_async_client(api_key, ANALYSIS)
+
+    async def _call(self, method: str, request: Dict, parse):
+        key = self.cache.key(method, request)
+        cached = await self.cache.aget(method, key)
+        if cached is not None:
+            return cached
+
+        response = await self.client.messages.create(**request)
+        result = parse(response_payload(response))
+        if is_cacheable(result) and result != UNPARSED_CONTRADICTION:
+            await self.cache.aset(method, key, result)
+        return result
+
+    async def analyze_dialogue(self, history: List[Dict[str, str]]) -> Dict:
+        insufficient = self._check_history(history)
+        if insufficient is not None:
+            return insufficient
+
+        try:
+            response = await self.client.messages.create(**self._analysis_request(history))
+            return self._parse_analysis(response_payload(response))
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def analyze_dialogue_stream(self, history: List[Dict[str, str]]) -> AsyncIterator[Tuple[str, Dict]]:
+        insufficient = self._check_history(history)
+        if insufficient is not None:
+            yield "result", insufficient
+            return
+
+        try:
+            stream = StructuredStream()
+            async for partial in stream.arun(self.client, self._analysis_request(history)):
+                yield "partial", partial
+            yield "result", self._parse_analysis(response_payload(stream.final))
+
+        except Exception as e:
+            yield "result", {"error": str(e)}
+
+    async def detect_contradiction(self, claim1: str, claim2: str) -> Dict:
+        try:
+            request = self._contradiction_request(normalize_text(claim1), normalize_text(claim2))
+            return await self._call("detect_contradiction", request, self._parse_contradiction)
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def find_contradictions(self, claims: List[str], top_k: int = 10, new_from: int = 0) -> List[Dict]:
+        pairs = self._candidate_pairs(claims, top_k, new_from)
+        verdicts = await self.detect_contradictions({
+            (first, second): (claims[first], claims[second]) for first, second, _ in pairs
+        })
+        return [
+            self._contradiction_entry(first, second, score, verdicts[(first, second)])
+            for first, second, score in pairs
+            if verdicts[(first, second)].get("contradicts")
+        ]
+
+    async def _cache_io(self, work, *args):
+        """Run batch cache lookups or writes in a thread when they reach the disk tier."""
+        if self.cache.persistent:
+            return await asyncio.to_thread(work, *args)
+        return work(*args)
+
+    async def detect_contradictions(self, pairs, concurrency: int = 4, max_retries: int = 2) -> Dict:
+        results, todo = await self._cache_io(self._batch_lookup, pairs)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(chunk):
+            async with semaphore:
+                try:
+                    response = await self.client.messages.create(**self._batch_request(chunk))
+                    return self._parse_batch(response_payload(response), chunk)
+                except Exception as e:
+                    return e
+
+        attempt = 0
+        while todo:
+            chunks = self._batch_chunks(todo)
+            outcomes = await asyncio.gather(*(run(chunk) for chunk in chunks))
+            todo = await self._cache_io(self._batch_collect, chunks, outcomes, results, attempt, max_retries)
+            attempt += 1
+        return results
+
+    async def extract_claims(self, text: str) -> List[str]:
+        try:
+            request = self._claims_request(normalize_text(text))
+            return await self._call("extract_claims", request, self._parse_claims)
+
+        except Exception as e:
+            return []
+
+
+class AsyncIncrementalArgumentAnalyzer(IncrementalArgumentAnalyzer, AsyncArgumentAnalyzer):
+    """
+    IncrementalArgumentAnalyzer on the async client; contradiction checks use
+    AsyncArgumentAnalyzer's batched find_contradictions.
+    """
+
+    async def analyze_dialogue(self, history: List[Dict[str, str]]) -> Dict:
+        insufficient = self._check_history(history)
+        if insufficient is not None:
+            return insufficient
+
+        request = self._delta_request(history)
+        if request is None:
+            return self.snapshot(new_turns=0)
+
+        start, upto, kwargs = request
+        try:
+            response = await self.client.messages.create(**kwargs)
+            result = self._merge(response_payload(response), start, upto, history)
+            if result is None:
+                await self._check_contradictions()
+                result = self.snapshot(new_turns=upto - start)
+            return result
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def analyze_dialogue_stream(self, history: List[Dict[str, str]]) -> AsyncIterator[Tuple[str, Dict]]:
+        insufficient = self._check_history(history)
+        if insufficient is not None:
+            yield "result", insufficient
+            return
+
+        request = self._delta_request(history)
+        if request is None:
+            yield "result", self.snapshot(new_turns=0)
+            return
+
+        start, upto, kwargs = request
+        try:
+            stream = StructuredStream()
+            async for partial in stream.arun(self.client, kwargs):
+                yield "partial", partial
+            result = self._merge(response_payload(stream.final), start, upto, history)
+            if result is None:
+                await self._check_contradictions()
+                result = self.snapshot(new_turns=upto - start)
+            yield "result", result
+
+        except Exception as e:
+            yield "result", {"error": str(e)}
+
+    async def _check_contradictions(self):
+        pending = self._unchecked_claims()
+        if pending is not None:
+            generation, texts, new_from = pending
+            self._record_contradictions(
+                generation, await self.find_contradictions(texts, INCREMENTAL_CHECK_PAIRS, new_from))
+
+
+class AsyncThreatInterrogator(ThreatInterrogator):
+    """ThreatInterrogator on the async client."""
+
+    def __init__(self, api_key: Optional[str] = None):
+        super().__init__(api_key=api_key)
+        self.client = get_async_client(api_key, ANALYSIS)
+
+    async def _call(self, method: str, request: Dict, parse):
+        key = self.cache.key(method, request)
+        cached = await self.cache.aget(method, key)
+        if cached is not None:
+            return cached
+
+        response = await self.client.messages.create(**request)
+        result = parse(response_payload(response), method)
+        if is_cacheable(result):
+            await self.cache.aset(method, key, result)
+        return result
+
+    async def _call_object(self, method: str, request: Dict) -> Dict:
+        try:
+            return await self._call(method, request, self._parse_object)
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def analyze_threat_model_stream(self, threat_description: str) -> AsyncIterator[Tuple[str, Dict]]:
+        try:
+            request = self._threat_model_request(normalize_text(threat_description))
+            key = self.cache.key("analyze_threat_model", request)
+            cached = await self.cache.aget("analyze_threat_model", key)
+            if cached is not None:
+                yield "result", cached
+                return
+
+            stream = StructuredStream()
+            async for partial in stream.arun(self.client, request):
+                yield "partial", partial
+            result = self._parse_object(response_payload(stream.final), "analyze_threat_model")
+            if is_cacheable(result):
+                await self.cache.aset("analyze_threat_model", key, result)
+            yield "result", result
+
+        except Exception as e:
+            yield "result", {"error": str(e)}
+
+    async def analyze_threat_model(self, threat_description: str) -> Dict:
+        return await self._call_object(
+            "analyze_threat_model",
+            self._threat_model_request(normalize_text(threat_description))
+        )
+
+    async def interrogate_control(self, control_description: str, context: str = "") -> Dict:
+        return await self._call_object(
+            "interrogate_control",
+            self._control_request(normalize_text(control_description), normalize_text(context))
+        )
+
+    async def challenge_assumptions(self, security_claim: str) -> List[str]:
+        try:
+            request = self._challenge_request(normalize_text(security_claim))
+            return await self._call("challenge_assumptions", request, self._parse_list)
+
+        except Exception as e:
+            return []
+
+    async def red_team_questions(self, system_description: str) -> Dict:
+        return await self._call_object(
+            "red_team_questions",
+            self._red_team_request(normalize_text(system_description))
+        )
+
+    async def compliance_vs_security(self, requirement: str, implementation: str) -> Dict:
+        return await self._call_object(
+            "compliance_vs_security",
+            self._compliance_request(normalize_text(requirement), normalize_text(implementation))
+        )
+
+
+class AsyncDebateModerator(DebateModerator):
+    """DebateModerator on the async client."""
+
+    def __init__(self, api_key: Optional[str] = None):
+        super().__init__(api_key=api_key)
+        self.client = get_async_client(api_key, BATCH)
+
+    async def run_debate(self, turns: int = 6) -> List[Dict]:
+        return [entry async for kind, entry in self.run_debate_stream(turns, stream_tokens=False) if kind == "turn"]
+
+    async def run_debate_stream(self, turns: int = 6,
+                                stream_tokens: bool = True) -> AsyncIterator[Tuple[str, Dict]]:
+        for turn in range(1, turns + 1):
+            side, request = self._plan_turn(turn)
+            if not stream_tokens:
+                message = await self._get_response(request)
+            else:
+                chunks = []
+                async for text in self._stream_response(request):
+                    chunks.append(text)
+                    yield "token", {"turn": turn, "mode": side.mode, "text": text}
+                message = "".join(chunks)
+            yield "turn", self._record_turn(turn, side, message)
+
+    async def _get_response(self, request: Dict) -> str:
+        response = await self.client.messages.create(**request)
+        return response.content[0].text
+
+    async def _stream_response(self, request: Dict) -> AsyncIterator[str]:
+        async with self.client.messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    async def judge_debate(self) -> Dict:
+        if len(self.debate_history) < 2:
+            return {"error": "Not enough debate history"}
+
+        try:
+            response = await self.client.messages.create(**self._judge_request())
+            return self._parse_judgment(response_payload(response))
+
+        except Exception as e:
+            return {"error": str(e)}
+
+
+async def quick_debate(topic: str, mode_a: str = "socratic", mode_b: str = "nietzschean",
+                       position_a: str = "Yes", position_b: str = "No",
+                       turns: int = 6, api_key: Optional[str] = None) -> Dict:
+    """Run a quick debate and return results."""
+    moderator = AsyncDebateModerator(api_key=api_key)
+    moderator.setup_debate(topic, mode_a, mode_b, position_a, position_b)
+    debate_log = await moderator.run_debate(turns=turns)
+    judgment = await moderator.judge_debate()
+
+    return {
+        "topic": topic,
+        "debate": debate_log,
+        "judgment": judgment
+    }
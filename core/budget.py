@@ -0,0 +1,177 @@
+"""
+Token Budgets
+Caps on the tokens one session, or one HTTP request, may consume.
+
+The web apps make a session's budget and the current route's budget active
+for the duration of each request (a context variable, so analyzer threads
+and background reassessments started by the request are charged too).
+ScheduledMessages then fits every call into the smallest remaining budget:
+
+- preflight: input tokens are estimated locally, and counted exactly with
+  messages.count_tokens once the call is near what is left
+- pressure: in the last LOW_WATER share of a budget, max_tokens shrinks in
+  proportion and the oldest turns are dropped from the context
+- a call that cannot fit even with the context trimmed to its latest turn
+  raises BudgetExceeded instead of being sent
+
+Usage (input, output and cache tokens) is charged to every active budget.
+"""
+
+import contextvars
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .context_window import estimate_tokens
+
+# Budget share below which replies and context start to shrink
+LOW_WATER = 0.2
+# Replies never shrink below this many tokens
+MIN_OUTPUT_TOKENS = 64
+# Under pressure, input may use at most this share of what is left
+CONTEXT_SHARE = 0.5
+# Count exactly when the local estimate uses this share of what is left
+PREFLIGHT_SHARE = 0.5
+
+SESSION_TOKEN_BUDGET = int(os.environ.get("SESSION_TOKEN_BUDGET", 500_000))
+
+# Tokens one request to each route may use
+ROUTE_TOKEN_BUDGETS: Dict[str, int] = {
+    "/api/start": 10_000,
+    "/api/respond": 20_000,
+    "/api/respond/stream": 20_000,
+    "/api/analyze": 40_000,
+    "/api/analyze/stream": 40_000,
+    "/api/threat/analyze": 20_000,
+    "/api/threat/analyze/stream": 20_000,
+    "/api/threat/control": 20_000,
+    "/api/threat/challenge": 10_000,
+    "/api/debate/start": 60_000,
+    "/api/debate/stream": 60_000,
+    # One run over every session; charged to this cap only, not a user's session
+    "/api/admin/analysis": int(os.environ.get("ANALYSIS_TOKEN_BUDGET", 2_000_000)),
+}
+
+MAX_DEBATE_TURNS = int(os.environ.get("DEBATE_MAX_TURNS", 12))
+
+_active: contextvars.ContextVar[Tuple["TokenBudget", ...]] = contextvars.ContextVar("token_budgets", default=())
+
+
+class BudgetExceeded(Exception):
+    """A call does not fit in the remaining budget."""
+
+    def __init__(self, budget: "TokenBudget", needed: int):
+        super().__init__(f"Token budget exhausted ({budget.name}): {budget.remaining} tokens left, "
+                         f"{needed} needed")
+        self.budget = budget
+        self.needed = needed
+
+
+class TokenBudget:
+    """A token allowance, charged as calls complete. Thread-safe."""
+
+    def __init__(self, limit: int, name: str = "session"):
+        self.name = name
+        self.limit = limit
+        self.used = 0
+        # Calls turned away because they did not fit
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return max(self.limit - self.used, 0)
+
+    @property
+    def pressure(self) -> float:
+        """1.0 until the last LOW_WATER of the budget, then falling to 0."""
+        low_water = self.limit * LOW_WATER
+        return min(1.0, self.remaining / low_water) if low_water else 1.0
+
+    def charge(self, tokens: int):
+        with self._lock:
+            self.used += tokens
+
+    def to_dict(self) -> Dict:
+        return {"limit": self.limit, "used": self.used, "remaining": self.remaining}
+
+
+def use_budgets(*budgets: Optional[TokenBudget]):
+    """Make budgets active for the rest of the current context (one HTTP request)."""
+    _active.set(tuple(b for b in budgets if b is not None))
+
+
+def active_budgets() -> Tuple[TokenBudget, ...]:
+    return _active.get()
+
+
+def usage_tokens(usage) -> int:
+    return sum(getattr(usage, name, 0) or 0 for name in (
+        "input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"))
+
+
+def charge(budgets: Tuple[TokenBudget, ...], usage):
+    tokens = usage_tokens(usage)
+    for budget in budgets:
+        budget.charge(tokens)
+
+
+def needs_count(request: Dict, estimate: int, budgets: Tuple[TokenBudget, ...]) -> bool:
+    """Whether the local estimate is too close to the limit to trust."""
+    remaining = min(b.remaining for b in budgets)
+    return estimate + request.get("max_tokens", 0) > remaining * PREFLIGHT_SHARE
+
+
+def count_request(request: Dict) -> Dict:
+    """The arguments messages.count_tokens accepts, taken from a create request."""
+    return {key: request[key] for key in ("model", "system", "messages", "tools", "tool_choice") if key in request}
+
+
+def fit_request(request: Dict, input_tokens: int, budgets: Tuple[TokenBudget, ...]) -> Dict:
+    """
+    The request, shrunk to fit the tightest budget; raises BudgetExceeded.
+    Structured (tool) replies keep their max_tokens, since a truncated reply
+    would not parse.
+    """
+    tightest = min(budgets, key=lambda b: b.remaining)
+    remaining = tightest.remaining
+    pressure = min(b.pressure for b in budgets)
+
+    max_tokens = request["max_tokens"]
+    if pressure < 1 and "tool_choice" not in request:
+        max_tokens = max(MIN_OUTPUT_TOKENS, int(max_tokens * pressure))
+
+    messages: List[Dict] = list(request["messages"])
+    while len(messages) > 1 and (
+        input_tokens + max_tokens > remaining
+        or (pressure < 1 and input_tokens > remaining * CONTEXT_SHARE)
+    ):
+        # Drop the oldest exchange; the context must still open with a user turn
+        dropped = messages.pop(0)
+        input_tokens -= estimate_tokens(str(dropped["content"]))
+        while len(messages) > 1 and messages[0]["role"] != "user":
+            input_tokens -= estimate_tokens(str(messages.pop(0)["content"]))
+
+    if input_tokens + max_tokens > remaining:
+        tightest.refused += 1
+        raise BudgetExceeded(tightest, input_tokens + max_tokens)
+    if max_tokens == request["max_tokens"] and len(messages) == len(request["messages"]):
+        return request
+    return {**request, "max_tokens": max_tokens, "messages": messages}
+
+
+def clamp_debate_turns(value) -> int:
+    """Debate turns from a request body, bounded to 2..MAX_DEBATE_TURNS; raises ValueError."""
+    turns = int(value)
+    return max(2, min(turns, MAX_DEBATE_TURNS))
+
+
+def budget_report(session_budget: Optional[TokenBudget]) -> Optional[Dict]:
+    """Remaining budget for the client: the session's, and the current route's if any."""
+    if session_budget is None:
+        return None
+    report = session_budget.to_dict()
+    route = [b for b in active_budgets() if b.name != session_budget.name]
+    if route:
+        report["route"] = route[0].to_dict()
+    return report
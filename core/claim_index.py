@@ -0,0 +1,192 @@
+"""
+Claim Index
+Local, offline ranking of claim pairs by how likely they are to contradict,
+so only the most suspicious pairs are sent to detect_contradiction.
+
+Pairs are scored by TF-IDF cosine similarity (contradictions are about the
+same thing) boosted by negation mismatch and antonym cues (and say opposite
+things about it). Everything is vectorized over the whole claim set.
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+NEGATIONS = {
+    "not", "no", "never", "nothing", "none", "nobody", "nowhere", "neither",
+    "nor", "cannot", "without", "false",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "by", "for",
+    "with", "as", "is", "are", "was", "were", "be", "been", "being", "it", "its",
+    "this", "that", "these", "those", "we", "i", "you", "he", "she", "they", "them",
+    "our", "my", "your", "their", "do", "does", "did", "so", "if", "then", "than",
+    "there", "what", "which", "who", "whom", "from", "into", "about", "also",
+    "only", "very", "really", "can", "could", "should", "would", "will", "must", "may",
+    "might", "has", "have", "had", "all",
+}
+
+ANTONYMS = [
+    ("good", "bad"), ("good", "evil"), ("just", "unjust"), ("right", "wrong"),
+    ("true", "false"), ("free", "determined"), ("innate", "learned"), ("innate", "taught"),
+    ("objective", "subjective"), ("universal", "relative"), ("absolute", "relative"),
+    ("same", "different"), ("possible", "impossible"), ("necessary", "contingent"),
+    ("strong", "weak"), ("rational", "irrational"), ("moral", "immoral"),
+    ("virtue", "vice"), ("knowledge", "ignorance"), ("certain", "uncertain"),
+    ("secure", "insecure"), ("safe", "unsafe"), ("safe", "dangerous"),
+    ("encrypted", "plaintext"), ("public", "private"), ("more", "less"),
+    ("better", "worse"), ("love", "hate"), ("happy", "unhappy"), ("pleasure", "pain"),
+    ("reason", "emotion"), ("nature", "nurture"), ("accept", "reject"),
+    ("agree", "disagree"), ("allow", "forbid"), ("allow", "deny"), ("permit", "forbid"),
+    ("increase", "decrease"), ("increase", "reduce"), ("benefit", "harm"),
+    ("help", "harm"), ("cause", "prevent"), ("include", "exclude"), ("win", "lose"),
+    ("exist", "illusion"), ("real", "illusion"), ("voluntary", "compelled"),
+    ("equal", "unequal"), ("fair", "unfair"), ("wise", "foolish"), ("trust", "distrust"),
+    ("sufficient", "insufficient"), ("enough", "insufficient"),
+    ("mortal", "immortal"), ("finite", "infinite"),
+]
+
+# Prefixes that negate a word: "unjust" vs "just", "impossible" vs "possible"
+NEGATING_PREFIXES = ("un", "in", "im", "ir", "il", "dis", "non")
+
+_TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def _stem(word: str) -> str:
+    """Very light suffix stripping, enough to match plurals and tenses."""
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith("ss"):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> Tuple[List[str], int]:
+    """Content terms of a claim, and how many negations it contains."""
+    terms, negations = [], 0
+    for token in _TOKEN.findall(text.lower()):
+        if token.endswith("n't"):
+            negations += 1
+            token = token[:-3]
+            if token in ("ca", "wo", "do", "does", "did", "is", "are", "was", "were"):
+                continue
+        if token in NEGATIONS:
+            negations += 1
+        elif token not in STOPWORDS and len(token) > 1:
+            terms.append(_stem(token))
+    return terms, negations
+
+
+class ClaimIndex:
+    """
+    Claims in insertion order (their index is their ID). The TF-IDF matrix is
+    rebuilt lazily on the next ranking after claims are added.
+    """
+
+    def __init__(self, negation_weight: float = 1.0, antonym_weight: float = 1.0):
+        self.negation_weight = negation_weight
+        self.antonym_weight = antonym_weight
+        self.claims: List[str] = []
+        self._terms: List[List[str]] = []
+        self._negations: List[int] = []
+        self._scores: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.claims)
+
+    def add(self, claims: Iterable[str]) -> List[int]:
+        """Index more claims; returns their IDs."""
+        ids = []
+        for claim in claims:
+            terms, negations = tokenize(claim)
+            ids.append(len(self.claims))
+            self.claims.append(claim)
+            self._terms.append(terms)
+            self._negations.append(negations)
+        if ids:
+            self._scores = None
+        return ids
+
+    def scores(self) -> np.ndarray:
+        """n x n matrix of pair suspicion scores (zero on the diagonal)."""
+        if self._scores is None:
+            self._scores = self._score_matrix()
+        return self._scores
+
+    def candidate_pairs(self, top_k: int = 10, new_from: int = 0,
+                        min_score: float = 0.0) -> List[Tuple[int, int, float]]:
+        """
+        The top_k most suspicious pairs (i < j) as (i, j, score), best first.
+        With new_from, only pairs involving at least one claim at or after that
+        index are considered, i.e. new claims against everything before them.
+        """
+        n = len(self.claims)
+        if n < 2 or top_k <= 0:
+            return []
+
+        scores = self.scores()
+        i, j = np.triu_indices(n, k=1)
+        keep = j >= new_from
+        i, j = i[keep], j[keep]
+        pair_scores = scores[i, j]
+
+        keep = pair_scores > min_score
+        i, j, pair_scores = i[keep], j[keep], pair_scores[keep]
+        if len(pair_scores) > top_k:
+            top = np.argpartition(-pair_scores, top_k - 1)[:top_k]
+            i, j, pair_scores = i[top], j[top], pair_scores[top]
+
+        order = np.argsort(-pair_scores, kind="stable")
+        return [(int(i[k]), int(j[k]), float(pair_scores[k])) for k in order]
+
+    def _score_matrix(self) -> np.ndarray:
+        n = len(self.claims)
+        vocab = {}
+        for terms in self._terms:
+            for term in terms:
+                vocab.setdefault(term, len(vocab))
+
+        counts = np.zeros((n, max(len(vocab), 1)), dtype=np.float32)
+        for row, terms in enumerate(self._terms):
+            for term in terms:
+                counts[row, vocab[term]] += 1
+
+        presence = counts > 0
+        df = presence.sum(axis=0)
+        idf = np.log((1 + n) / (1 + df)) + 1
+        tfidf = counts * idf
+        norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+        tfidf /= np.where(norms == 0, 1, norms)
+        similarity = tfidf @ tfidf.T
+
+        negations = np.array(self._negations) % 2
+        negation_mismatch = (negations[:, None] != negations[None, :]).astype(np.float32)
+
+        antonyms = self._antonym_hits(presence.astype(np.float32), vocab)
+        cues = self.negation_weight * negation_mismatch + self.antonym_weight * np.minimum(antonyms, 2)
+
+        # Opposite wording lowers cosine, so the cue adds a little on its own too
+        scores = similarity * (1 + cues) + 0.05 * cues * (similarity > 0)
+        np.fill_diagonal(scores, 0)
+        return scores
+
+    def _antonym_hits(self, presence: np.ndarray, vocab: dict) -> np.ndarray:
+        """n x n count of antonym pairs split across the two claims."""
+        pairs = set()
+        for a, b in ANTONYMS:
+            a, b = _stem(a), _stem(b)
+            if a in vocab and b in vocab:
+                pairs.add((vocab[a], vocab[b]))
+        for word, column in vocab.items():
+            for prefix in NEGATING_PREFIXES:
+                base = word[len(prefix):]
+                if word.startswith(prefix) and len(base) >= 3 and base in vocab:
+                    pairs.add((vocab[base], column))
+
+        if not pairs:
+            return np.zeros((len(self.claims), len(self.claims)), dtype=np.float32)
+
+        left, right = (np.array(side) for side in zip(*pairs))
+        has_left, has_right = presence[:, left], presence[:, right]
+        return has_left @ has_right.T + has_right @ has_left.T
@@ -0,0 +1,229 @@
+"""
+Client Registry
+One pooled Anthropic client per API key, shared by every core module,
+instead of a fresh client (and connection pool) per object per session.
+Callers get it wrapped in their priority class, so every request goes
+through the process-wide RequestScheduler.
+
+The SDK is imported, and the client built, only when the first request is
+made: constructing a dialogue or analyzer costs nothing, and importing the
+core modules does not pull in anthropic or its HTTP library.
+
+Pool limits are built with the SDK's own types (its Limits class, its
+DefaultHttpxClient), never by importing httpx here: releases of the SDK
+differ in which HTTP package they ship with.
+"""
+
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from .scheduler import INTERACTIVE, ScheduledClient, get_scheduler
+
+if TYPE_CHECKING:
+    import asyncio
+
+    import anthropic
+
+# Pool options, from the environment at start-up; see configure()
+_config = {
+    "max_connections": int(os.environ.get("API_MAX_CONNECTIONS", 100)),
+    "max_keepalive_connections": int(os.environ.get("API_MAX_KEEPALIVE_CONNECTIONS", 20)),
+    "keepalive_expiry": float(os.environ.get("API_KEEPALIVE_EXPIRY", 30.0)),
+    "timeout": float(os.environ.get("API_TIMEOUT", 60.0)),
+}
+
+_clients: Dict[Optional[str], "anthropic.Anthropic"] = {}
+# Async clients with the event loop they were built in, which must close them
+_async_clients: Dict[Optional[str], Tuple["anthropic.AsyncAnthropic", Optional["asyncio.AbstractEventLoop"]]] = {}
+_lock = threading.Lock()
+# Bumped by reset(), so ScheduledClients drop the clients it closed
+_generation = 0
+
+_stats = {
+    "clients_created": 0,
+    "client_reuses": 0,
+    "connections_opened": 0,
+    "requests_sent": 0,
+}
+
+
+def configure(**options):
+    """
+    Set pool options for clients created from now on.
+
+    Options: max_connections, max_keepalive_connections, keepalive_expiry,
+    timeout, max_retries. Call reset() to rebuild clients that already exist.
+    Retries are done by the scheduler (the SDK clients never retry), so
+    max_retries is the scheduler's setting and applies immediately.
+    """
+    max_retries = options.pop("max_retries", None)
+    unknown = set(options) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown client options: {', '.join(sorted(unknown))}")
+    with _lock:
+        _config.update(options)
+    if max_retries is not None:
+        get_scheduler().max_retries = max_retries
+
+
+def _count(key: str):
+    with _lock:
+        _stats[key] += 1
+
+
+def _trace(event_name: str, info: Dict):
+    """httpcore trace hook: tells freshly opened connections from reused ones."""
+    if event_name == "connection.connect_tcp.complete":
+        _count("connections_opened")
+    elif event_name.endswith(".send_request_headers.started"):
+        _count("requests_sent")
+
+
+def _attach_trace(request):
+    request.extensions["trace"] = _trace
+
+
+async def _trace_async(event_name: str, info: Dict):
+    # Async transports await their trace hook
+    _trace(event_name, info)
+
+
+async def _attach_trace_async(request):
+    request.extensions["trace"] = _trace_async
+
+
+def _observe_rate_limits(response):
+    get_scheduler().observe_headers(response.headers)
+
+
+async def _observe_rate_limits_async(response):
+    get_scheduler().observe_headers(response.headers)
+
+
+def _limits():
+    """Pool limits, as the Limits type of the HTTP library the installed SDK uses."""
+    import anthropic
+
+    return type(anthropic.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=_config["max_connections"],
+        max_keepalive_connections=_config["max_keepalive_connections"],
+        keepalive_expiry=_config["keepalive_expiry"],
+    )
+
+
+def _shared_client(api_key: Optional[str]) -> "anthropic.Anthropic":
+    import anthropic
+
+    with _lock:
+        client = _clients.get(api_key)
+        if client is not None:
+            _stats["client_reuses"] += 1
+        else:
+            client = anthropic.Anthropic(
+                api_key=api_key,
+                max_retries=0,
+                http_client=anthropic.DefaultHttpxClient(
+                    limits=_limits(),
+                    timeout=_config["timeout"],
+                    event_hooks={"request": [_attach_trace], "response": [_observe_rate_limits]},
+                ),
+            )
+            _clients[api_key] = client
+            _stats["clients_created"] += 1
+    return client
+
+
+def _running_loop() -> Optional["asyncio.AbstractEventLoop"]:
+    import asyncio
+
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _shared_async_client(api_key: Optional[str]) -> "anthropic.AsyncAnthropic":
+    import anthropic
+
+    with _lock:
+        client, _ = _async_clients.get(api_key, (None, None))
+        if client is not None:
+            _stats["client_reuses"] += 1
+        else:
+            client = anthropic.AsyncAnthropic(
+                api_key=api_key,
+                max_retries=0,
+                http_client=anthropic.DefaultAsyncHttpxClient(
+                    limits=_limits(),
+                    timeout=_config["timeout"],
+                    event_hooks={"request": [_attach_trace_async], "response": [_observe_rate_limits_async]},
+                ),
+            )
+            _async_clients[api_key] = (client, _running_loop())
+            _stats["clients_created"] += 1
+    return client
+
+
+def get_client(api_key: Optional[str] = None, priority: str = INTERACTIVE) -> ScheduledClient:
+    """
+    Return the shared client for an API key, created on first request, with
+    requests scheduled at the given priority (interactive, analysis, batch).
+    """
+    return ScheduledClient(lambda: _shared_client(api_key), get_scheduler(), priority, generation=_current_generation)
+
+
+def get_async_client(api_key: Optional[str] = None, priority: str = INTERACTIVE) -> ScheduledClient:
+    """
+    Return the shared async client for an API key, created on first request.
+    Async clients are bound to the event loop that first uses them, so share
+    them only within one loop (one ASGI worker).
+    """
+    return ScheduledClient(lambda: _shared_async_client(api_key), get_scheduler(), priority, is_async=True,
+                           generation=_current_generation)
+
+
+def _current_generation() -> int:
+    return _generation
+
+
+def pool_stats() -> Dict:
+    """Counters showing client and connection reuse."""
+    with _lock:
+        stats = dict(_stats)
+        stats["clients"] = len(_clients) + len(_async_clients)
+    stats["connections_reused"] = max(stats["requests_sent"] - stats["connections_opened"], 0)
+    stats["config"] = {**_config, "max_retries": get_scheduler().max_retries}
+    return stats
+
+
+def reset():
+    """
+    Close and forget every shared client; the next lookup builds a new one.
+    An async client is closed on its own event loop: scheduled there if the
+    loop is running, run to completion if it is idle, skipped if it is closed
+    (its connections went with it). One built outside any loop is closed in
+    the caller's loop, or a new one.
+    """
+    import asyncio
+
+    global _generation
+    with _lock:
+        _generation += 1
+        clients = list(_clients.values())
+        async_clients = list(_async_clients.values())
+        _clients.clear()
+        _async_clients.clear()
+    for client in clients:
+        client.close()
+    for client, loop in async_clients:
+        loop = loop or _running_loop()
+        if loop is None:
+            asyncio.run(client.close())
+            continue
+        if loop.is_closed():
+            continue
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.close(), loop)
+        else:
+            loop.run_until_complete(client.close())
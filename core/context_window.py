@@ -0,0 +1,123 @@
+"""
+Context Window
+Keeps the last turns of a dialogue verbatim and folds older turns into a
+running summary, so per-turn input tokens stop growing with dialogue length.
+"""
+
+from typing import Dict, List, Optional
+
+SUMMARY_PROMPT = """You maintain the running record of a philosophical dialogue between a User and a Philosopher.
+
+Existing record (may be empty):
+{summary}
+
+New turns to fold into the record:
+{turns}
+
+Rewrite the record to include the new turns. Keep it under {max_words} words, in these sections:
+
+POSITIONS — every claim, definition or example the User has put forward, quoted as closely as possible, with its turn number (e.g. "Turn 3: justice is giving each their due")
+TENSIONS — contradictions or tensions between the User's claims, with turn numbers
+ABANDONED — definitions or positions the User has given up, and why
+STATE — one or two sentences on where the inquiry stands
+
+Never drop a claim from the existing record; the Philosopher must be able to say "Earlier you said X...".
+Return only the record."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(msg["content"]) for msg in messages)
+
+
+class ContextWindow:
+    """
+    Rolling window over a dialogue history.
+
+    History stays complete on the dialogue; only what is sent changes. The
+    window grows to keep_turns + fold_every exchanges and is then folded back
+    to keep_turns, so the verbatim prefix (and its prompt cache) is stable
+    between folds. If the verbatim turns alone exceed max_input_tokens, more
+    turns are folded, down to the latest user message.
+    """
+
+    def __init__(self, client, model: str, keep_turns: int = 6, fold_every: int = 4,
+                 max_input_tokens: int = 8000, summary_max_tokens: int = 600):
+        self.client = client
+        self.model = model
+        self.keep_turns = keep_turns
+        self.fold_every = fold_every
+        self.max_input_tokens = max_input_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.reset()
+
+    def reset(self):
+        self.summary = ""
+        self.summarized_upto = 0  # history[:summarized_upto] lives in the summary
+
+    def update(self, history: List[Dict[str, str]]):
+        """Fold turns that fell out of the window into the summary (one API call, if any)."""
+        request = self._fold_request(history)
+        if request is None:
+            return
+        upto, kwargs = request
+        try:
+            response = self.client.messages.create(**kwargs)
+        except Exception:
+            # Send the longer window this turn; folding is retried next turn
+            return
+        self._apply(response.content[0].text, upto)
+
+    def messages(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """The verbatim part of the history to send."""
+        if self.summarized_upto > len(history):
+            # History was replaced underneath us (new topic, reset)
+            self.reset()
+        return history[self.summarized_upto:]
+
+    def _fold_request(self, history: List[Dict[str, str]]) -> Optional[tuple]:
+        if self.summarized_upto > len(history):
+            self.reset()
+
+        window = history[self.summarized_upto:]
+        over_turns = len(window) > 2 * (self.keep_turns + self.fold_every)
+        over_budget = _message_tokens(window) + estimate_tokens(self.summary) > self.max_input_tokens
+        if not (over_turns or over_budget):
+            return None
+
+        upto = self._fold_point(history)
+        if upto <= self.summarized_upto:
+            return None
+
+        turns = "\n\n".join(
+            f"Turn {i} ({'User' if msg['role'] == 'user' else 'Philosopher'}): {msg['content']}"
+            for i, msg in enumerate(history[self.summarized_upto:upto], self.summarized_upto + 1)
+        )
+        prompt = SUMMARY_PROMPT.format(
+            summary=self.summary or "(empty)",
+            turns=turns,
+            max_words=int(self.summary_max_tokens * 0.7),
+        )
+        return upto, {
+            "model": self.model,
+            "max_tokens": self.summary_max_tokens,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+
+    def _fold_point(self, history: List[Dict[str, str]]) -> int:
+        """Index of the first message to keep verbatim; always a user message."""
+        start = max(len(history) - 2 * self.keep_turns, self.summarized_upto)
+        budget = self.max_input_tokens - self.summary_max_tokens
+        while start < len(history) - 1 and _message_tokens(history[start:]) > budget:
+            start += 1
+        while start < len(history) - 1 and history[start]["role"] != "user":
+            start += 1
+        return start
+
+    def _apply(self, summary: str, upto: int):
+        self.summary = summary.strip()
+        self.summarized_upto = upto
@@ -0,0 +1,252 @@
+"""
+Corpus Pipeline
+Bulk ArgumentAnalyzer.analyze_dialogue and UserProfiler.assess_sophistication
+over a JSONL archive of dialogues, with bounded concurrency and resume.
+
+Input lines are {"id": ..., "history": [{"role", "content"}, ...]} ("messages"
+is accepted for "history"; the line number stands in for a missing id).
+Each result is appended to the output JSONL as soon as it is ready. A small
+checkpoint file records the first input line not yet finished, so a rerun
+skips everything before it, and anything after it already in the output.
+A dialogue whose result is an error (an API outage, say) is not finished:
+the checkpoint stops at it, a rerun analyzes it again, and once that
+succeeds the error record is removed from the output.
+"""
+
+import json
+import os
+import queue
+import threading
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple
+
+from .adaptive_difficulty import UserProfiler
+from .argument_analyzer import ArgumentAnalyzer
+
+_DONE = object()
+
+
+def read_dialogues(path: str, start_line: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """Stream (line_number, record) from a JSONL file, one line in memory at a time."""
+    with open(path) as f:
+        for line_number, line in enumerate(f):
+            if line_number < start_line or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = {"error": f"invalid JSON: {e}"}
+            yield line_number, record
+
+
+def analyze_history(analyzer: ArgumentAnalyzer, profiler: UserProfiler, history) -> Dict:
+    """Analysis and sophistication of one dialogue, with "error" set if either failed."""
+    result = {
+        "analysis": analyzer.analyze_dialogue(history),
+        "sophistication": profiler.assess_sophistication(history)
+    }
+    errors = [part["error"] for part in (result["analysis"], result["sophistication"])
+              if "error" in part]
+    if errors:
+        result["error"] = "; ".join(errors)
+    return result
+
+
+class CorpusPipeline:
+    """
+    Reader -> bounded queue -> `workers` threads -> output file. The queue
+    holds at most `queue_size` dialogues, so the reader blocks when workers
+    fall behind and memory stays flat however large the corpus is.
+    """
+
+    def __init__(self, input_path: str, output_path: str, checkpoint_path: Optional[str] = None,
+                 workers: int = 4, queue_size: Optional[int] = None, api_key: Optional[str] = None,
+                 analyzer: Optional[ArgumentAnalyzer] = None, profiler: Optional[UserProfiler] = None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+        self.workers = workers
+        self.queue_size = queue_size or workers * 2
+        # Both are stateless, so one instance serves every worker thread
+        self.analyzer = analyzer or ArgumentAnalyzer(api_key=api_key)
+        self.profiler = profiler or UserProfiler(api_key=api_key)
+
+        self._lock = threading.Lock()
+        self._in_flight: Set[int] = set()
+        # Lines that failed in this run: the checkpoint never passes them
+        self._failed: Set[int] = set()
+        # Lines with an error record in the output from an earlier run, and
+        # those of them this run has written a new result for
+        self._errored: Set[int] = set()
+        self._retried: Set[int] = set()
+        self._next_line = 0
+        self.stats = {"processed": 0, "errors": 0, "skipped": 0, "retried": 0}
+
+    def _read_output(self) -> Iterator[Tuple[int, bool]]:
+        """(line, failed) for each result in the output, skipping a torn final line."""
+        if not os.path.exists(self.output_path):
+            return
+        with open(self.output_path) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                    yield result["line"], "error" in result
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+
+    def resume_point(self) -> Tuple[int, Set[int]]:
+        """
+        Where to resume, and the lines past it that already have results
+        (finished out of order before a crash). Resumes at the checkpoint,
+        or at the first line whose latest result is an error if that is
+        earlier. Only those later lines and the errored ones are held in
+        memory.
+        """
+        start = 0
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                start = json.load(f).get("next_line", 0)
+
+        # A line's latest record decides: an error retried successfully is not errored
+        errored: Set[int] = set()
+        for line_number, failed in self._read_output():
+            if failed:
+                errored.add(line_number)
+            else:
+                errored.discard(line_number)
+        if errored:
+            start = min(start, min(errored))
+
+        done = {line_number for line_number, failed in self._read_output()
+                if not failed and line_number >= start} - errored
+        self._errored = errored
+        return start, done
+
+    def run(self, on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Process every unfinished dialogue; returns processed/error/skipped counts."""
+        start, done = self.resume_point()
+        self._next_line = start
+        self._end_output_line()
+        results_from = os.path.getsize(self.output_path) if os.path.exists(self.output_path) else 0
+        jobs: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._work, args=(jobs, on_result), daemon=True)
+            for _ in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for line_number, record in read_dialogues(self.input_path, start):
+                with self._lock:
+                    self._next_line = line_number + 1
+                    if line_number in done:
+                        self.stats["skipped"] += 1
+                        continue
+                    self._in_flight.add(line_number)
+                jobs.put((line_number, record))  # blocks while workers are behind
+        except BaseException:
+            # On interrupt, drop queued dialogues instead of analyzing them
+            self._drain(jobs)
+            raise
+        finally:
+            for _ in threads:
+                jobs.put(_DONE)
+            for thread in threads:
+                thread.join()
+            if self._retried:
+                self._drop_replaced(results_from)
+
+        with self._lock:
+            self._checkpoint()
+        return dict(self.stats)
+
+    def process(self, line_number: int, record: Dict) -> Dict:
+        """Analyze one dialogue record."""
+        dialogue_id = record.get("id", line_number)
+        if "error" in record:
+            return {"id": dialogue_id, "line": line_number, "error": record["error"]}
+
+        history = record.get("history") or record.get("messages") or []
+        return {"id": dialogue_id, "line": line_number, **analyze_history(self.analyzer, self.profiler, history)}
+
+    def _work(self, jobs: "queue.Queue", on_result: Optional[Callable[[Dict], None]]):
+        while True:
+            job = jobs.get()
+            if job is _DONE:
+                return
+            line_number, record = job
+            try:
+                result = self.process(line_number, record)
+            except Exception as e:
+                result = {"id": record.get("id", line_number), "line": line_number, "error": str(e)}
+
+            with self._lock:
+                self._save(result)
+                self._in_flight.discard(line_number)
+                if "error" in result:
+                    self._failed.add(line_number)
+                if line_number in self._errored:
+                    self._retried.add(line_number)
+                    self.stats["retried"] += 1
+                self.stats["errors" if "error" in result else "processed"] += 1
+                self._checkpoint()
+            if on_result:
+                on_result(result)
+
+    def _drain(self, jobs: "queue.Queue"):
+        # Drained lines stay in _in_flight, so the checkpoint never passes them
+        while True:
+            try:
+                jobs.get_nowait()
+            except queue.Empty:
+                return
+
+    def _save(self, result: Dict):
+        with open(self.output_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _end_output_line(self):
+        """Terminate a torn final line, so the next result starts a line of its own."""
+        if not os.path.exists(self.output_path) or os.path.getsize(self.output_path) == 0:
+            return
+        with open(self.output_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _drop_replaced(self, results_from: int):
+        """
+        Rewrite the output without the earlier records of retried lines: those
+        before byte `results_from` (where this run began appending) for lines
+        this run has written again. Streams the file; nothing else is held.
+        """
+        tmp_path = self.output_path + ".tmp"
+        with open(self.output_path, "rb") as src, open(tmp_path, "wb") as dst:
+            while src.tell() < results_from:
+                line = src.readline()
+                if not line:
+                    break
+                try:
+                    if json.loads(line)["line"] in self._retried:
+                        continue
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                dst.write(line)
+            for chunk in iter(lambda: src.read(1 << 16), b""):
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.output_path)
+        self._retried.clear()
+
+    def _checkpoint(self):
+        # Everything before the oldest unfinished or failed line is in the output
+        pending = self._in_flight | self._failed
+        next_line = min(pending) if pending else self._next_line
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"next_line": next_line}, f)
+        os.replace(tmp_path, self.checkpoint_path)
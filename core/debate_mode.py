@@ -3,16 +3,84 @@ Debate Mode - AI vs AI Philosophical Debate
 Watch two AI philosophers debate each other on a topic.
 """
 
-import anthropic
-from typing import Optional, List, Dict
+import re
+from typing import Any, Iterator, Optional, List, Dict, Tuple
 from .socrates import MODES
+from .clients import get_client
+from .context_window import estimate_tokens
+from .prompt_cache import cached_messages, cached_system
+from .scheduler import BATCH
+from .structured import StructuredOutputError, parse_structured, response_payload, structured_request
+
+# Input tokens one debater's request may use before its oldest turns are condensed
+DEBATE_CONTEXT_TOKENS = 12000
+# Condensing goes down to this share of the budget, so it happens rarely
+COMPACT_TO = 0.6
+# Characters of each condensed turn that are kept
+CONDENSED_CHARS = 240
+
+
+def condense(text: str, max_chars: int = CONDENSED_CHARS) -> str:
+    """The leading sentences of a turn, up to about max_chars."""
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    kept = ""
+    for sentence in sentences:
+        if len(kept) + len(sentence) > max_chars:
+            break
+        kept = f"{kept} {sentence}".strip()
+    else:
+        return kept
+    return (kept or text[:max_chars].rstrip()) + " …"
+
+
+class DebateSide:
+    """
+    One debater's view of the debate: a system prompt built once, and its
+    own message list, which only grows (its replies as assistant turns, the
+    opponent's as user turns). Each request therefore extends the last one,
+    and its prefix is read back from the prompt cache. Only when the list
+    outgrows context_tokens are the oldest exchanges condensed into a digest.
+    """
+
+    def __init__(self, mode: str, position: str, system: str, context_tokens: int = DEBATE_CONTEXT_TOKENS):
+        self.mode = mode
+        self.position = position
+        self.system = cached_system(system)
+        self.system_tokens = estimate_tokens(system)
+        self.context_tokens = context_tokens
+        self.messages: List[Dict] = []
+        self.digest: List[str] = []  # condensed exchanges that were dropped from messages
+
+    def add(self, role: str, content: str):
+        self.messages.append({"role": role, "content": content})
+
+    def context(self, max_tokens: int) -> List[Dict]:
+        """The messages to send, condensing the oldest exchanges first if they no longer fit."""
+        if self._tokens() + max_tokens > self.context_tokens:
+            self._compact(int(self.context_tokens * COMPACT_TO) - max_tokens)
+        if not self.digest:
+            return cached_messages(self.messages)
+        first = self.messages[0]
+        digest = "Earlier in the debate (condensed):\n" + "\n".join(self.digest)
+        return cached_messages([{"role": "user", "content": f"{digest}\n\n{first['content']}"}] + self.messages[1:])
+
+    def _tokens(self) -> int:
+        return (self.system_tokens + sum(estimate_tokens(line) for line in self.digest)
+                + sum(estimate_tokens(message["content"]) for message in self.messages))
+
+    def _compact(self, target: int):
+        # Drop whole exchanges (user, then assistant) so the list still opens with a user turn
+        while len(self.messages) > 2 and self._tokens() > target:
+            prompt, reply = self.messages.pop(0), self.messages.pop(0)
+            self.digest.append(f"- {condense(prompt['content'])}")
+            self.digest.append(f"- You: {condense(reply['content'])}")
 
 
 class DebateModerator:
     """Orchestrate debates between two AI philosophers."""
 
     def __init__(self, api_key: Optional[str] = None):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = get_client(api_key, BATCH)
         self.model = "claude-sonnet-4-20250514"
         self.debate_history = []
 
@@ -34,6 +102,11 @@ class DebateModerator:
         self.position_b = position_b
         self.debate_history = []
 
+        # Each side's system prompt is fixed for the whole debate
+        self.side_a = DebateSide(mode_a, position_a, self._get_philosopher_prompt(mode_a, position_a, True))
+        self.side_b = DebateSide(mode_b, position_b, self._get_philosopher_prompt(mode_b, position_b, False))
+        self.side_a.add("user", f"Open the debate. State your position on: {topic}")
+
     def _get_philosopher_prompt(self, mode: str, position: str, is_first: bool) -> str:
         """Generate system prompt for a debating philosopher."""
         mode_data = MODES.get(mode, MODES["socratic"])
@@ -52,7 +125,9 @@ Rules:
 4. Be rigorous but respectful
 5. Keep responses concise (3-5 sentences)
 6. End with either a question or a strong assertion
-{'7. You speak first - open by stating your position clearly' if is_first else '7. Respond to your opponent then advance your position'}
+{'7. You speak first - open by stating your position clearly, then respond to your opponent and advance your position' if is_first else '7. Respond to your opponent then advance your position'}
+
+Your opponent's turns reach you as messages starting "Your opponent:".
 
 Remember: You're not seeking truth together - you're defending a position.
 Be intellectually honest but argue forcefully."""
@@ -66,95 +141,70 @@ Be intellectually honest but argue forcefully."""
         Returns:
             List of debate exchanges with analysis
         """
-        debate_log = []
-
-        # Philosopher A opens
-        opening = self._get_response(
-            self.mode_a,
-            self.position_a,
-            f"Open the debate. State your position on: {self.topic}",
-            [],
-            is_first=True
-        )
-
-        debate_log.append({
-            "turn": 1,
-            "speaker": f"{MODES[self.mode_a]['name']} (Position: {self.position_a})",
-            "mode": self.mode_a,
-            "message": opening
-        })
+        return [entry for kind, entry in self.run_debate_stream(turns, stream_tokens=False) if kind == "turn"]
 
+    def run_debate_stream(self, turns: int = 6, stream_tokens: bool = True) -> Iterator[Tuple[str, Dict]]:
+        """
+        run_debate, as it happens: yields ("token", {"turn", "mode", "text"})
+        for each text delta of a turn (unless stream_tokens is False), then
+        ("turn", log entry) once the turn is complete.
+        """
+        for turn in range(1, turns + 1):
+            side, request = self._plan_turn(turn)
+            if not stream_tokens:
+                message = self._get_response(request)
+            else:
+                chunks = []
+                for text in self._stream_response(request):
+                    chunks.append(text)
+                    yield "token", {"turn": turn, "mode": side.mode, "text": text}
+                message = "".join(chunks)
+            yield "turn", self._record_turn(turn, side, message)
+
+    def _plan_turn(self, turn: int) -> Tuple[DebateSide, Dict]:
+        """Who speaks on a turn (A on odd turns, B on even), and their request."""
+        side = self.side_a if turn % 2 else self.side_b
+        return side, self._response_request(side)
+
+    def _record_turn(self, turn: int, side: DebateSide, message: str) -> Dict:
+        """Append a turn to both sides' contexts and the debate history, and return its log entry."""
+        opponent = self.side_b if side is self.side_a else self.side_a
+        side.add("assistant", message)
+        opponent.add("user", f"Your opponent: {message}")
         self.debate_history.append({
-            "speaker": self.mode_a,
-            "message": opening
+            "speaker": side.mode,
+            "message": message
         })
 
-        # Alternate turns
-        for turn in range(2, turns + 1):
-            # Determine who speaks
-            current_mode = self.mode_b if turn % 2 == 0 else self.mode_a
-            current_position = self.position_b if turn % 2 == 0 else self.position_a
-            opponent_mode = self.mode_a if turn % 2 == 0 else self.mode_b
-
-            # Get previous message from opponent
-            previous_message = self.debate_history[-1]["message"]
-
-            # Generate response
-            response = self._get_response(
-                current_mode,
-                current_position,
-                f"Respond to your opponent: '{previous_message[:200]}...'",
-                self.debate_history[-3:],  # Last few exchanges for context
-                is_first=False
-            )
-
-            mode_name = MODES[current_mode]['name']
-            position_label = current_position
-
-            debate_log.append({
-                "turn": turn,
-                "speaker": f"{mode_name} (Position: {position_label})",
-                "mode": current_mode,
-                "message": response
-            })
-
-            self.debate_history.append({
-                "speaker": current_mode,
-                "message": response
-            })
-
-        return debate_log
-
-    def _get_response(self, mode: str, position: str, prompt: str, history: List[Dict], is_first: bool) -> str:
-        """Get response from a philosopher in debate mode."""
-        system_prompt = self._get_philosopher_prompt(mode, position, is_first)
-
-        # Build messages from history
-        messages = []
-        for entry in history:
-            messages.append({
-                "role": "assistant" if entry["speaker"] == mode else "user",
-                "content": entry["message"]
-            })
-
-        # Add current prompt
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
+        return {
+            "turn": turn,
+            "speaker": f"{MODES[side.mode]['name']} (Position: {side.position})",
+            "mode": side.mode,
+            "message": message
+        }
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=400,
-                system=system_prompt,
-                messages=messages
-            )
-
-            return response.content[0].text
-
-        except Exception as e:
-            return f"[Error generating response: {e}]"
+    def _get_response(self, request: Dict) -> str:
+        """
+        Get response from a philosopher in debate mode. API errors propagate:
+        the turn is not recorded, so the debate stops there instead of going
+        on (and being judged) with an error message as a turn.
+        """
+        response = self.client.messages.create(**request)
+        return response.content[0].text
+
+    def _stream_response(self, request: Dict) -> Iterator[str]:
+        """_get_response, as text deltas."""
+        with self.client.messages.stream(**request) as stream:
+            yield from stream.text_stream
+
+    def _response_request(self, side: DebateSide) -> Dict:
+        max_tokens = 400
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "system": side.system,
+            "messages": side.context(max_tokens)
+        }
 
     def judge_debate(self) -> Dict:
         """
@@ -163,6 +213,14 @@ Be intellectually honest but argue forcefully."""
         if len(self.debate_history) < 2:
             return {"error": "Not enough debate history"}
 
+        try:
+            response = self.client.messages.create(**self._judge_request())
+            return self._parse_judgment(response_payload(response))
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _judge_request(self) -> Dict:
         # Format debate for judging
         debate_text = self._format_debate()
 
@@ -195,24 +253,18 @@ Respond in JSON:
     "verdict": "One-sentence verdict"
 }}"""
 
+        return structured_request({
+            "model": self.model,
+            "max_tokens": 1200,
+            "messages": [{"role": "user", "content": judge_prompt}]
+        }, "judge_debate")
+
+    def _parse_judgment(self, payload: Any) -> Dict:
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1200,
-                messages=[{"role": "user", "content": judge_prompt}]
-            )
-
-            import re, json
-            content = response.content[0].text
-            json_match = re.search(r'\{[\s\S]*\}', content)
-
-            if json_match:
-                return json.loads(json_match.group())
+            return parse_structured(payload, "judge_debate")
+        except StructuredOutputError:
             return {"error": "Could not parse judgment"}
 
-        except Exception as e:
-            return {"error": str(e)}
-
     def _format_debate(self) -> str:
         """Format debate history for analysis."""
         lines = []
@@ -0,0 +1,311 @@
+"""
+Dialogue Store
+Durable, append-only record of every dialogue, shared by all workers.
+
+SQLite in WAL mode: readers never block the single writer, and any number
+of processes can open the same file. A session row holds the topic and mode
+of the session's current "generation" (a new topic or a reset starts a new
+one); each committed turn is one INSERT into turns, nothing else, so write
+amplification is one row per turn. Old generations are never rewritten.
+
+In the web apps the in-memory SessionStore becomes a cache in front of this
+store: a session missing from memory, or one that another worker has
+extended since, is reloaded from disk on access. Derived state (difficulty
+level, the context summary) is recomputed after a reload rather than stored.
+If two workers answer the same session at once, the second to commit gets a
+DialogueConflict and its dialogue is reloaded with the first one's turns.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    topic TEXT,
+    mode TEXT,
+    security INTEGER,
+    started REAL
+);
+CREATE TABLE IF NOT EXISTS turns (
+    session_id TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (session_id, generation, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS analyses (
+    session_id TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    analyzed REAL NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class DialogueConflict(Exception):
+    """Another worker committed turns to the session first."""
+
+    def __init__(self, session_id: str):
+        super().__init__("This dialogue was continued elsewhere; it has been reloaded, please retry")
+        self.session_id = session_id
+
+
+class DialogueStore:
+    """
+    Sessions and their turns in one SQLite file. Each thread gets its own
+    connection; writes retry for up to busy_timeout seconds while another
+    process holds the write lock.
+    """
+
+    def __init__(self, path: str, synchronous: str = "NORMAL", busy_timeout: float = 5.0):
+        self.path = path
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # NORMAL in WAL mode: durable across crashes of the process, and
+            # only the last commits may be lost on power failure
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
+
+    def start(self, session_id: str, topic: Optional[str], mode: str, security: bool) -> int:
+        """Begin a new generation of a session (new topic or reset); returns its number."""
+        row = self._conn().execute(
+            "INSERT INTO sessions (id, generation, topic, mode, security, started) VALUES (?, 1, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET generation = generation + 1, topic = excluded.topic, "
+            "mode = excluded.mode, security = excluded.security, started = excluded.started "
+            "RETURNING generation",
+            (session_id, topic, mode, int(security), time.time())
+        ).fetchone()
+        return row[0]
+
+    def append(self, session_id: str, generation: int, seq: int, role: str, content: str):
+        """Record one turn; raises sqlite3.IntegrityError if that turn already exists."""
+        self._conn().execute(
+            "INSERT INTO turns (session_id, generation, seq, role, content, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, generation, seq, role, content, time.time())
+        )
+
+    def append_many(self, session_id: str, generation: int, start_seq: int, turns: List[Dict]):
+        """Record consecutive turns in one transaction (still one row each)."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO turns (session_id, generation, seq, role, content, created) VALUES (?, ?, ?, ?, ?, ?)",
+                [(session_id, generation, start_seq + i, turn["role"], turn["content"], now)
+                 for i, turn in enumerate(turns)]
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def version(self, session_id: str) -> Optional[Tuple[int, int]]:
+        """(generation, turns in it) for a session, or None if it was never stored."""
+        row = self._conn().execute(
+            "SELECT s.generation, (SELECT COALESCE(MAX(t.seq) + 1, 0) FROM turns t "
+            "WHERE t.session_id = s.id AND t.generation = s.generation) "
+            "FROM sessions s WHERE s.id = ?",
+            (session_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def load(self, session_id: str) -> Optional[Dict]:
+        """A session's current generation with its history, or None."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT generation, topic, mode, security, started FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        generation, topic, mode, security, started = row
+        history = [
+            {"role": role, "content": content}
+            for role, content in conn.execute(
+                "SELECT role, content FROM turns WHERE session_id = ? AND generation = ? ORDER BY seq",
+                (session_id, generation)
+            )
+        ]
+        return {
+            "id": session_id,
+            "generation": generation,
+            "topic": topic,
+            "mode": mode,
+            "security": bool(security),
+            "started": started,
+            "history": history,
+        }
+
+    def session_ids(self, since: Optional[float] = None) -> List[str]:
+        """Stored sessions, optionally only those started or extended after `since`."""
+        if since is None:
+            rows = self._conn().execute("SELECT id FROM sessions ORDER BY started")
+        else:
+            rows = self._conn().execute(
+                "SELECT id FROM sessions s WHERE s.started > ? OR EXISTS (SELECT 1 FROM turns t "
+                "WHERE t.session_id = s.id AND t.generation = s.generation AND t.created > ?) ORDER BY started",
+                (since, since)
+            )
+        return [row[0] for row in rows]
+
+    def last_analysis(self, session_id: str) -> Optional[Tuple[Any, Dict]]:
+        """(version, result) of a session's last batch analysis (core.session_analysis), or None."""
+        row = self._conn().execute(
+            "SELECT version, result FROM analyses WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return (json.loads(row[0]), json.loads(row[1])) if row else None
+
+    def save_analysis(self, session_id: str, version: Any, result: Dict):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO analyses (session_id, version, analyzed, result) VALUES (?, ?, ?, ?)",
+            (session_id, json.dumps(version), time.time(), json.dumps(result))
+        )
+
+    def claim_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Take (or renew) the named lease for ttl seconds; False if another
+        owner holds it and it has not expired.
+        """
+        now = time.time()
+        row = self._conn().execute(
+            "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE leases.owner = excluded.owner OR leases.expires < ? RETURNING owner",
+            (name, owner, now + ttl, now)
+        ).fetchone()
+        return row is not None
+
+    def release_lease(self, name: str, owner: str):
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def lease_holder(self, name: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT owner FROM leases WHERE name = ? AND expires >= ?", (name, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict:
+        conn = self._conn()
+        sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        turns = conn.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+        return {
+            "path": self.path,
+            "sessions": sessions,
+            "turns": turns,
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+class SessionJournal:
+    """
+    Writes one dialogue's committed turns to the store. Attached to a
+    SocraticDialogue as .journal; the dialogue calls start() when its topic
+    changes and sync() whenever an exchange completes.
+    """
+
+    def __init__(self, store: DialogueStore, session_id: str, generation: int = 0, written: int = 0):
+        self.store = store
+        self.session_id = session_id
+        self.generation = generation
+        self.written = written
+
+    def start(self, topic: Optional[str], mode: str, security: bool):
+        self.generation = self.store.start(self.session_id, topic, mode, security)
+        self.written = 0
+
+    def sync(self, history: List[Dict]):
+        """
+        Append turns not yet written (normally one exchange). Raises
+        DialogueConflict if another worker has written those turns first.
+        """
+        if self.generation == 0:
+            # Turns from before the first topic was set are not recorded
+            return
+        new = history[self.written:]
+        if not new:
+            return
+        try:
+            if len(new) == 1:
+                self.store.append(self.session_id, self.generation, self.written, new[0]["role"], new[0]["content"])
+            else:
+                self.store.append_many(self.session_id, self.generation, self.written, new)
+        except sqlite3.IntegrityError as e:
+            raise DialogueConflict(self.session_id) from e
+        self.written = len(history)
+
+    def reload(self, dialogue):
+        """Replace the dialogue's topic, mode and history with the stored ones."""
+        record = self.store.load(self.session_id)
+        if record is None:
+            self.generation = self.written = 0
+            return
+        dialogue.topic = record["topic"]
+        dialogue.mode = record["mode"]
+        dialogue.is_security = record["security"]
+        dialogue.history = record["history"]
+        self.generation = record["generation"]
+        self.written = len(record["history"])
+
+    def is_current(self) -> bool:
+        """False if another worker has extended or restarted the session since it was loaded."""
+        version = self.store.version(self.session_id)
+        return version is None or version == (self.generation, self.written)
+
+
+def attach(dialogue, session_id: str, store: Optional[DialogueStore] = None):
+    """
+    Give a SocraticDialogue a journal for session_id, restoring topic, mode
+    and history from the store if the session was stored before.
+    """
+    store = store or get_dialogue_store()
+    if store is None:
+        return dialogue
+    journal = SessionJournal(store, session_id)
+    journal.reload(dialogue)
+    dialogue.journal = journal
+    return dialogue
+
+
+def is_current(dialogue) -> bool:
+    """Whether an in-memory dialogue still matches the store (always, without one)."""
+    journal = getattr(dialogue, "journal", None)
+    return journal is None or journal.is_current()
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_dialogue_store() -> Optional[DialogueStore]:
+    """The process-wide store at DIALOGUE_STORE_PATH, or None if unset (memory only)."""
+    global _default_store
+    path = os.environ.get("DIALOGUE_STORE_PATH")
+    if not path:
+        return None
+    with _default_lock:
+        if _default_store is None:
+            _default_store = DialogueStore(path)
+        return _default_store
@@ -0,0 +1,107 @@
+"""
+Dialogue Export
+Streaming exporters: a dialogue is written out turn by turn as chunks, so
+a response can be sent while it is being formatted and no export is ever
+held in memory whole.
+
+A dialogue is exported from a record, the dict DialogueStore.load returns
+(topic, mode, security, history, ...); dialogue_record builds the same dict
+from a live SocraticDialogue. gzip_jsonl streams any number of records as
+one gzip-compressed JSONL file, one session per line.
+"""
+
+import json
+import re
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, Optional
+
+RULE = "=" * 60
+FOOTER = "Generated by Socratic Dialogue v3\ngithub.com/bissembert1618/socratic-dialogue\n"
+
+# Compress once this much JSONL is buffered
+GZIP_CHUNK_BYTES = 64 * 1024
+
+
+def dialogue_record(dialogue, session_id: Optional[str] = None) -> Dict:
+    """The export record of a live SocraticDialogue (its history is copied, not its turns)."""
+    journal = getattr(dialogue, "journal", None)
+    return {
+        "id": session_id,
+        "generation": journal.generation if journal else None,
+        "topic": dialogue.topic,
+        "mode": dialogue.mode,
+        "security": dialogue.is_security,
+        "history": list(dialogue.history),
+    }
+
+
+def _speaker(message: Dict) -> str:
+    return "You" if message["role"] == "user" else "Philosopher"
+
+
+def export_text(record: Dict) -> Iterator[str]:
+    yield f"Socratic Dialogue Export\nTopic: {record['topic']}\nMode: {record['mode'].title()}\n{RULE}\n\n"
+    for i, message in enumerate(record["history"], 1):
+        yield f"{_speaker(message)} (Turn {i}):\n{message['content']}\n\n"
+    yield f"{RULE}\n{FOOTER}"
+
+
+def export_markdown(record: Dict) -> Iterator[str]:
+    yield f"# Socratic Dialogue: {record['topic']}\n\n**Mode:** {record['mode'].title()}\n\n---\n\n"
+    for i, message in enumerate(record["history"], 1):
+        yield f"### {_speaker(message)} (Turn {i})\n\n{message['content']}\n\n"
+    yield "---\n\n" + FOOTER.replace("\n", "  \n", 1)
+
+
+def export_jsonl(record: Dict) -> Iterator[str]:
+    """A header line with the session's fields, then one line per turn."""
+    header = {key: value for key, value in record.items() if key != "history"}
+    yield json.dumps({"type": "session", **header}, ensure_ascii=False) + "\n"
+    for i, message in enumerate(record["history"], 1):
+        yield json.dumps({"type": "turn", "turn": i, "role": message["role"], "content": message["content"]},
+                         ensure_ascii=False) + "\n"
+
+
+# format -> (exporter, content type, file extension)
+FORMATS = {
+    "text": (export_text, "text/plain; charset=utf-8", "txt"),
+    "markdown": (export_markdown, "text/markdown; charset=utf-8", "md"),
+    "jsonl": (export_jsonl, "application/x-ndjson", "jsonl"),
+}
+
+
+def export_filename(record: Dict, fmt: str) -> str:
+    topic = re.sub(r"[^\w-]+", "_", (record["topic"] or "dialogue")[:20]).strip("_")
+    return f"dialogue_{topic}.{FORMATS[fmt][2]}"
+
+
+def stored_records(store, since: Optional[float] = None) -> Iterator[Dict]:
+    """Every session in a DialogueStore, loaded one at a time."""
+    for session_id in store.session_ids(since):
+        record = store.load(session_id)
+        if record is not None:
+            yield record
+
+
+def gzip_jsonl(records: Iterable[Dict], level: int = 6) -> Iterator[bytes]:
+    """
+    Records as gzip-compressed JSONL, one record per line. Memory stays
+    bounded by one record plus GZIP_CHUNK_BYTES, however many are streamed.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending, size = [], 0
+    for record in records:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        pending.append(line)
+        size += len(line)
+        if size >= GZIP_CHUNK_BYTES:
+            chunk = compressor.compress(b"".join(pending))
+            pending, size = [], 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(b"".join(pending)) + compressor.flush()
+
+
+def bulk_filename() -> str:
+    return time.strftime("dialogues-%Y%m%dT%H%M%SZ.jsonl.gz", time.gmtime())
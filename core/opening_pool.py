@@ -0,0 +1,236 @@
+"""
+Opening Pool
+Pre-generated opening questions for the built-in topics, so starting a
+dialogue on one of them needs no API round trip.
+
+The built-in TOPICS and SECURITY_TOPICS times MODES make a small, fixed set
+of (topic, mode, security) keys. The pool keeps a few distinct openings per
+key, generated exactly as get_opening() would generate them, and hands one
+out per /api/start. Each one taken is replaced in the background at batch
+priority, so refills never compete with live dialogue. A key is filled the
+first time it is asked for; a key runs dry only if openings are taken faster
+than they are refilled, and then the caller generates one live.
+
+With a path, the pool lives only in SQLite and survives restarts. Workers
+sharing the file claim openings by deleting their rows, so each opening is
+handed out once, and no key is filled past `size` however many workers
+refill it. Only a persistent pool is warmed up front, since its openings
+are paid for once rather than on every start.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .clients import get_client
+from .scheduler import BATCH
+from .socrates import MODES, SECURITY_TOPICS, TOPICS, SocraticDialogue
+
+Key = Tuple[str, str, bool]
+
+
+# Stands for the user's own question, so there is nothing to pre-generate
+CUSTOM_TOPIC = "custom"
+
+
+def pool_keys() -> Iterator[Key]:
+    """Every built-in (topic, mode, security) combination."""
+    for security, topics in ((False, TOPICS), (True, SECURITY_TOPICS)):
+        for topic_key in topics:
+            if topic_key == CUSTOM_TOPIC:
+                continue
+            for mode in MODES:
+                yield topic_key, mode, security
+
+
+class OpeningPool:
+    """
+    A few ready openings per built-in key, refilled as they are used.
+    `size` openings are kept per key; `workers` threads generate replacements.
+    """
+
+    def __init__(self, path: Optional[str] = None, size: int = 3, workers: int = 2,
+                 api_key: Optional[str] = None):
+        self.path = path
+        self.size = size
+        self.api_key = api_key
+
+        self._lock = threading.Lock()
+        self._openings: Dict[Key, List[str]] = defaultdict(list)
+        self._refilling = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="openings")
+        self._db = None
+        self.stats_counts = {"hits": 0, "misses": 0, "generated": 0, "failed": 0}
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # One connection, used under self._lock; autocommit, WAL so workers share the file
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS openings ("
+                "id INTEGER PRIMARY KEY, topic TEXT, mode TEXT, security INTEGER, opening TEXT, created REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS openings_key ON openings (topic, mode, security, id)")
+
+    @staticmethod
+    def is_pooled(key: Key) -> bool:
+        topic_key, mode, security = key
+        topics = SECURITY_TOPICS if security else TOPICS
+        return mode in MODES and topic_key != CUSTOM_TOPIC and topic_key in topics
+
+    def take(self, topic_key: str, mode: str, security: bool = False) -> Optional[str]:
+        """A ready opening for a built-in key (and a refill behind it), or None."""
+        key = (topic_key, mode, bool(security))
+        if not self.is_pooled(key):
+            return None
+        with self._lock:
+            opening = self._pop(key)
+            self.stats_counts["hits" if opening else "misses"] += 1
+        self.refill(key)
+        return opening
+
+    def _pop(self, key: Key) -> Optional[str]:
+        """Claim the oldest opening for a key; the caller holds the lock."""
+        if self._db is None:
+            openings = self._openings[key]
+            return openings.pop(0) if openings else None
+        # The DELETE is the claim: of two workers racing for a row, only one gets it back
+        rows = self._db.execute(
+            "DELETE FROM openings WHERE id = (SELECT MIN(id) FROM openings "
+            "WHERE topic = ? AND mode = ? AND security = ?) RETURNING opening",
+            (key[0], key[1], int(key[2]))
+        ).fetchall()
+        return rows[0][0] if rows else None
+
+    def _count(self, key: Key) -> int:
+        """Ready openings for a key; the caller holds the lock."""
+        if self._db is None:
+            return len(self._openings[key])
+        return self._db.execute(
+            "SELECT COUNT(*) FROM openings WHERE topic = ? AND mode = ? AND security = ?",
+            (key[0], key[1], int(key[2]))
+        ).fetchone()[0]
+
+    def warm(self):
+        """Queue refills for every built-in key that is below size (about size x 76 calls when empty)."""
+        for key in pool_keys():
+            self.refill(key)
+
+    def refill(self, key: Key) -> bool:
+        """Top a key up in the background; False if it is full or already refilling."""
+        with self._lock:
+            if key in self._refilling or self._count(key) >= self.size:
+                return False
+            self._refilling.add(key)
+        self._executor.submit(self._refill, key)
+        return True
+
+    def _refill(self, key: Key):
+        try:
+            # Stop after a few errors or repeats (API down, or a key with little
+            # variety); the next take retries
+            failures = 0
+            while failures < 3:
+                with self._lock:
+                    if self._count(key) >= self.size:
+                        return
+                try:
+                    opening = self.generate(key)
+                except Exception:
+                    failures += 1
+                    with self._lock:
+                        self.stats_counts["failed"] += 1
+                    continue
+                if not self._add(key, opening):
+                    failures += 1
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def generate(self, key: Key) -> str:
+        """One opening, made the way SocraticDialogue.get_opening makes it, at batch priority."""
+        topic_key, mode, security = key
+        dialogue = SocraticDialogue(api_key=self.api_key)
+        dialogue.client = get_client(self.api_key, BATCH)
+        dialogue.set_mode(mode)
+        dialogue.set_topic(topic_key, security=security)
+        dialogue.history = [{"role": "user", "content": dialogue._opening_prompt()}]
+        response = dialogue.client.messages.create(**dialogue._request())
+        return response.content[0].text
+
+    def _add(self, key: Key, opening: str) -> bool:
+        """Store an opening; False if it repeats one that is ready (kept varied) or the key is full."""
+        with self._lock:
+            if self._db is None:
+                openings = self._openings[key]
+                if opening in openings or len(openings) >= self.size:
+                    return False
+                openings.append(opening)
+            else:
+                # One statement, so workers refilling the same key cannot overfill it
+                topic, mode, security = key[0], key[1], int(key[2])
+                added = self._db.execute(
+                    "INSERT INTO openings (topic, mode, security, opening, created) SELECT ?, ?, ?, ?, ? "
+                    "WHERE (SELECT COUNT(*) FROM openings WHERE topic = ? AND mode = ? AND security = ?) < ? "
+                    "AND NOT EXISTS (SELECT 1 FROM openings WHERE topic = ? AND mode = ? AND security = ? "
+                    "AND opening = ?)",
+                    (topic, mode, security, opening, time.time(), topic, mode, security, self.size,
+                     topic, mode, security, opening)
+                ).rowcount
+                if not added:
+                    return False
+            self.stats_counts["generated"] += 1
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            if self._db is None:
+                stocked = {key for key, openings in self._openings.items() if openings}
+            else:
+                stocked = {(topic, mode, bool(security)) for topic, mode, security in self._db.execute(
+                    "SELECT DISTINCT topic, mode, security FROM openings")}
+            ready = sum(self._count(key) for key in stocked)
+            empty = [f"{topic}/{mode}{'/security' if security else ''}"
+                     for (topic, mode, security) in pool_keys() if (topic, mode, security) not in stocked]
+            counts = dict(self.stats_counts)
+            refilling = len(self._refilling)
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            **counts,
+            "hit_rate": round(counts["hits"] / lookups, 3) if lookups else 0.0,
+            "ready": ready,
+            "keys": len(list(pool_keys())),
+            "size_per_key": self.size,
+            "refilling": refilling,
+            "empty_keys": empty,
+            "persistent": self._db is not None,
+        }
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_opening_pool() -> Optional[OpeningPool]:
+    """
+    The process-wide pool, or None (the default) unless OPENING_POOL_SIZE
+    (openings per key) is set above 0. With OPENING_POOL_PATH (a SQLite file)
+    every built-in key is filled up front; in memory, each key is filled
+    the first time a dialogue starts on it.
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            size = int(os.environ.get("OPENING_POOL_SIZE", 0))
+            if size <= 0:
+                return None
+            path = os.environ.get("OPENING_POOL_PATH") or None
+            _default_pool = OpeningPool(path=path, size=size)
+            if path:
+                _default_pool.warm()
+        return _default_pool
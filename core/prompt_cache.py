@@ -0,0 +1,56 @@
+"""
+Prompt Caching
+Cache breakpoints for the static system prompt and the stable history prefix.
+
+The API caches every prefix ending at a block marked with cache_control, and
+reads it back on later calls whose prefix matches. Prefixes shorter than the
+model's minimum (1024 tokens for Sonnet) are sent uncached, so the history
+breakpoint starts paying off a few turns into a dialogue.
+"""
+
+from typing import Dict, List
+
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def cached_system(static: str, dynamic: str = "") -> List[Dict]:
+    """
+    System prompt as content blocks: the static part (persona, security,
+    difficulty) carries a breakpoint, the per-session part follows uncached.
+    """
+    blocks = [{"type": "text", "text": static, "cache_control": EPHEMERAL}]
+    if dynamic:
+        blocks.append({"type": "text", "text": dynamic})
+    return blocks
+
+
+def cached_messages(history: List[Dict]) -> List[Dict]:
+    """
+    Copy of the history with a breakpoint on its last message.
+
+    Each call writes the whole conversation to the cache; the next turn's
+    request extends that prefix and reads it back.
+    """
+    if not history:
+        return []
+
+    messages = list(history[:-1])
+    last = history[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    else:
+        content = [dict(block) for block in content]
+    content[-1] = dict(content[-1], cache_control=EPHEMERAL)
+    messages.append({"role": last["role"], "content": content})
+    return messages
+
+
+def usage_dict(usage) -> Dict[str, int]:
+    """Token usage of one call, including cache reads and writes."""
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+    }
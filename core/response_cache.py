@@ -0,0 +1,200 @@
+"""
+Response Cache
+Content-addressed cache for analyzer calls that are pure functions of their input.
+
+Keys hash the method name together with the full request (model, rendered
+prompt template, normalized input, max_tokens), so editing a prompt template
+or switching models misses old entries without any manual versioning.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Normalize pasted input so trivially different copies share a cache entry."""
+    text = unicodedata.normalize("NFC", text)
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def is_cacheable(result: Any) -> bool:
+    """Only successful parses are cached: not error dicts or empty fallbacks."""
+    if isinstance(result, dict):
+        return "error" not in result
+    return bool(result)
+
+
+class ResponseCache:
+    """
+    Two-tier cache: an in-memory LRU in front of an optional SQLite file.
+    Values are stored as JSON, so every hit returns a fresh copy. Coroutines
+    use aget/aset, which keep the disk tier off the event loop.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 2048,
+                 ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # Memory-tier lock; the SQLite connection has its own, so a memory
+        # lookup never waits behind disk I/O
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db = None
+        self.stats_by_method: Dict[str, Dict[str, int]] = {}
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, method TEXT, value TEXT, created REAL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(method: str, request: Dict) -> str:
+        payload = json.dumps({"method": method, "request": request}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @property
+    def persistent(self) -> bool:
+        """Whether there is a disk tier (lookups that miss memory do SQLite I/O)."""
+        return self._db is not None
+
+    def get(self, method: str, key: str) -> Optional[Any]:
+        value = self._get_memory(method, key)
+        if value is not None:
+            return value
+        return self._get_disk(method, key)
+
+    def set(self, method: str, key: str, value: Any):
+        serialized, created = json.dumps(value), time.time()
+        with self._lock:
+            self._remember(key, serialized, created)
+        self._set_disk(method, key, serialized, created)
+
+    async def aget(self, method: str, key: str) -> Optional[Any]:
+        """get() for coroutines: memory hits answer at once, the disk tier is read in a thread."""
+        value = self._get_memory(method, key)
+        if value is not None:
+            return value
+        if self._db is None:
+            return self._get_disk(method, key)  # only counts the miss
+        return await asyncio.to_thread(self._get_disk, method, key)
+
+    async def aset(self, method: str, key: str, value: Any):
+        """set() for coroutines: the disk write and commit run in a thread."""
+        serialized, created = json.dumps(value), time.time()
+        with self._lock:
+            self._remember(key, serialized, created)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_disk, method, key, serialized, created)
+
+    def _get_memory(self, method: str, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None or time.time() - entry[1] > self.ttl:
+                return None
+            self._memory.move_to_end(key)
+            self._count(method, "memory_hits")
+            return json.loads(entry[0])
+
+    def _get_disk(self, method: str, key: str) -> Optional[Any]:
+        """The disk tier's entry (promoted to memory), counting a miss if there is none."""
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        with self._lock:
+            if row is not None and time.time() - row[1] <= self.ttl:
+                self._remember(key, row[0], row[1])
+                self._count(method, "disk_hits")
+                return json.loads(row[0])
+            self._count(method, "misses")
+            return None
+
+    def _set_disk(self, method: str, key: str, serialized: str, created: float):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, method, value, created) VALUES (?, ?, ?, ?)",
+                (key, method, serialized, created)
+            )
+            self._db.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired entries from both tiers; returns how many disk rows went."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for key in [k for k, (_, created) in self._memory.items() if created < cutoff]:
+                del self._memory[key]
+        if self._db is None:
+            return 0
+        with self._db_lock:
+            deleted = self._db.execute("DELETE FROM responses WHERE created < ?", (cutoff,)).rowcount
+            self._db.commit()
+        return deleted
+
+    def stats(self) -> Dict:
+        with self._lock:
+            by_method = {method: dict(counts) for method, counts in self.stats_by_method.items()}
+            entries = len(self._memory)
+        totals = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        for counts in by_method.values():
+            for name in totals:
+                totals[name] += counts.get(name, 0)
+        lookups = sum(totals.values())
+        return {
+            **totals,
+            "hit_rate": round((totals["memory_hits"] + totals["disk_hits"]) / lookups, 3) if lookups else 0.0,
+            "memory_entries": entries,
+            "disk_path": self.path,
+            "ttl": self.ttl,
+            "by_method": by_method,
+        }
+
+    def _remember(self, key: str, serialized: str, created: float):
+        self._memory[key] = (serialized, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _count(self, method: str, name: str):
+        counts = self.stats_by_method.setdefault(method, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        counts[name] += 1
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    The process-wide cache, configured from RESPONSE_CACHE_PATH (SQLite file;
+    memory only if unset), RESPONSE_CACHE_SIZE and RESPONSE_CACHE_TTL (seconds).
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                path=os.environ.get("RESPONSE_CACHE_PATH") or None,
+                max_entries=int(os.environ.get("RESPONSE_CACHE_SIZE", 2048)),
+                ttl=float(os.environ.get("RESPONSE_CACHE_TTL", 7 * 24 * 3600)),
+            )
+        return _default_cache
@@ -0,0 +1,538 @@
+"""
+Request Scheduler
+Every outbound messages.create/stream call from the core classes passes
+through one scheduler per process, so background work cannot use up the
+org rate limit that the interactive dialogue depends on.
+
+- Pacing: token buckets for requests and input tokens per minute, resynced
+  from the anthropic-ratelimit-* headers on every response.
+- Priorities: interactive > analysis > batch. Waiters are admitted in
+  priority order, and lower classes must leave a share of each bucket
+  untouched (RESERVE), which stays available to the classes above them.
+- Retries: 429, 529 and transient 5xx/connection errors are retried with
+  full-jitter exponential backoff (or the server's retry-after), re-queued at
+  the same priority.
+- Metrics: queue depth per class, admissions, waits, throttles and retries;
+  each attempt's latency and usage are reported to core.telemetry.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from . import budget, telemetry
+from .context_window import estimate_tokens
+
+INTERACTIVE = "interactive"
+ANALYSIS = "analysis"
+BATCH = "batch"
+
+PRIORITIES = (INTERACTIVE, ANALYSIS, BATCH)
+
+# Share of each bucket a class may not dip into
+RESERVE = {INTERACTIVE: 0.0, ANALYSIS: 0.1, BATCH: 0.3}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """
+    Continuous-refill bucket. Unlimited (capacity None) until a limit is set
+    or learned from rate-limit headers.
+    """
+
+    def __init__(self, per_minute: Optional[float] = None):
+        self.capacity = per_minute
+        self.level = per_minute or 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, reserve: float, now: float) -> float:
+        """Seconds until `amount` can be taken while leaving reserve * capacity behind."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        # A request bigger than the bucket waits for a full bucket, not forever
+        needed = min(amount, self.capacity) + reserve * self.capacity
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) * 60 / self.capacity
+
+    def take(self, amount: float, now: float):
+        if self.capacity is not None:
+            self._refill(now)
+            self.level -= amount
+
+    def observe(self, limit: Optional[float], remaining: Optional[float], now: float):
+        """Resync from the server's view of the limit."""
+        if limit is not None:
+            self.capacity = limit
+        if remaining is not None and self.capacity is not None:
+            self._refill(now)
+            self.level = min(self.capacity, remaining)
+
+    def block(self, seconds: float, now: float):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        if self.capacity is not None:
+            self.level = 0.0
+            self.updated = now
+
+
+def _header_number(headers, name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _seconds_until(timestamp: Optional[str], now_wall: float) -> Optional[float]:
+    if not timestamp:
+        return None
+    try:
+        return max(datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp() - now_wall, 0.0)
+    except ValueError:
+        return None
+
+
+def estimate_request_tokens(request: Dict) -> int:
+    """Input tokens a request will use, estimated from its system and messages."""
+    return estimate_tokens(json.dumps(request.get("system", ""))) + estimate_tokens(
+        json.dumps(request.get("messages", [])))
+
+
+class RequestScheduler:
+    """Admission control shared by all sync and async clients in the process."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 input_tokens_per_minute: Optional[float] = None,
+                 max_retries: int = 4, backoff_base: float = 1.0, backoff_max: float = 30.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.input_tokens = TokenBucket(input_tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._queue = []
+        self._wakers: Dict[tuple, Callable[[], None]] = {}
+        self._seq = itertools.count()
+        self._metrics = {
+            priority: {"queued": 0, "peak_queued": 0, "admitted": 0, "wait_seconds": 0.0,
+                       "max_wait_seconds": 0.0, "retries": 0, "failed": 0}
+            for priority in PRIORITIES
+        }
+        self._throttled = {}
+
+    # --- admission ---
+    #
+    # Only the head of the queue looks at the buckets. Everyone else sleeps
+    # until woken: each waiter registers a waker, and whoever changes the
+    # head (an admission, an abandoned ticket) or the buckets (rate-limit
+    # headers) wakes the head alone.
+
+    def _enqueue(self, priority: str, waker: Callable[[], None]) -> tuple:
+        ticket = (PRIORITIES.index(priority), next(self._seq))
+        with self._lock:
+            heapq.heappush(self._queue, ticket)
+            self._wakers[ticket] = waker
+            metrics = self._metrics[priority]
+            metrics["queued"] += 1
+            metrics["peak_queued"] = max(metrics["peak_queued"], metrics["queued"])
+        return ticket
+
+    def _wake_head(self):
+        """Wake whoever is now at the head of the queue; the caller holds the lock."""
+        if self._queue:
+            self._wakers[self._queue[0]]()
+
+    def _try_admit(self, ticket: tuple, priority: str, tokens: int, queued_at: float) -> Optional[float]:
+        """
+        Admit the ticket (returns 0), or return how long the head must wait
+        for the buckets, or None if the ticket is not at the head.
+        """
+        with self._lock:
+            if self._queue[0] != ticket:
+                return None
+            now = time.monotonic()
+            reserve = RESERVE[priority]
+            wait = max(self.requests.wait_time(1, reserve, now),
+                       self.input_tokens.wait_time(tokens, reserve, now))
+            if wait > 0:
+                return wait
+
+            heapq.heappop(self._queue)
+            del self._wakers[ticket]
+            self.requests.take(1, now)
+            self.input_tokens.take(tokens, now)
+            waited = now - queued_at
+            metrics = self._metrics[priority]
+            metrics["queued"] -= 1
+            metrics["admitted"] += 1
+            metrics["wait_seconds"] += waited
+            metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], waited)
+            self._wake_head()
+            return 0.0
+
+    def _abandon(self, ticket: tuple, priority: str):
+        with self._lock:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                del self._wakers[ticket]
+                self._metrics[priority]["queued"] -= 1
+                self._wake_head()
+
+    def acquire(self, priority: str, tokens: int):
+        """Block until a request of this priority and size may be sent."""
+        woken = threading.Event()
+        ticket = self._enqueue(priority, woken.set)
+        queued_at = time.monotonic()
+        try:
+            while True:
+                # Cleared before looking, so a wake-up that lands after the look is kept
+                woken.clear()
+                wait = self._try_admit(ticket, priority, tokens, queued_at)
+                if wait == 0:
+                    return
+                woken.wait(timeout=wait)
+        except BaseException:
+            self._abandon(ticket, priority)
+            raise
+
+    async def acquire_async(self, priority: str, tokens: int):
+        woken = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(woken.set)
+            except RuntimeError:
+                pass  # the loop has closed; its waiter is gone
+
+        ticket = self._enqueue(priority, wake)
+        queued_at = time.monotonic()
+        try:
+            while True:
+                woken.clear()
+                wait = self._try_admit(ticket, priority, tokens, queued_at)
+                if wait == 0:
+                    return
+                try:
+                    await asyncio.wait_for(woken.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(ticket, priority)
+            raise
+
+    # --- feedback from responses ---
+
+    def observe_headers(self, headers):
+        """Resync the buckets from anthropic-ratelimit-* response headers."""
+        now, now_wall = time.monotonic(), time.time()
+        with self._lock:
+            self.requests.observe(
+                _header_number(headers, "anthropic-ratelimit-requests-limit"),
+                _header_number(headers, "anthropic-ratelimit-requests-remaining"),
+                now,
+            )
+            self.input_tokens.observe(
+                _header_number(headers, "anthropic-ratelimit-input-tokens-limit"),
+                _header_number(headers, "anthropic-ratelimit-input-tokens-remaining"),
+                now,
+            )
+            # The head's wait may be shorter now
+            self._wake_head()
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a failed call, or None if it should not be retried."""
+        import anthropic
+
+        status = getattr(error, "status_code", None)
+        transient = isinstance(error, anthropic.APIConnectionError) or status in RETRY_STATUSES
+        if not transient or attempt >= self.max_retries:
+            return None
+
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        retry_after = _header_number(headers, "retry-after")
+        if retry_after is None:
+            retry_after = _seconds_until(headers.get("anthropic-ratelimit-requests-reset"), time.time()) \
+                if status == 429 else None
+        # Full jitter, so a burst of 429s does not retry in lockstep
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, self.backoff_base)
+
+        with self._lock:
+            key = str(status or type(error).__name__)
+            self._throttled[key] = self._throttled.get(key, 0) + 1
+            if status == 429:
+                # Everyone waits out the limit, not just this caller
+                self.requests.block(delay, time.monotonic())
+        return delay
+
+    def record_retry(self, priority: str, failed: bool = False):
+        with self._lock:
+            self._metrics[priority]["failed" if failed else "retries"] += 1
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            buckets = {}
+            for name, bucket in (("requests", self.requests), ("input_tokens", self.input_tokens)):
+                bucket._refill(now)
+                buckets[name] = {
+                    "per_minute": bucket.capacity,
+                    "available": None if bucket.capacity is None else round(bucket.level, 1),
+                    "blocked_for": round(max(bucket.blocked_until - now, 0.0), 2),
+                }
+            return {
+                "queue_depth": sum(m["queued"] for m in self._metrics.values()),
+                "priorities": {
+                    priority: {
+                        **metrics,
+                        "wait_seconds": round(metrics["wait_seconds"], 3),
+                        "max_wait_seconds": round(metrics["max_wait_seconds"], 3),
+                        "avg_wait_seconds": round(metrics["wait_seconds"] / metrics["admitted"], 3)
+                        if metrics["admitted"] else 0.0,
+                    }
+                    for priority, metrics in self._metrics.items()
+                },
+                "buckets": buckets,
+                "throttled": dict(self._throttled),
+                "reserve": dict(RESERVE),
+            }
+
+
+class _ScheduledStream:
+    """Context manager that waits for admission before opening the underlying stream."""
+
+    def __init__(self, messages: "ScheduledMessages", request: Dict):
+        self._messages = messages
+        self._request = request
+        self._manager = None
+        self._stream = None
+        self._method = telemetry.calling_method()
+        self._started = 0.0
+        self._budgets = ()
+
+    def __enter__(self):
+        owner = self._messages
+        self._request, self._budgets = owner._fit(self._request)
+        for attempt in itertools.count():
+            owner.scheduler.acquire(owner.priority, estimate_request_tokens(self._request))
+            self._started = time.perf_counter()
+            self._manager = owner._messages.stream(**self._request)
+            try:
+                self._stream = self._manager.__enter__()
+                return self._stream
+            except Exception as e:
+                owner._record(self._method, self._request, self._started, error=e)
+                delay = owner._retry(e, attempt)
+                time.sleep(delay)
+
+    def __exit__(self, *exc):
+        usage = None
+        if exc[0] is None:
+            try:
+                usage = self._stream.get_final_message().usage
+            except Exception:
+                pass
+        budget.charge(self._budgets, usage)
+        self._messages._record(self._method, self._request, self._started, usage, exc[1])
+        return self._manager.__exit__(*exc)
+
+    async def __aenter__(self):
+        owner = self._messages
+        self._request, self._budgets = await owner._fit_async(self._request)
+        for attempt in itertools.count():
+            await owner.scheduler.acquire_async(owner.priority, estimate_request_tokens(self._request))
+            self._started = time.perf_counter()
+            self._manager = owner._messages.stream(**self._request)
+            try:
+                self._stream = await self._manager.__aenter__()
+                return self._stream
+            except Exception as e:
+                owner._record(self._method, self._request, self._started, error=e)
+                delay = owner._retry(e, attempt)
+                await asyncio.sleep(delay)
+
+    async def __aexit__(self, *exc):
+        usage = None
+        if exc[0] is None:
+            try:
+                usage = (await self._stream.get_final_message()).usage
+            except Exception:
+                pass
+        budget.charge(self._budgets, usage)
+        self._messages._record(self._method, self._request, self._started, usage, exc[1])
+        return await self._manager.__aexit__(*exc)
+
+
+class ScheduledMessages:
+    """The messages resource of a client, with create/stream routed through the scheduler."""
+
+    def __init__(self, messages, scheduler: RequestScheduler, priority: str, is_async: bool):
+        self._messages = messages
+        self.scheduler = scheduler
+        self.priority = priority
+        self._is_async = is_async
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+    def _retry(self, error: Exception, attempt: int) -> float:
+        delay = self.scheduler.retry_delay(error, attempt)
+        if delay is None:
+            self.scheduler.record_retry(self.priority, failed=True)
+            raise error
+        self.scheduler.record_retry(self.priority)
+        return delay
+
+    def _record(self, method: str, request: Dict, started: float, usage=None, error=None):
+        telemetry.record_call(method, request.get("model", "unknown"), time.perf_counter() - started,
+                              usage, error, self.priority)
+
+    def _fit(self, request: Dict):
+        """Fit a request into the active token budgets (see core.budget); returns it and the budgets."""
+        budgets = budget.active_budgets()
+        if not budgets:
+            return request, budgets
+        input_tokens = estimate_request_tokens(request)
+        if budget.needs_count(request, input_tokens, budgets):
+            try:
+                input_tokens = self._messages.count_tokens(**budget.count_request(request)).input_tokens
+            except Exception:
+                pass  # counting is best effort; the estimate still applies
+        return budget.fit_request(request, input_tokens, budgets), budgets
+
+    async def _fit_async(self, request: Dict):
+        budgets = budget.active_budgets()
+        if not budgets:
+            return request, budgets
+        input_tokens = estimate_request_tokens(request)
+        if budget.needs_count(request, input_tokens, budgets):
+            try:
+                input_tokens = (await self._messages.count_tokens(**budget.count_request(request))).input_tokens
+            except Exception:
+                pass
+        return budget.fit_request(request, input_tokens, budgets), budgets
+
+    def create(self, **request):
+        if self._is_async:
+            return self._create_async(request)
+        method = telemetry.calling_method()
+        request, budgets = self._fit(request)
+        for attempt in itertools.count():
+            self.scheduler.acquire(self.priority, estimate_request_tokens(request))
+            started = time.perf_counter()
+            try:
+                response = self._messages.create(**request)
+            except Exception as e:
+                self._record(method, request, started, error=e)
+                time.sleep(self._retry(e, attempt))
+                continue
+            budget.charge(budgets, response.usage)
+            self._record(method, request, started, response.usage)
+            return response
+
+    async def _create_async(self, request: Dict):
+        method = telemetry.calling_method()
+        request, budgets = await self._fit_async(request)
+        for attempt in itertools.count():
+            await self.scheduler.acquire_async(self.priority, estimate_request_tokens(request))
+            started = time.perf_counter()
+            try:
+                response = await self._messages.create(**request)
+            except Exception as e:
+                self._record(method, request, started, error=e)
+                await asyncio.sleep(self._retry(e, attempt))
+                continue
+            budget.charge(budgets, response.usage)
+            self._record(method, request, started, response.usage)
+            return response
+
+    def stream(self, **request):
+        return _ScheduledStream(self, request)
+
+
+class ScheduledClient:
+    """
+    A shared client seen through one priority class. The client is given as
+    a function that returns it, called on the first request, so holding a
+    ScheduledClient costs nothing until it is used. `generation`, if given,
+    numbers the clients the loader hands out; when it changes (the registry
+    closed them), the client is loaded again.
+    """
+
+    def __init__(self, load_client: Callable, scheduler: RequestScheduler, priority: str, is_async: bool = False,
+                 generation: Optional[Callable[[], int]] = None):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        self._load_client = load_client
+        self._generation = generation
+        self._loaded_generation = None
+        self._client = None
+        self._messages = None
+        self._scheduler = scheduler
+        self._is_async = is_async
+        self.priority = priority
+
+    @property
+    def client(self):
+        """The SDK client, loaded on first use and again after the registry is reset."""
+        generation = self._generation() if self._generation else None
+        if self._client is None or generation != self._loaded_generation:
+            self._client = self._load_client()
+            self._messages = None
+            self._loaded_generation = generation
+        return self._client
+
+    @property
+    def messages(self) -> ScheduledMessages:
+        client = self.client
+        if self._messages is None:
+            self._messages = ScheduledMessages(client.messages, self._scheduler, self.priority, self._is_async)
+        return self._messages
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """
+    The process-wide scheduler. RATE_LIMIT_RPM and RATE_LIMIT_INPUT_TPM set
+    starting limits; otherwise pacing starts once the first response's
+    rate-limit headers arrive. API_MAX_RETRIES (default 4) caps retries.
+    """
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            rpm = os.environ.get("RATE_LIMIT_RPM")
+            tpm = os.environ.get("RATE_LIMIT_INPUT_TPM")
+            _default_scheduler = RequestScheduler(
+                requests_per_minute=float(rpm) if rpm else None,
+                input_tokens_per_minute=float(tpm) if tpm else None,
+                max_retries=int(os.environ.get("API_MAX_RETRIES", 4)),
+            )
+        return _default_scheduler
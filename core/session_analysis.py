@@ -0,0 +1,288 @@
+"""
+Session Analysis
+ArgumentAnalyzer.analyze_dialogue and UserProfiler.assess_sophistication
+over every session at once, for an operator's view of argument quality and
+difficulty across the whole service.
+
+Sessions come from the dialogue store, plus any live sessions the caller
+passes in that are not stored. At most `workers` are analyzed at a time, at
+batch priority, so the fan-out never competes with live dialogue. Each
+result is recorded with the session's version (generation and turn count);
+a session still at that version is not analyzed again, and its recorded
+result counts towards the totals as it is. run() yields the running totals
+after every session, so a dashboard fills in as results arrive.
+
+Only one run happens at a time: a run holds a lease, in the dialogue store
+when there is one (so it covers every worker and the CLI), renewed as
+sessions complete. A run made within a token budget (the web route's) stops
+scheduling sessions once that budget is spent.
+"""
+
+import contextvars
+import secrets
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .adaptive_difficulty import UserProfiler
+from .argument_analyzer import ArgumentAnalyzer
+from .budget import active_budgets
+from .clients import get_client
+from .corpus import analyze_history
+from .dialogue_store import get_dialogue_store
+from .scheduler import BATCH
+
+# Fallacy types listed in the totals
+TOP_FALLACIES = 5
+# Upper bound on concurrent sessions a caller may ask for
+MAX_WORKERS = 16
+# A run's lease lapses this long after its last completed session (a crashed run)
+RUN_LEASE_SECONDS = 300
+RUN_LEASE = "session-analysis"
+
+
+class AnalysisRunning(Exception):
+    """Another analysis run is in progress."""
+
+
+def live_version(history: List[Dict]) -> List:
+    """Version of a session known only from memory: its length and last turn."""
+    last = history[-1]["content"] if history else ""
+    return ["live", len(history), zlib.crc32(str(last).encode("utf-8"))]
+
+
+class AnalysisLedger:
+    """
+    Each session's last analysis and the version it was made at: in the
+    dialogue store's file when there is one (so it survives restarts and is
+    shared by workers and the CLI), else in memory.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self._results: Dict[str, Tuple[Any, Dict]] = {}
+        self._run_owner: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Tuple[Any, Dict]]:
+        if self.store is not None:
+            return self.store.last_analysis(session_id)
+        with self._lock:
+            return self._results.get(session_id)
+
+    def put(self, session_id: str, version: Any, result: Dict):
+        if self.store is not None:
+            self.store.save_analysis(session_id, version, result)
+            return
+        with self._lock:
+            self._results[session_id] = (version, result)
+
+    def claim_run(self, owner: str) -> bool:
+        """Take, or renew, the right to run; False if another run holds it."""
+        if self.store is not None:
+            return self.store.claim_lease(RUN_LEASE, owner, RUN_LEASE_SECONDS)
+        with self._lock:
+            if self._run_owner not in (None, owner):
+                return False
+            self._run_owner = owner
+            return True
+
+    def release_run(self, owner: str):
+        if self.store is not None:
+            self.store.release_lease(RUN_LEASE, owner)
+            return
+        with self._lock:
+            if self._run_owner == owner:
+                self._run_owner = None
+
+    def run_active(self) -> bool:
+        if self.store is not None:
+            return self.store.lease_holder(RUN_LEASE) is not None
+        with self._lock:
+            return self._run_owner is not None
+
+
+class AnalysisTotals:
+    """Running aggregate of session analyses."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.strength = Counter()
+        self.levels = Counter()
+        self.fallacy_types = Counter()
+        self.fallacies = 0
+        self.contradictions = 0
+        self.aporia = 0
+        self._consistency: List[float] = []
+        self._sophistication: List[float] = []
+        # Why the run stopped before the last session, if it did
+        self.stopped: Optional[str] = None
+
+    def add(self, status: str, result: Optional[Dict] = None):
+        self.counts[status] += 1
+        if status not in ("analyzed", "unchanged") or not result:
+            return
+        analysis, sophistication = result["analysis"], result["sophistication"]
+
+        self.strength[analysis.get("argument_strength", "unknown")] += 1
+        if isinstance(analysis.get("consistency_score"), (int, float)):
+            self._consistency.append(analysis["consistency_score"])
+        fallacies = analysis.get("fallacies") or []
+        self.fallacies += len(fallacies)
+        self.fallacy_types.update(f.get("type", "unknown") for f in fallacies)
+        self.contradictions += len(analysis.get("contradictions") or [])
+        self.aporia += bool(analysis.get("aporia_reached"))
+
+        self.levels[sophistication.get("level", "unknown")] += 1
+        score = sophistication.get("overall_score", sophistication.get("score"))
+        if isinstance(score, (int, float)):
+            self._sophistication.append(score)
+
+    def to_dict(self) -> Dict:
+        scored = self.counts["analyzed"] + self.counts["unchanged"]
+        return {
+            "sessions": sum(self.counts.values()),
+            "analyzed": self.counts["analyzed"],
+            "unchanged": self.counts["unchanged"],
+            "too_short": self.counts["too_short"],
+            "errors": self.counts["error"],
+            "argument_strength": dict(self.strength),
+            "consistency_score": _mean(self._consistency),
+            "fallacies_per_session": round(self.fallacies / scored, 2) if scored else None,
+            "top_fallacies": self.fallacy_types.most_common(TOP_FALLACIES),
+            "contradictions": self.contradictions,
+            "aporia_reached": self.aporia,
+            "levels": dict(self.levels),
+            "sophistication_score": _mean(self._sophistication),
+            "stopped": self.stopped,
+        }
+
+
+def _mean(values: List[float]) -> Optional[Dict]:
+    if not values:
+        return None
+    return {"mean": round(sum(values) / len(values), 1), "min": min(values), "max": max(values)}
+
+
+class SessionAnalyzer:
+    """
+    Fan-out of analyze_dialogue and assess_sophistication over sessions,
+    `workers` at a time. Sessions are loaded in the worker that analyzes
+    them, so no more than `workers` histories are in memory at once.
+    """
+
+    def __init__(self, store=None, ledger: Optional[AnalysisLedger] = None, workers: int = 4,
+                 api_key: Optional[str] = None, analyzer: Optional[ArgumentAnalyzer] = None,
+                 profiler: Optional[UserProfiler] = None):
+        self.store = store
+        self.ledger = ledger or AnalysisLedger(store)
+        self.workers = workers
+        # Both are stateless, so one instance serves every worker thread
+        self.analyzer = analyzer or ArgumentAnalyzer(api_key=api_key)
+        self.profiler = profiler or UserProfiler(api_key=api_key)
+        if analyzer is None:
+            self.analyzer.client = get_client(api_key, BATCH)
+        if profiler is None:
+            self.profiler.client = get_client(api_key, BATCH)
+
+    def sessions(self, live: Iterable[Dict] = (), since: Optional[float] = None
+                 ) -> Iterator[Tuple[str, Any, Callable[[], List[Dict]]]]:
+        """
+        (session_id, version, load_history) for every stored session (active
+        after `since`, if given), then every live record not in the store.
+        """
+        if self.store is not None:
+            for session_id in self.store.session_ids(since):
+                version = self.store.version(session_id)
+                if version is not None:
+                    yield session_id, list(version), lambda session_id=session_id: (
+                        self.store.load(session_id) or {}).get("history", [])
+        for record in live:
+            if self.store is not None and self.store.version(record["id"]) is not None:
+                continue
+            history = record["history"]
+            yield record["id"], live_version(history), lambda history=history: history
+
+    def run(self, live: Iterable[Dict] = (), since: Optional[float] = None,
+            force: bool = False) -> Iterator[Dict]:
+        """
+        Analyze every session that changed since its last analysis (every
+        session, with force). Yields {"session", "status", "totals"} as each
+        one completes; status is analyzed, unchanged, too_short or error.
+        Raises AnalysisRunning, before any work, if another run is active.
+        """
+        owner = secrets.token_hex(8)
+        if not self.ledger.claim_run(owner):
+            raise AnalysisRunning("An analysis run is already in progress")
+        totals = AnalysisTotals()
+
+        def event(session_id: str, status: str, result: Optional[Dict] = None) -> Dict:
+            totals.add(status, result)
+            if totals.stopped is None:
+                if any(budget.remaining == 0 or budget.refused for budget in active_budgets()):
+                    totals.stopped = "token budget exhausted"
+                elif not self.ledger.claim_run(owner):
+                    totals.stopped = "another run took over"
+            update = {"session": session_id[:6], "status": status, "totals": totals.to_dict()}
+            if status == "error":
+                update["error"] = result["error"]
+            return update
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="session-analysis")
+        pending = {}
+        try:
+            for session_id, version, load in self.sessions(live, since):
+                if totals.stopped:
+                    break
+                last = None if force else self.ledger.get(session_id)
+                if last is not None and last[0] == version:
+                    yield event(session_id, "unchanged", last[1])
+                    continue
+
+                while len(pending) >= self.workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield event(pending.pop(future), *future.result())
+                if totals.stopped:
+                    break
+
+                # Each task carries this request's context (trace ID, budgets)
+                task = contextvars.copy_context().run
+                pending[pool.submit(task, self._analyze, session_id, version, load)] = session_id
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield event(pending.pop(future), *future.result())
+        finally:
+            # A closed stream stops the fan-out: queued sessions are dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.ledger.release_run(owner)
+
+    def _analyze(self, session_id: str, version: Any, load: Callable[[], List[Dict]]) -> Tuple[str, Optional[Dict]]:
+        try:
+            history = load()
+            if sum(1 for message in history if message["role"] == "user") < 2:
+                return "too_short", None
+            result = analyze_history(self.analyzer, self.profiler, history)
+        except Exception as e:
+            return "error", {"error": str(e)}
+        if "error" in result:
+            return "error", result
+        self.ledger.put(session_id, version, result)
+        return "analyzed", result
+
+
+_default_ledger = None
+_default_lock = threading.Lock()
+
+
+def get_analysis_ledger() -> AnalysisLedger:
+    """The process-wide ledger, kept in the dialogue store when DIALOGUE_STORE_PATH is set."""
+    global _default_ledger
+    with _default_lock:
+        if _default_ledger is None:
+            _default_ledger = AnalysisLedger(get_dialogue_store())
+        return _default_ledger
@@ -0,0 +1,211 @@
+"""
+Session Store
+Bounded in-memory store for per-session state, with LRU and idle-TTL eviction.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Attributes that point at process-wide objects (pooled clients, the
+# dialogue store), which should not be charged to any one session.
+SHARED_ATTRS = {"client", "store"}
+
+
+def estimate_bytes(obj: Any, memo: Optional[Dict] = None) -> int:
+    """
+    Rough deep size of a session's state: containers, strings and object
+    attributes. Pass the same memo dict on every call for one session and
+    lists that have only grown since (dialogue histories) are charged for
+    their new items alone, so re-measuring does not re-walk old turns.
+    """
+    seen = set()
+    size = _estimate(obj, seen, memo)
+    if memo is not None:
+        # Forget lists that are no longer part of the state
+        for key in [key for key in memo if key not in seen]:
+            del memo[key]
+    return size
+
+
+def _estimate(obj: Any, seen: set, memo: Optional[Dict]) -> int:
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        # Counted at every occurrence (interned keys included), so a memoized
+        # list charges the same as walking it again would
+        return size
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, dict):
+        return size + sum(_estimate(k, seen, memo) + _estimate(v, seen, memo) for k, v in list(obj.items()))
+    if isinstance(obj, list) and memo is not None:
+        # memo holds (the list, items already counted, their size, the last
+        # of them); keeping the list itself means its id cannot be reused,
+        # and a popped-and-replaced last item forces a full re-count
+        items = obj[:]
+        known = memo.get(id(obj))
+        counted, counted_bytes = 0, 0
+        if (known is not None and known[0] is obj and 0 < known[1] <= len(items)
+                and items[known[1] - 1] is known[3]):
+            counted, counted_bytes = known[1], known[2]
+        counted_bytes += sum(_estimate(item, seen, memo) for item in items[counted:])
+        if items:
+            memo[id(obj)] = (obj, len(items), counted_bytes, items[-1])
+        return size + counted_bytes
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(_estimate(item, seen, memo) for item in list(obj))
+    if hasattr(obj, "__dict__"):
+        return size + sum(
+            _estimate(v, seen, memo) for k, v in list(vars(obj).items()) if k not in SHARED_ATTRS
+        )
+    return size
+
+
+class SessionStore:
+    """
+    Maps session IDs to state, evicting least-recently-used sessions once the
+    session count or estimated byte total exceeds its cap, and sessions idle
+    longer than idle_ttl seconds.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 256 * 1024 * 1024,
+                 idle_ttl: float = 3600, on_evict: Optional[Callable[[str, Any, str], None]] = None):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._total_bytes = 0
+        self.evictions = {"lru": 0, "bytes": 0, "ttl": 0}
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Return a session's state and mark it most recently used."""
+        evicted = []
+        with self._lock:
+            evicted += self._expire()
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry["last_access"] = time.monotonic()
+                self._entries.move_to_end(session_id)
+        self._notify(evicted)
+        return entry["value"] if entry is not None else None
+
+    def get_or_create(self, session_id: str, factory: Callable[[], Any]) -> Any:
+        value = self.get(session_id)
+        if value is None:
+            value = factory()
+            self.put(session_id, value)
+        return value
+
+    def put(self, session_id: str, value: Any):
+        with self._lock:
+            self._remove(session_id)
+            self._entries[session_id] = {
+                "value": value,
+                "bytes": 0,
+                "last_access": time.monotonic(),
+                "memo": {},
+                "measuring": threading.Lock(),
+            }
+        self.touch(session_id)
+
+    def touch(self, session_id: str):
+        """Re-measure a session after it changed and enforce the caps."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+        if entry is not None:
+            # Measure outside the store lock, so only touches of this same
+            # session wait on it; the memo keeps it to the turns added since
+            with entry["measuring"]:
+                size = estimate_bytes(entry["value"], entry["memo"])
+        evicted = []
+        with self._lock:
+            if entry is not None and self._entries.get(session_id) is entry:
+                self._total_bytes += size - entry["bytes"]
+                entry["bytes"] = size
+            evicted += self._enforce_caps()
+        self._notify(evicted)
+
+    def pop(self, session_id: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._remove(session_id)
+        return entry["value"] if entry is not None else None
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def items(self):
+        """Snapshot of (session_id, state) pairs, least recently used first."""
+        with self._lock:
+            return [(session_id, entry["value"]) for session_id, entry in self._entries.items()]
+
+    def stats(self) -> Dict:
+        """Live sessions, estimated bytes per session and eviction counts."""
+        now = time.monotonic()
+        with self._lock:
+            sessions = [
+                {
+                    "id": session_id[:6],
+                    "bytes": entry["bytes"],
+                    "idle_seconds": round(now - entry["last_access"], 1),
+                }
+                for session_id, entry in self._entries.items()
+            ]
+            return {
+                "live_sessions": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "idle_ttl": self.idle_ttl,
+                "evictions": dict(self.evictions),
+                "sessions": sessions,
+            }
+
+    def _remove(self, session_id: str) -> Optional[Dict]:
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._total_bytes -= entry["bytes"]
+        return entry
+
+    def _evict(self, session_id: str, reason: str) -> tuple:
+        entry = self._remove(session_id)
+        self.evictions[reason] += 1
+        return session_id, entry["value"], reason
+
+    def _expire(self) -> list:
+        evicted = []
+        if self.idle_ttl:
+            cutoff = time.monotonic() - self.idle_ttl
+            # Oldest first: stop at the first session that is still fresh
+            while self._entries:
+                session_id, entry = next(iter(self._entries.items()))
+                if entry["last_access"] >= cutoff:
+                    break
+                evicted.append(self._evict(session_id, "ttl"))
+        return evicted
+
+    def _enforce_caps(self) -> list:
+        evicted = self._expire()
+        while len(self._entries) > self.max_sessions:
+            evicted.append(self._evict(next(iter(self._entries)), "lru"))
+        # Always keep the most recent session, even if it alone exceeds the cap
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            evicted.append(self._evict(next(iter(self._entries)), "bytes"))
+        return evicted
+
+    def _notify(self, evicted: list):
+        # Run hooks outside the lock so they may touch the store themselves
+        if self.on_evict:
+            for session_id, value, reason in evicted:
+                self.on_evict(session_id, value, reason)
@@ -3,8 +3,11 @@ Socratic Dialogue Engine v2
 The core of the examined game — now with philosophical modes and security thinking.
 """
 
-import anthropic
-from typing import Optional
+from typing import Iterator, Optional
+from .clients import get_client
+from .context_window import ContextWindow
+from .dialogue_store import DialogueConflict
+from .prompt_cache import cached_messages, cached_system, usage_dict
 
 MODES = {
     "socratic": {
@@ -164,12 +167,15 @@ Be rigorous. Security is a domain where unexamined assumptions get people hurt."
 
 class SocraticDialogue:
     def __init__(self, api_key: Optional[str] = None):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = get_client(api_key)
         self.history = []
         self.topic = None
         self.mode = "socratic"
         self.is_security = False
         self.model = "claude-sonnet-4-20250514"
+        self.last_usage = None
+        self.context = ContextWindow(self.client, self.model)
+        self.journal = None  # core.dialogue_store.SessionJournal, when persisted
     
     def set_mode(self, mode_key: str):
         if mode_key in MODES:
@@ -177,6 +183,11 @@ class SocraticDialogue:
         return MODES.get(self.mode, MODES["socratic"])
     
     def set_topic(self, topic_key: str, custom_topic: str = None, security: bool = False):
+        self._set_topic(topic_key, custom_topic, security)
+        self._start_journal()
+        return self.topic
+    
+    def _set_topic(self, topic_key: str, custom_topic: str = None, security: bool = False):
         self.is_security = security
         topics = SECURITY_TOPICS if security else TOPICS
         
@@ -188,47 +199,168 @@ class SocraticDialogue:
             self.topic = topic_key
         
         self.history = []
-        return self.topic
+        self.context.reset()
     
     def get_system_prompt(self):
+        return self._static_prompt() + self._dynamic_prompt()
+    
+    def _static_prompt(self) -> str:
+        """The persona part of the system prompt, identical across sessions."""
         mode_data = MODES.get(self.mode, MODES["socratic"])
         prompt = mode_data["prompt"]
         
         if self.is_security:
             prompt += SECURITY_PROMPT_ADDITION
         
-        prompt += f"\n\nCurrent topic: {self.topic or 'Open inquiry'}"
+        return prompt
+    
+    def _dynamic_prompt(self) -> str:
+        prompt = f"\n\nCurrent topic: {self.topic or 'Open inquiry'}"
         prompt += "\n\nBegin by asking what they believe about this topic, or respond to their opening position."
         
+        if self.context.summary:
+            prompt += "\n\nEarlier in this dialogue (summarized; the most recent turns follow verbatim):\n"
+            prompt += self.context.summary
+            prompt += "\n\nWhen exposing contradictions, cite these earlier claims by turn."
+        
         return prompt
     
+    def get_system_blocks(self) -> list:
+        """System prompt as content blocks, with a cache breakpoint after the static part."""
+        return cached_system(self._static_prompt(), self._dynamic_prompt())
+    
+    def _request(self) -> dict:
+        """Build the messages.create arguments for the next reply."""
+        return {
+            "model": self.model,
+            "max_tokens": 300,
+            "system": self.get_system_blocks(),
+            "messages": cached_messages(self.context.messages(self.history))
+        }
+    
+    def _finish_stream(self, chunks: list, completed: bool):
+        if self._end_stream(chunks, completed):
+            self._commit()
+    
+    def _end_stream(self, chunks: list, completed: bool) -> bool:
+        """
+        Keep history alternating: add the reply if the stream finished, or
+        drop the unanswered user turn if it failed or was cut off, as
+        respond() does, so a truncated reply never reaches the journal or
+        later prompts. True if a reply was added and needs committing.
+        """
+        if completed and chunks:
+            self.history.append({
+                "role": "assistant",
+                "content": "".join(chunks)
+            })
+            return True
+        self.history.pop()
+        return False
+    
+    def _start_journal(self):
+        """Open a new generation in the journal, if the dialogue is persisted."""
+        if self.journal is not None:
+            self.journal.start(self.topic, self.mode, self.is_security)
+    
+    def _commit(self):
+        """Write completed turns to the journal, if the dialogue is persisted."""
+        if self.journal is None:
+            return
+        try:
+            self.journal.sync(self.history)
+        except DialogueConflict:
+            # Another worker answered first: adopt its turns and drop ours
+            self.journal.reload(self)
+            self.context.reset()
+            raise
+    
     def respond(self, user_input: str) -> str:
         self.history.append({
             "role": "user",
             "content": user_input
         })
+        self.context.update(self.history)
         
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=300,
-            system=self.get_system_prompt(),
-            messages=self.history
-        )
+        try:
+            response = self.client.messages.create(**self._request())
+        except Exception:
+            # Leave history alternating; the user can resend
+            self.history.pop()
+            raise
+        self.last_usage = usage_dict(response.usage)
         
         assistant_message = response.content[0].text
         self.history.append({
             "role": "assistant", 
             "content": assistant_message
         })
+        self._commit()
         
         return assistant_message
     
+    def respond_stream(self, user_input: str) -> Iterator[str]:
+        """
+        Stream the philosopher's reply as text deltas.
+        The full reply is committed to history once the stream finishes;
+        if it fails midway, the user turn is dropped and nothing is kept.
+        """
+        self.history.append({
+            "role": "user",
+            "content": user_input
+        })
+        self.context.update(self.history)
+        
+        chunks = []
+        completed = False
+        try:
+            with self.client.messages.stream(**self._request()) as stream:
+                for text in stream.text_stream:
+                    chunks.append(text)
+                    yield text
+                self.last_usage = usage_dict(stream.get_final_message().usage)
+            completed = True
+        finally:
+            self._finish_stream(chunks, completed)
+    
     def get_opening(self) -> str:
         """Get the philosopher's opening question for the topic."""
-        return self.respond(f"I want to discuss: {self.topic}")
+        return self.respond(self._opening_prompt())
+    
+    def get_opening_stream(self) -> Iterator[str]:
+        """Stream the philosopher's opening question for the topic."""
+        return self.respond_stream(self._opening_prompt())
+    
+    def use_opening(self, opening: str) -> str:
+        """
+        Start with a pre-generated opening (see core.opening_pool); history
+        ends up exactly as if get_opening() had produced it.
+        """
+        self._add_opening(opening)
+        self._commit()
+        return opening
+    
+    def _add_opening(self, opening: str):
+        self.history.append({
+            "role": "user",
+            "content": self._opening_prompt()
+        })
+        self.history.append({
+            "role": "assistant",
+            "content": opening
+        })
+        self.last_usage = usage_dict(None)
+    
+    def _opening_prompt(self) -> str:
+        return f"I want to discuss: {self.topic}"
     
     def reset(self):
+        self._reset()
+        self._start_journal()
+    
+    def _reset(self):
         self.history = []
+        self.context.reset()
         self.topic = None
         self.is_security = False
 
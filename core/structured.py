@@ -0,0 +1,333 @@
+"""
+Structured Output
+Schema-constrained JSON replies for the analyzers.
+
+Each analyzer method has a JSON Schema here. Requests carry it as a forced
+tool call, so the reply arrives as a tool_use block whose input already
+matches the schema; replies are then validated against the same schema.
+Plain-text replies (older models, fakes) are still accepted: the first JSON
+value in the text is decoded, ignoring any prose around it.
+
+PartialJSON parses a reply while it streams, so complete list items (the
+first claims, the first assumptions) can be shown before the reply ends.
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import telemetry
+
+
+class StructuredOutputError(ValueError):
+    """A reply that is not JSON, or does not match its method's schema."""
+
+
+def _object(properties: Dict, required: Optional[List[str]] = None) -> Dict:
+    return {"type": "object", "properties": properties, "required": required or list(properties)}
+
+
+def _array(items: Dict) -> Dict:
+    return {"type": "array", "items": items}
+
+
+_STRING = {"type": "string"}
+_STRINGS = _array(_STRING)
+_SCORE = {"type": "integer", "minimum": 0, "maximum": 100}
+_TEN = {"type": "integer", "minimum": 0, "maximum": 10}
+_LEVEL = {"type": "string", "enum": ["low", "medium", "high"]}
+_SEVERITY = {"type": "string", "enum": ["direct", "implicit", "none"]}
+
+_ANALYSIS_FIELDS = {
+    "fallacies": _array(_object({"turn": {"type": "integer"}, "type": _STRING, "explanation": _STRING})),
+    "argument_strength": {"type": "string", "enum": ["weak", "moderate", "strong"]},
+    "consistency_score": _SCORE,
+    "aporia_reached": {"type": "boolean"},
+    "key_insights": _STRINGS,
+}
+
+# Schemas by method. List-valued methods are wrapped in an object under
+# "items", since tool input must be an object; parse_structured unwraps them.
+SCHEMAS: Dict[str, Dict] = {
+    "analyze_dialogue": _object({
+        "claims": _array(_object({
+            "id": {"type": "integer"}, "text": _STRING, "speaker": _STRING, "turn": {"type": "integer"}
+        })),
+        "contradictions": _array(_object({
+            "claim_1_id": {"type": "integer"}, "claim_2_id": {"type": "integer"}, "explanation": _STRING
+        })),
+        **_ANALYSIS_FIELDS,
+    }),
+    "incremental_analysis": _object({
+        "new_claims": _array(_object({
+            "text": _STRING, "speaker": _STRING, "turn": {"type": "integer"}
+        })),
+        **_ANALYSIS_FIELDS,
+    }, required=["new_claims", "fallacies"]),
+    "detect_contradiction": _object({
+        "contradicts": {"type": "boolean"}, "explanation": _STRING, "severity": _SEVERITY
+    }),
+    "detect_contradictions": _object({
+        "items": _array(_object({
+            "pair": _STRING, "contradicts": {"type": "boolean"}, "explanation": _STRING, "severity": _SEVERITY
+        }))
+    }),
+    "extract_claims": _object({"items": _STRINGS}),
+    "assess_sophistication": _object({
+        "vocabulary": _SCORE,
+        "argumentation": _SCORE,
+        "self_awareness": _SCORE,
+        "depth": _SCORE,
+        "overall_score": _SCORE,
+        "level": {"type": "string", "enum": ["beginner", "intermediate", "advanced"]},
+        "indicators": _STRINGS,
+        "recommendations": _STRINGS,
+    }, required=["overall_score", "level", "indicators"]),
+    "judge_debate": _object({
+        "winner": _STRING,
+        "scores": {"type": "object", "additionalProperties": _object({
+            "logic": _TEN, "tradition": _TEN, "engagement": _TEN, "reasoning": _TEN
+        })},
+        "analysis": _STRING,
+        "best_moment": _STRING,
+        "verdict": _STRING,
+    }, required=["winner", "scores", "verdict"]),
+    "analyze_threat_model": _object({
+        "assumptions": _array(_object({"assumption": _STRING, "question": _STRING})),
+        "gaps": _array(_object({"gap": _STRING, "risk": _STRING})),
+        "questions": _STRINGS,
+        "alternative_perspectives": _array(_object({"perspective": _STRING, "implication": _STRING})),
+        "severity": {"type": "string", "enum": ["low", "medium", "high", "critical"]},
+    }),
+    "interrogate_control": _object({
+        "effectiveness": _LEVEL,
+        "security_theater_risk": _SCORE,
+        "key_assumptions": _STRINGS,
+        "bypass_scenarios": _array(_object({"scenario": _STRING, "likelihood": _LEVEL})),
+        "probing_questions": _STRINGS,
+        "verdict": _STRING,
+        "recommendations": _STRINGS,
+    }),
+    "challenge_assumptions": _object({"items": _STRINGS}),
+    "red_team_questions": _object({
+        "philosophical": _array(_object({"question": _STRING, "targets": _STRING})),
+        "red_team": _array(_object({"question": _STRING, "attack_vector": _STRING})),
+        "blind_spots": _STRINGS,
+        "recommendations": _STRINGS,
+    }),
+    "compliance_vs_security": _object({
+        "security_improvement": {"type": "string", "enum": ["none", "minimal", "moderate", "significant"]},
+        "compliance_score": {"type": "string", "enum": ["passes", "fails"]},
+        "gap_analysis": _STRING,
+        "security_theater_elements": _STRINGS,
+        "actual_risk_reduction": _STRING,
+        "questions_to_ask": _STRINGS,
+        "verdict": _STRING,
+    }),
+}
+
+_LIST_METHODS = {"detect_contradictions", "extract_claims", "challenge_assumptions"}
+
+_TYPES = {
+    "object": dict, "array": list, "string": str, "boolean": bool,
+    "integer": int, "number": (int, float), "null": type(None),
+}
+
+
+def structured_request(request: Dict, method: str) -> Dict:
+    """Add a forced tool call carrying the method's schema to a messages.create request."""
+    return {
+        **request,
+        "tools": [{
+            "name": method,
+            "description": f"Record the result of {method.replace('_', ' ')}.",
+            "input_schema": SCHEMAS[method]
+        }],
+        "tool_choice": {"type": "tool", "name": method}
+    }
+
+
+def response_payload(response) -> Any:
+    """The tool input of a structured reply, or its text if the model answered in prose."""
+    for block in response.content:
+        if getattr(block, "type", None) == "tool_use":
+            return block.input
+    return "".join(getattr(block, "text", "") for block in response.content)
+
+
+def extract_json(text: str) -> Any:
+    """Decode the first JSON object or array in text, ignoring prose around it."""
+    decoder = json.JSONDecoder()
+    for start, char in enumerate(text):
+        if char in "{[":
+            try:
+                return decoder.raw_decode(text, start)[0]
+            except json.JSONDecodeError:
+                continue
+    raise StructuredOutputError("No JSON found in reply")
+
+
+def parse_structured(payload: Any, method: str) -> Any:
+    """Decode (if text) and validate a reply; raises StructuredOutputError."""
+    try:
+        value = extract_json(payload) if isinstance(payload, str) else payload
+        if method in _LIST_METHODS and isinstance(value, list):
+            # Prose replies give the bare list the prompt asks for
+            value = {"items": value}
+
+        errors = validate(value, SCHEMAS[method])
+        if errors:
+            raise StructuredOutputError(f"{method}: " + "; ".join(errors[:3]))
+    except StructuredOutputError as e:
+        telemetry.record_parse_failure(method, e)
+        raise
+    return value["items"] if method in _LIST_METHODS else value
+
+
+def validate(value: Any, schema: Dict, path: str = "$") -> List[str]:
+    """Check value against the subset of JSON Schema used above; returns error messages."""
+    expected = schema.get("type")
+    if expected is not None:
+        types = expected if isinstance(expected, list) else [expected]
+        python_types = tuple(t for name in types for t in
+                             (_TYPES[name] if isinstance(_TYPES[name], tuple) else (_TYPES[name],)))
+        if not isinstance(value, python_types) or (isinstance(value, bool) and "boolean" not in types):
+            return [f"{path} is not {' or '.join(types)}"]
+
+    errors = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path} is not one of {schema['enum']}")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if value < schema.get("minimum", value) or value > schema.get("maximum", value):
+            errors.append(f"{path} is out of range")
+    if isinstance(value, dict):
+        for name in schema.get("required", []):
+            if name not in value:
+                errors.append(f"{path}.{name} is missing")
+        for name, item in value.items():
+            sub_schema = schema.get("properties", {}).get(name, schema.get("additionalProperties"))
+            if isinstance(sub_schema, dict):
+                errors += validate(item, sub_schema, f"{path}.{name}")
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors += validate(item, schema["items"], f"{path}[{i}]")
+    return errors
+
+
+class PartialJSON:
+    """
+    Incremental parser for a JSON document arriving in chunks. After each
+    feed, value() is the document truncated to its last complete element
+    and closed, list items only once they are whole, e.g. '{"claims": [{"id": 1}, {"id": 2, "te' reads as
+    {"claims": [{"id": 1}]}. Leading prose before the first { or [ is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._scanned = 0
+        self._start = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._safe: Tuple[int, str] = (0, "")
+
+    def feed(self, chunk: str) -> bool:
+        """Add text; True if a new element completed (value() changed)."""
+        self.buffer += chunk
+        before = self._safe
+        for i in range(self._scanned, len(self.buffer)):
+            self._step(i, self.buffer[i])
+        self._scanned = len(self.buffer)
+        return self._safe != before
+
+    def value(self) -> Optional[Any]:
+        end, closers = self._safe
+        if self._start is None or end <= self._start:
+            return None
+        try:
+            return json.loads(self.buffer[self._start:end] + closers)
+        except json.JSONDecodeError:
+            return None
+
+    @property
+    def complete(self) -> bool:
+        return self._start is not None and not self._stack and self._safe[0] > self._start
+
+    def _step(self, i: int, char: str):
+        if self._start is None:
+            if char in "{[":
+                self._start = i
+            else:
+                return
+        if self.complete:
+            return
+
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+            return
+
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._stack.append("}" if char == "{" else "]")
+            self._mark(i + 1)
+        elif char in "}]":
+            self._stack.pop()
+            self._mark(i + 1)
+        elif char == ",":
+            # Everything before the comma is a complete element
+            self._mark(i)
+
+    def _mark(self, end: int):
+        """Record a safe cut, unless it falls inside an object that is a list item."""
+        if "]" in self._stack and "}" in self._stack[self._stack.index("]") + 1:]:
+            return
+        self._safe = (end, "".join(reversed(self._stack)))
+
+
+def _json_delta(event) -> Optional[str]:
+    """The JSON (or text) carried by one raw stream event, if any."""
+    if getattr(event, "type", None) != "content_block_delta":
+        return None
+    delta = event.delta
+    if getattr(delta, "type", None) == "input_json_delta":
+        return delta.partial_json
+    if getattr(delta, "type", None) == "text_delta":
+        return delta.text
+    return None
+
+
+class StructuredStream:
+    """
+    Streams a structured request, yielding the partial value each time an
+    element completes; the final message is left on .final.
+
+        stream = StructuredStream()
+        for partial in stream.run(client, request):
+            ...
+        result = parse_structured(response_payload(stream.final), method)
+    """
+
+    def __init__(self):
+        self.parser = PartialJSON()
+        self.final = None
+
+    def run(self, client, request: Dict) -> Iterator[Any]:
+        with client.messages.stream(**request) as stream:
+            for event in stream:
+                chunk = _json_delta(event)
+                if chunk and self.parser.feed(chunk):
+                    yield self.parser.value()
+            self.final = stream.get_final_message()
+
+    async def arun(self, client, request: Dict):
+        async with client.messages.stream(**request) as stream:
+            async for event in stream:
+                chunk = _json_delta(event)
+                if chunk and self.parser.feed(chunk):
+                    yield self.parser.value()
+            self.final = await stream.get_final_message()
@@ -0,0 +1,319 @@
+"""
+Telemetry
+One instrumentation surface for every API call and HTTP route.
+
+Every messages.create/stream call already passes through ScheduledMessages,
+which reports each attempt here: latency, input/output/cached tokens, model,
+the core method that made the call (e.g. ThreatInterrogator.red_team_questions)
+and the error, if any. parse_structured reports replies that fail their
+schema, and the web apps report per-route timings.
+
+render() exports everything in the Prometheus text format. With TRACE_LOG
+set (a file path, or "-" for stderr), each call and each HTTP request is also
+written as a JSON line carrying the request's trace ID, so one HTTP request
+can be joined to all of its API calls.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+# Seconds; API calls run from ~0.3s to a minute, routes from ~1ms
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+ROUTE_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+# Files whose frames are plumbing, not the calling method
+_PLUMBING = ("scheduler.py", "telemetry.py", "structured.py", "clients.py")
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+_trace_logger = logging.getLogger("socratic.trace")
+_trace_logger.propagate = False
+_trace_configured = False
+_trace_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class Metrics:
+    """Counters and histograms keyed by label tuples, rendered as Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = defaultdict(lambda: defaultdict(float))
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = defaultdict(dict)
+        self._help: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {}
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self._help[name] = ("counter", help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self._help[name] = ("histogram", help_text, labels)
+
+    def inc(self, name: str, labels: Tuple, amount: float = 1):
+        with self._lock:
+            self._counters[name][labels] += amount
+
+    def observe(self, name: str, labels: Tuple, value: float, buckets: Tuple[float, ...]):
+        with self._lock:
+            series = self._histograms[name]
+            if labels not in series:
+                series[labels] = Histogram(buckets)
+            series[labels].observe(value)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, label_names) in self._help.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for labels, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+                    continue
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        le = _labels(label_names + ("le",), labels + (_number(bound),))
+                        lines.append(f"{name}_bucket{le} {count}")
+                    inf = _labels(label_names + ("le",), labels + ("+Inf",))
+                    lines.append(f"{name}_bucket{inf} {histogram.total}")
+                    lines.append(f"{name}_sum{_labels(label_names, labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(label_names, labels)} {histogram.total}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+metrics = Metrics()
+metrics.counter("llm_requests_total", "API call attempts by calling method, model and outcome.",
+                ("method", "model", "status"))
+metrics.histogram("llm_request_duration_seconds", "API call latency, including streamed bodies.",
+                  ("method", "model"))
+metrics.counter("llm_tokens_total", "Tokens by calling method, model and kind (input, output, cache_read, cache_write).",
+                ("method", "model", "kind"))
+metrics.counter("llm_parse_failures_total", "Replies that were not valid JSON for their schema.",
+                ("schema",))
+metrics.counter("http_requests_total", "HTTP requests by route, method and status.",
+                ("route", "http_method", "status"))
+metrics.histogram("http_request_duration_seconds", "HTTP request latency, until the body is sent.",
+                  ("route", "http_method"))
+
+
+def calling_method() -> str:
+    """
+    Class.method of the nearest core object on the stack that made the call,
+    preferring public methods over helpers (e.g. _run_batch_chunk).
+    """
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        code = frame.f_code
+        if not code.co_filename.endswith(_PLUMBING) and "self" in frame.f_locals:
+            name = f"{type(frame.f_locals['self']).__name__}.{code.co_name}"
+            if not code.co_name.startswith("_"):
+                return name
+            fallback = fallback or name
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+def start_trace(trace_id: Optional[str] = None) -> str:
+    """Tag everything in the current context (one HTTP request) with a trace ID."""
+    trace_id = trace_id or uuid.uuid4().hex[:16]
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+def end_trace():
+    _trace_id.set(None)
+
+
+def current_trace() -> Optional[str]:
+    return _trace_id.get()
+
+
+def _trace_enabled() -> bool:
+    global _trace_configured
+    target = os.environ.get("TRACE_LOG")
+    if not target:
+        return False
+    with _trace_lock:
+        if not _trace_configured:
+            handler = logging.StreamHandler(sys.stderr) if target == "-" else logging.FileHandler(target)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _trace_logger.addHandler(handler)
+            _trace_logger.setLevel(logging.INFO)
+            _trace_configured = True
+    return True
+
+
+def _trace(span: str, **fields):
+    if _trace_enabled():
+        _trace_logger.info(json.dumps({"ts": round(time.time(), 3), "trace_id": current_trace(),
+                                       "span": span, **fields}))
+
+
+def record_call(method: str, model: str, latency: float, usage=None, error: Optional[Exception] = None,
+                priority: Optional[str] = None):
+    """One API call attempt; usage is the response's usage object (None on error)."""
+    status = "ok" if error is None else type(error).__name__
+    metrics.inc("llm_requests_total", (method, model, status))
+    metrics.observe("llm_request_duration_seconds", (method, model), latency, LLM_BUCKETS)
+
+    tokens = {
+        "input": getattr(usage, "input_tokens", 0) or 0,
+        "output": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_write": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+    for kind, count in tokens.items():
+        if count:
+            metrics.inc("llm_tokens_total", (method, model, kind), count)
+
+    _trace("llm", method=method, model=model, priority=priority, latency_ms=round(latency * 1000, 1),
+           status=status, error=None if error is None else str(error)[:200], **tokens)
+
+
+def record_parse_failure(schema: str, error: Exception):
+    metrics.inc("llm_parse_failures_total", (schema,))
+    _trace("parse_failure", schema=schema, error=str(error)[:200])
+
+
+def record_route(route: str, http_method: str, status: int, latency: float):
+    metrics.inc("http_requests_total", (route, http_method, str(status)))
+    metrics.observe("http_request_duration_seconds", (route, http_method), latency, ROUTE_BUCKETS)
+    _trace("http", route=route, http_method=http_method, status=status, latency_ms=round(latency * 1000, 1))
+
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    return metrics.render()
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _route_started():
+    from flask import g, request
+    g.telemetry_started = time.perf_counter()
+    g.trace_id = start_trace(request.headers.get("X-Request-ID"))
+
+
+def _route_finished(response):
+    from flask import g, request
+    started = g.pop("telemetry_started", None)
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    method, status = request.method, response.status_code
+
+    def finish():
+        # Runs once the body is sent, so SSE routes are timed end to end
+        record_route(route, method, status, time.perf_counter() - started)
+        end_trace()
+
+    response.call_on_close(finish)
+    response.headers["X-Request-ID"] = g.trace_id
+    return response
+
+
+def instrument_flask(app):
+    """Time every route, tag its API calls with a trace ID and serve GET /metrics."""
+    from flask import Response
+
+    app.before_request(_route_started)
+    app.after_request(_route_finished)
+    app.add_url_rule("/metrics", "metrics", lambda: Response(render(), content_type=PROMETHEUS_CONTENT_TYPE))
+
+
+class _TimedBody:
+    """Quart response body that runs a callback once the body has been sent."""
+
+    def __init__(self, body, finish):
+        self._body = body
+        self._finish = finish
+
+    async def __aenter__(self):
+        return await self._body.__aenter__()
+
+    async def __aexit__(self, *exc):
+        try:
+            return await self._body.__aexit__(*exc)
+        finally:
+            self._finish()
+
+
+def instrument_quart(app):
+    """instrument_flask for Quart apps."""
+    from quart import Response, g, request
+    from quart.wrappers.response import ResponseBody
+
+    @app.before_request
+    async def route_started():
+        g.telemetry_started = time.perf_counter()
+        g.trace_id = start_trace(request.headers.get("X-Request-ID"))
+
+    @app.after_request
+    async def route_finished(response):
+        started = g.pop("telemetry_started", None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        method, status = request.method, response.status_code
+
+        def finish():
+            record_route(route, method, status, time.perf_counter() - started)
+
+        if isinstance(response.response, ResponseBody):
+            response.response = _TimedBody(response.response, finish)
+        else:
+            # A Werkzeug response (404, 405, 500 from an HTTPException) has a
+            # plain iterable body, sent as is: it is complete already
+            finish()
+        response.headers["X-Request-ID"] = g.trace_id
+        return response
+
+    async def metrics_route():
+        return Response(render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics_route)
@@ -3,25 +3,105 @@ Threat Model Interrogator - Socratic Security
 Apply philosophical questioning to security architecture and threat modeling.
 """
 
-import anthropic
-from typing import Optional, Dict, List
-import re
-import json
+from typing import Any, Iterator, Optional, Dict, List, Tuple
+from .clients import get_client
+from .scheduler import ANALYSIS
+from .response_cache import get_response_cache, is_cacheable, normalize_text
+from .structured import StructuredOutputError, StructuredStream, parse_structured, response_payload, structured_request
 
 
 class ThreatInterrogator:
     """Apply Socratic method to threat modeling and security architecture."""
 
     def __init__(self, api_key: Optional[str] = None):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = get_client(api_key, ANALYSIS)
         self.model = "claude-sonnet-4-20250514"
         self.conversation_history = []
+        self.cache = get_response_cache()
 
     def analyze_threat_model(self, threat_description: str) -> Dict:
         """
         Analyze a threat model or security control using Socratic questioning.
         Returns probing questions and identified assumptions.
         """
+        try:
+            request = self._threat_model_request(normalize_text(threat_description))
+            return self._call("analyze_threat_model", request, self._parse_object)
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def analyze_threat_model_stream(self, threat_description: str) -> Iterator[Tuple[str, Dict]]:
+        """
+        analyze_threat_model, streamed: yields ("partial", analysis so far) as
+        each assumption, gap or question completes, then ("result", analysis).
+        """
+        try:
+            request = self._threat_model_request(normalize_text(threat_description))
+            key = self.cache.key("analyze_threat_model", request)
+            cached = self.cache.get("analyze_threat_model", key)
+            if cached is not None:
+                yield "result", cached
+                return
+
+            stream = StructuredStream()
+            for partial in stream.run(self.client, request):
+                yield "partial", partial
+            result = self._parse_object(response_payload(stream.final), "analyze_threat_model")
+            if is_cacheable(result):
+                self.cache.set("analyze_threat_model", key, result)
+            yield "result", result
+
+        except Exception as e:
+            yield "result", {"error": str(e)}
+
+    def interrogate_control(self, control_description: str, context: str = "") -> Dict:
+        """
+        Question a specific security control.
+        Are they solving the right problem? Is it security or theater?
+        """
+        try:
+            request = self._control_request(normalize_text(control_description), normalize_text(context))
+            return self._call("interrogate_control", request, self._parse_object)
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def challenge_assumptions(self, security_claim: str) -> List[str]:
+        """
+        Given a security claim, generate Socratic questions to challenge assumptions.
+        """
+        try:
+            request = self._challenge_request(normalize_text(security_claim))
+            return self._call("challenge_assumptions", request, self._parse_list)
+
+        except Exception as e:
+            return []
+
+    def red_team_questions(self, system_description: str) -> Dict:
+        """
+        Generate red team questions for a system description.
+        What would an attacker ask?
+        """
+        try:
+            request = self._red_team_request(normalize_text(system_description))
+            return self._call("red_team_questions", request, self._parse_object)
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def compliance_vs_security(self, requirement: str, implementation: str) -> Dict:
+        """
+        Analyze if a compliance requirement actually improves security.
+        """
+        try:
+            request = self._compliance_request(normalize_text(requirement), normalize_text(implementation))
+            return self._call("compliance_vs_security", request, self._parse_object)
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _threat_model_request(self, threat_description: str) -> Dict:
         analysis_prompt = f"""You are a security philosopher applying the Socratic method to threat modeling.
 
 A security professional describes their threat model:
@@ -50,28 +130,9 @@ Generate your analysis in JSON format:
 
 Be incisive but not dismissive. Find what they haven't considered."""
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2000,
-                messages=[{"role": "user", "content": analysis_prompt}]
-            )
-
-            content = response.content[0].text
-            json_match = re.search(r'\{[\s\S]*\}', content)
+        return self._request(analysis_prompt, 2000, "analyze_threat_model")
 
-            if json_match:
-                return json.loads(json_match.group())
-            return {"error": "Could not parse analysis"}
-
-        except Exception as e:
-            return {"error": str(e)}
-
-    def interrogate_control(self, control_description: str, context: str = "") -> Dict:
-        """
-        Question a specific security control.
-        Are they solving the right problem? Is it security or theater?
-        """
+    def _control_request(self, control_description: str, context: str = "") -> Dict:
         prompt = f"""A security control is described: "{control_description}"
 
 Context: {context if context else "General enterprise security"}
@@ -102,27 +163,9 @@ Respond in JSON:
 
 Be rigorous. Security theater is dangerous."""
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            content = response.content[0].text
-            json_match = re.search(r'\{[\s\S]*\}', content)
+        return self._request(prompt, 2000, "interrogate_control")
 
-            if json_match:
-                return json.loads(json_match.group())
-            return {"error": "Could not parse analysis"}
-
-        except Exception as e:
-            return {"error": str(e)}
-
-    def challenge_assumptions(self, security_claim: str) -> List[str]:
-        """
-        Given a security claim, generate Socratic questions to challenge assumptions.
-        """
+    def _challenge_request(self, security_claim: str) -> Dict:
         prompt = f"""Security claim: "{security_claim}"
 
 Generate 5 penetrating Socratic questions that challenge the assumptions in this claim.
@@ -132,28 +175,9 @@ Format as JSON array:
 
 Make questions progressively deeper. Start with obvious, end with subtle."""
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=800,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            content = response.content[0].text
-            json_match = re.search(r'\[[\s\S]*\]', content)
-
-            if json_match:
-                return json.loads(json_match.group())
-            return []
-
-        except Exception as e:
-            return []
+        return self._request(prompt, 800, "challenge_assumptions")
 
-    def red_team_questions(self, system_description: str) -> Dict:
-        """
-        Generate red team questions for a system description.
-        What would an attacker ask?
-        """
+    def _red_team_request(self, system_description: str) -> Dict:
         prompt = f"""System description: {system_description}
 
 You are both a philosopher and a red team attacker. Generate questions from both perspectives:
@@ -175,27 +199,9 @@ Respond in JSON:
 
 Be adversarial but constructive."""
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            content = response.content[0].text
-            json_match = re.search(r'\{[\s\S]*\}', content)
+        return self._request(prompt, 2000, "red_team_questions")
 
-            if json_match:
-                return json.loads(json_match.group())
-            return {"error": "Could not parse analysis"}
-
-        except Exception as e:
-            return {"error": str(e)}
-
-    def compliance_vs_security(self, requirement: str, implementation: str) -> Dict:
-        """
-        Analyze if a compliance requirement actually improves security.
-        """
+    def _compliance_request(self, requirement: str, implementation: str) -> Dict:
         prompt = f"""Compliance requirement: {requirement}
 Implementation: {implementation}
 
@@ -218,22 +224,39 @@ Respond in JSON:
 
 Distinguish compliance from security."""
 
+        return self._request(prompt, 1500, "compliance_vs_security")
+
+    def _call(self, method: str, request: Dict, parse):
+        """Serve from the response cache, or call the API and cache a parsed result."""
+        key = self.cache.key(method, request)
+        cached = self.cache.get(method, key)
+        if cached is not None:
+            return cached
+
+        response = self.client.messages.create(**request)
+        result = parse(response_payload(response), method)
+        if is_cacheable(result):
+            self.cache.set(method, key, result)
+        return result
+
+    def _request(self, prompt: str, max_tokens: int, method: str) -> Dict:
+        return structured_request({
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}]
+        }, method)
+
+    def _parse_object(self, payload: Any, method: str) -> Dict:
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1500,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            content = response.content[0].text
-            json_match = re.search(r'\{[\s\S]*\}', content)
-
-            if json_match:
-                return json.loads(json_match.group())
+            return parse_structured(payload, method)
+        except StructuredOutputError:
             return {"error": "Could not parse analysis"}
 
-        except Exception as e:
-            return {"error": str(e)}
+    def _parse_list(self, payload: Any, method: str) -> List[str]:
+        try:
+            return parse_structured(payload, method)
+        except StructuredOutputError:
+            return []
 
 
 def quick_threat_analysis(threat_model: str, api_key: Optional[str] = None) -> Dict:
@@ -0,0 +1,171 @@
+"""
+Debate Tournament
+Round-robin debates across all MODES pairings, run concurrently, judged by
+DebateModerator.judge_debate and rated Elo-style per mode.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import permutations
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .debate_mode import DebateModerator
+from .socrates import MODES
+
+DEFAULT_TOPICS = [
+    "Can virtue be taught?",
+    "Should we fear death?",
+    "Is justice merely the interest of the stronger?",
+]
+
+
+def round_robin(modes: Optional[Iterable[str]] = None, topics: Optional[Iterable[str]] = None,
+                positions: Tuple[str, str] = ("Yes", "No"), rounds: int = 1) -> List[Dict]:
+    """
+    Every ordered pair of modes on every topic, once with each assignment
+    of positions, so each mode argues each position both opening and
+    replying against each opponent, and which side opens is not confounded
+    with which position it takes.
+    """
+    modes = list(modes or MODES)
+    topics = list(topics or DEFAULT_TOPICS)
+    matches = []
+    for round_number in range(1, rounds + 1):
+        for topic in topics:
+            for mode_a, mode_b in permutations(modes, 2):
+                for position_a, position_b in (positions, positions[::-1]):
+                    match = {
+                        "topic": topic,
+                        "mode_a": mode_a,
+                        "mode_b": mode_b,
+                        "position_a": position_a,
+                        "position_b": position_b,
+                        "round": round_number,
+                    }
+                    match["key"] = match_key(match)
+                    matches.append(match)
+    return matches
+
+
+def match_key(match: Dict) -> str:
+    return "|".join(str(match[field]) for field in
+                    ("round", "topic", "mode_a", "mode_b", "position_a", "position_b"))
+
+
+class EloRatings:
+    """Elo ratings per mode, with win/draw/loss counts."""
+
+    def __init__(self, k_factor: float = 32, initial: float = 1500):
+        self.k_factor = k_factor
+        self.initial = initial
+        self.ratings: Dict[str, float] = {}
+        self.records: Dict[str, Dict[str, int]] = {}
+
+    def expected(self, mode_a: str, mode_b: str) -> float:
+        rating_a = self.ratings.get(mode_a, self.initial)
+        rating_b = self.ratings.get(mode_b, self.initial)
+        return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+
+    def record(self, mode_a: str, mode_b: str, winner: str):
+        """Update both ratings from one judged debate ('draw' or a mode key)."""
+        score_a = 1.0 if winner == mode_a else 0.0 if winner == mode_b else 0.5
+        delta = self.k_factor * (score_a - self.expected(mode_a, mode_b))
+        self.ratings[mode_a] = self.ratings.get(mode_a, self.initial) + delta
+        self.ratings[mode_b] = self.ratings.get(mode_b, self.initial) - delta
+
+        for mode, score in ((mode_a, score_a), (mode_b, 1 - score_a)):
+            record = self.records.setdefault(mode, {"wins": 0, "draws": 0, "losses": 0})
+            record["wins" if score == 1 else "losses" if score == 0 else "draws"] += 1
+
+    def standings(self) -> List[Dict]:
+        return [
+            {"mode": mode, "rating": round(rating, 1), **self.records.get(mode, {})}
+            for mode, rating in sorted(self.ratings.items(), key=lambda item: -item[1])
+        ]
+
+
+class Tournament:
+    """
+    Runs debates concurrently (at most `concurrency` at a time) and appends
+    each result to a JSONL file as soon as it is judged. Rerunning with the
+    same file skips matches that already have a result.
+    """
+
+    def __init__(self, results_path: str, concurrency: int = 4, turns: int = 6,
+                 api_key: Optional[str] = None, k_factor: float = 32):
+        self.results_path = results_path
+        self.concurrency = concurrency
+        self.turns = turns
+        self.api_key = api_key
+        self.elo = EloRatings(k_factor=k_factor)
+        self.completed = set()
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Replay saved results into the ratings and the completed set."""
+        if not os.path.exists(self.results_path):
+            return
+        with open(self.results_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final line from an interrupted run
+                    continue
+                self._apply(result)
+
+    def pending(self, matches: List[Dict]) -> List[Dict]:
+        return [match for match in matches if match["key"] not in self.completed]
+
+    def run(self, matches: List[Dict], on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """Play every pending match; returns the final standings."""
+        todo = self.pending(matches)
+        pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            futures = [pool.submit(self._play, match) for match in todo]
+            for future in as_completed(futures):
+                result = future.result()
+                with self._lock:
+                    self._save(result)
+                    self._apply(result)
+                if on_result:
+                    on_result(result)
+        finally:
+            # On interrupt, drop queued debates instead of playing them out
+            pool.shutdown(wait=False, cancel_futures=True)
+        return self.elo.standings()
+
+    def _play(self, match: Dict) -> Dict:
+        moderator = DebateModerator(api_key=self.api_key)
+        moderator.setup_debate(match["topic"], match["mode_a"], match["mode_b"],
+                               match["position_a"], match["position_b"])
+        try:
+            debate = moderator.run_debate(turns=self.turns)
+            judgment = moderator.judge_debate()
+        except Exception as e:
+            return {**match, "error": str(e)}
+
+        result = {**match, "debate": debate, "judgment": judgment}
+        if "error" in judgment:
+            result["error"] = judgment["error"]
+        return result
+
+    def _save(self, result: Dict):
+        with open(self.results_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _apply(self, result: Dict):
+        # Failed matches are saved for the record but replayed on resume
+        if "error" in result:
+            return
+        winner = result["judgment"].get("winner", "draw")
+        self.elo.record(result["mode_a"], result["mode_b"], winner)
+        self.completed.add(result["key"])
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "web")]
+
+# The web apps read these at import: no opening pool, no shared dialogue store
+os.environ["OPENING_POOL_SIZE"] = "0"
+os.environ.pop("DIALOGUE_STORE_PATH", None)
@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+from core.adaptive_difficulty import AdaptiveSocraticDialogue
+
+
+def dialogue_with_turns(count):
+    base = SimpleNamespace(history=[{"role": "user", "content": f"turn {i}"} for i in range(count)])
+    return AdaptiveSocraticDialogue(base, api_key="test")
+
+
+def finished(assessment):
+    future = Future()
+    future.set_result(assessment)
+    return future
+
+
+ADVANCED = {"level": "advanced", "overall_score": 85}
+
+
+def test_result_applies_although_turns_were_added_meanwhile():
+    dialogue = dialogue_with_turns(6)
+    token = dialogue._begin_reassessment()
+    dialogue.base_dialogue.history.extend([{"role": "assistant", "content": "Why?"}] * 2)
+    dialogue._finish_reassessment(token, finished(ADVANCED))
+    assert dialogue.current_level == "advanced"
+
+
+def test_superseded_or_reset_results_are_dropped():
+    dialogue = dialogue_with_turns(6)
+    token = dialogue._begin_reassessment()
+    dialogue._begin_reassessment()
+    dialogue._finish_reassessment(token, finished(ADVANCED))
+    assert dialogue.current_level == "beginner"
+
+    token = dialogue._begin_reassessment()
+    dialogue.base_dialogue.history = list(dialogue.base_dialogue.history)
+    dialogue._finish_reassessment(token, finished(ADVANCED))
+    assert dialogue.current_level == "beginner"
+
+    token = dialogue._begin_reassessment()
+    dialogue._finish_reassessment(token, finished(dict(ADVANCED, error="overloaded")))
+    assert dialogue.current_level == "beginner"
+
+
+def test_reassessment_is_recorded_with_its_sequence_number():
+    dialogue = dialogue_with_turns(6)
+    pending = Future()
+    starting, release = threading.Event(), threading.Event()
+
+    def start(token):
+        starting.set()
+        release.wait(5)
+        return pending
+
+    first = threading.Thread(target=dialogue._begin_reassessment, args=(start,))
+    first.start()
+    assert starting.wait(5)
+
+    # A concurrent caller waits for the new future instead of seeing the old (None) one
+    second = []
+    other = threading.Thread(target=lambda: second.append(dialogue._begin_reassessment()))
+    other.start()
+    time.sleep(0.05)
+    release.set()
+    first.join(5)
+    other.join(5)
+    assert second == [None]
+    assert dialogue._reassessment is pending and dialogue._reassessment_seq == 1
+
+
+def test_instant_reassessment_applies_without_deadlock():
+    dialogue = dialogue_with_turns(6)
+    dialogue.profiler = SimpleNamespace(assess_sophistication=lambda history: ADVANCED)
+    assert dialogue.schedule_reassessment()
+    deadline = time.monotonic() + 5
+    while dialogue.current_level != "advanced" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert dialogue.current_level == "advanced"
@@ -0,0 +1,140 @@
+import re
+from types import SimpleNamespace
+
+from core.argument_analyzer import ArgumentAnalyzer
+from core.response_cache import ResponseCache
+
+
+class VerdictClient:
+    """Answers every batch with "no contradiction" for each pair, counting requests."""
+
+    def __init__(self):
+        self.requests = []
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, **request):
+        self.requests.append(request)
+        refs = re.findall(r"^(p\d+):$", request["messages"][0]["content"], re.M)
+        items = [{"pair": ref, "contradicts": False, "explanation": "compatible", "severity": "none"}
+                 for ref in refs]
+        return SimpleNamespace(content=[SimpleNamespace(type="tool_use", input={"items": items})])
+
+
+def analyzer():
+    analyzer = ArgumentAnalyzer(api_key="test")
+    analyzer.client = VerdictClient()
+    analyzer.cache = ResponseCache()
+    return analyzer
+
+
+PAIRS = {"a": ("Justice is fairness", "Justice is power"), "b": ("All men are mortal", "Socrates is a man")}
+
+
+def test_batched_verdicts_are_cached():
+    checker = analyzer()
+    first = checker.detect_contradictions(PAIRS)
+    assert set(first) == {"a", "b"} and not any("error" in v for v in first.values())
+    assert len(checker.client.requests) == 1
+
+    assert checker.detect_contradictions(PAIRS) == first
+    assert len(checker.client.requests) == 1
+
+
+def test_changing_the_batch_prompt_invalidates_cached_verdicts(monkeypatch):
+    checker = analyzer()
+    checker.detect_contradictions(PAIRS)
+
+    original = ArgumentAnalyzer._batch_request
+
+    def reworded(self, chunk):
+        request = original(self, chunk)
+        content = request["messages"][0]["content"].replace("decide whether", "judge whether")
+        return {**request, "messages": [{"role": "user", "content": content}]}
+
+    monkeypatch.setattr(ArgumentAnalyzer, "_batch_request", reworded)
+    checker.detect_contradictions(PAIRS)
+    assert len(checker.client.requests) == 2
+
+
+def test_changing_the_model_invalidates_cached_verdicts():
+    checker = analyzer()
+    checker.detect_contradictions(PAIRS)
+    checker.model = "another-model"
+    checker.detect_contradictions(PAIRS)
+    assert len(checker.client.requests) == 2
+
+
+class DialogueClient:
+    """Extracts each new user turn as one claim; pairs contradict when exactly one says "not"."""
+
+    def __init__(self):
+        self.requests = []
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, **request):
+        self.requests.append(request)
+        content = request["messages"][0]["content"]
+        if request["tool_choice"]["name"] == "incremental_analysis":
+            new_turns = content.split("New turns:")[1]
+            claims = [{"text": text, "speaker": "user", "turn": int(turn)}
+                      for turn, text in re.findall(r"^Turn (\d+) \(User\): (.+)$", new_turns, re.M)]
+            output = {"new_claims": claims, "fallacies": []}
+        else:
+            pairs = re.findall(r"^(p\d+):\n  Claim 1: (.+)\n  Claim 2: (.+)$", content, re.M)
+            output = {"items": [
+                {"pair": ref, "contradicts": (" not " in first) != (" not " in second),
+                 "explanation": "checked", "severity": "direct" if (" not " in first) != (" not " in second) else "none"}
+                for ref, first, second in pairs
+            ]}
+        return SimpleNamespace(content=[SimpleNamespace(type="tool_use", input=output)])
+
+
+def turns(*user_turns):
+    history = []
+    for text in user_turns:
+        history += [{"role": "user", "content": text}, {"role": "assistant", "content": "Why?"}]
+    return history
+
+
+def test_incremental_analysis_checks_new_claims_without_resending_old_ones():
+    from core.argument_analyzer import IncrementalArgumentAnalyzer
+
+    checker = IncrementalArgumentAnalyzer(api_key="test")
+    checker.client = DialogueClient()
+    checker.cache = ResponseCache()
+    history = turns("Justice is giving each their due", "Courage is knowing what to fear")
+    first = checker.analyze_dialogue(history)
+    assert [claim["id"] for claim in first["claims"]] == [1, 2]
+    assert first["contradictions"] == []
+
+    history += turns("Justice is not giving each their due")
+    second = checker.analyze_dialogue(history)
+    delta_prompt = checker.client.requests[-2]["messages"][0]["content"]
+    assert "Courage is knowing" not in delta_prompt and "Justice is giving" not in delta_prompt
+
+    # Only pairs with the new claim were checked, and ids refer to the store
+    checked = re.findall(r"Claim 1: (.+)\n  Claim 2: (.+)", checker.client.requests[-1]["messages"][0]["content"])
+    assert checked and all("Justice is not" in first + second for first, second in checked)
+    assert [(c["claim_1_id"], c["claim_2_id"]) for c in second["contradictions"]] == [(1, 3)]
+    assert second["new_turns"] == 2 and checker.checked_claims == 3
+
+
+def test_async_incremental_analysis_checks_contradictions():
+    import asyncio
+
+    from core.async_engine import AsyncIncrementalArgumentAnalyzer
+
+    class AsyncDialogueClient(DialogueClient):
+        def __init__(self):
+            super().__init__()
+            self.messages = SimpleNamespace(create=self.acreate)
+
+        async def acreate(self, **request):
+            return self.create(**request)
+
+    checker = AsyncIncrementalArgumentAnalyzer(api_key="test")
+    checker.client = AsyncDialogueClient()
+    checker.cache = ResponseCache()
+    history = turns("Virtue is knowledge", "Virtue is not knowledge")
+    result = asyncio.run(checker.analyze_dialogue(history))
+    assert [(c["claim_1_id"], c["claim_2_id"]) for c in result["contradictions"]] == [(1, 2)]
@@ -0,0 +1,44 @@
+import pytest
+
+from core.budget import BudgetExceeded, TokenBudget, fit_request
+
+
+def turns(count, words=100):
+    roles = ["user", "assistant"]
+    return [{"role": roles[i % 2], "content": "word " * words} for i in range(count)]
+
+
+def request(messages, max_tokens=300, **extra):
+    return {"model": "m", "max_tokens": max_tokens, "messages": messages, **extra}
+
+
+def test_request_that_fits_is_returned_unchanged():
+    original = request(turns(4))
+    assert fit_request(original, 1_000, (TokenBudget(100_000),)) is original
+
+
+def test_oldest_exchanges_are_dropped_to_fit():
+    budget = TokenBudget(1_000)
+    messages = turns(9)
+    fitted = fit_request(request(messages), 1_200, (budget,))
+    assert fitted["messages"] == messages[-len(fitted["messages"]):]
+    assert fitted["messages"][0]["role"] == "user"
+    assert 1 <= len(fitted["messages"]) < len(messages)
+
+
+def test_pressure_shrinks_replies_but_not_structured_ones():
+    budget = TokenBudget(10_000)
+    budget.charge(9_500)  # a quarter of the low-water mark left
+    fitted = fit_request(request(turns(1), max_tokens=400), 50, (budget,))
+    assert fitted["max_tokens"] == 100
+
+    structured = request(turns(1), max_tokens=400, tool_choice={"type": "tool", "name": "x"})
+    assert fit_request(structured, 50, (budget,))["max_tokens"] == 400
+
+
+def test_the_tightest_budget_refuses_what_cannot_fit():
+    session, route = TokenBudget(100_000), TokenBudget(200, name="route")
+    with pytest.raises(BudgetExceeded) as raised:
+        fit_request(request(turns(1)), 50, (session, route))
+    assert raised.value.budget is route
+    assert route.refused == 1 and session.refused == 0
@@ -0,0 +1,70 @@
+import asyncio
+
+import anthropic
+
+from core import clients
+
+
+def test_limits_use_the_sdk_http_library():
+    limits = clients._limits()
+    assert isinstance(limits, type(anthropic.DEFAULT_CONNECTION_LIMITS))
+    assert limits.max_connections == clients._config["max_connections"]
+    assert limits.max_keepalive_connections == clients._config["max_keepalive_connections"]
+
+
+def test_shared_clients_build_and_are_reused():
+    client = clients._shared_client("test-key")
+    assert clients._shared_client("test-key") is client
+    clients.reset()
+    assert client.is_closed()
+
+
+def test_reset_closes_async_clients_on_their_loop():
+    async def build_and_reset():
+        client = clients._shared_async_client("test-key")
+        clients.reset()
+        # The close is scheduled on this loop, which is running
+        for _ in range(50):
+            if client.is_closed():
+                break
+            await asyncio.sleep(0.01)
+        return client
+
+    assert asyncio.run(build_and_reset()).is_closed()
+
+
+def test_reset_closes_async_clients_of_an_idle_loop():
+    async def build():
+        return clients._shared_async_client("test-key")
+
+    loop = asyncio.new_event_loop()
+    try:
+        client = loop.run_until_complete(build())
+        clients.reset()
+        assert client.is_closed()
+    finally:
+        loop.close()
+
+
+def test_scheduled_clients_pick_up_new_clients_after_reset():
+    scheduled = clients.get_client("test-key")
+    first = scheduled.client
+    first_messages = scheduled.messages
+    assert scheduled.client is first and scheduled.messages is first_messages
+
+    clients.reset()
+    assert first.is_closed()
+    assert scheduled.client is not first and not scheduled.client.is_closed()
+    assert scheduled.messages is not first_messages
+    clients.reset()
+
+
+def test_retries_are_configured_on_the_scheduler():
+    scheduler = clients.get_scheduler()
+    before = scheduler.max_retries
+    try:
+        clients.configure(max_retries=1)
+        assert scheduler.max_retries == 1
+        assert clients.pool_stats()["config"]["max_retries"] == 1
+    finally:
+        clients.configure(max_retries=before)
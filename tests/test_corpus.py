@@ -0,0 +1,114 @@
+import json
+
+from core.corpus import CorpusPipeline
+
+
+class FlakyAnalyzer:
+    """analyze_dialogue fails for the dialogues in `failing`, as during an outage."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def analyze_dialogue(self, history):
+        text = history[0]["content"]
+        self.calls.append(text)
+        if text in self.failing:
+            return {"error": "Error code: 529 - overloaded"}
+        return {"argument_strength": "moderate", "consistency_score": 70}
+
+
+class Profiler:
+    def assess_sophistication(self, history):
+        return {"level": "intermediate", "overall_score": 55}
+
+
+def write_corpus(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"d{i}", "history": [
+                {"role": "user", "content": f"dialogue {i}"},
+                {"role": "assistant", "content": "Why?"},
+            ]}) + "\n")
+
+
+def results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def run(tmp_path, analyzer, workers=2):
+    pipeline = CorpusPipeline(str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl"),
+                              workers=workers, analyzer=analyzer, profiler=Profiler())
+    return pipeline, pipeline.run()
+
+
+def test_errored_dialogues_are_retried_and_replaced(tmp_path):
+    write_corpus(tmp_path / "in.jsonl", 6)
+
+    _, stats = run(tmp_path, FlakyAnalyzer(failing={"dialogue 1", "dialogue 4"}))
+    assert stats["processed"] == 4 and stats["errors"] == 2
+    with open(tmp_path / "out.jsonl.checkpoint") as f:
+        assert json.load(f)["next_line"] == 1
+
+    analyzer = FlakyAnalyzer()
+    _, stats = run(tmp_path, analyzer)
+    assert sorted(analyzer.calls) == ["dialogue 1", "dialogue 4"]
+    assert stats == {"processed": 2, "errors": 0, "skipped": 3, "retried": 2}
+
+    records = results(tmp_path / "out.jsonl")
+    assert sorted(r["line"] for r in records) == list(range(6))
+    assert not any("error" in r for r in records)
+    with open(tmp_path / "out.jsonl.checkpoint") as f:
+        assert json.load(f)["next_line"] == 6
+
+
+def test_a_dialogue_that_fails_again_keeps_one_error_record(tmp_path):
+    write_corpus(tmp_path / "in.jsonl", 3)
+    run(tmp_path, FlakyAnalyzer(failing={"dialogue 2"}))
+    _, stats = run(tmp_path, FlakyAnalyzer(failing={"dialogue 2"}))
+    assert stats["errors"] == 1 and stats["retried"] == 1
+
+    records = [r for r in results(tmp_path / "out.jsonl") if r["line"] == 2]
+    assert len(records) == 1 and "error" in records[0]
+
+
+def test_finished_run_is_not_repeated(tmp_path):
+    write_corpus(tmp_path / "in.jsonl", 4)
+    run(tmp_path, FlakyAnalyzer())
+    analyzer = FlakyAnalyzer()
+    _, stats = run(tmp_path, analyzer)
+    assert analyzer.calls == []
+    assert stats["processed"] == 0
+
+
+def test_errors_behind_an_old_checkpoint_are_retried(tmp_path):
+    # Output from a run that checkpointed past its errors
+    write_corpus(tmp_path / "in.jsonl", 3)
+    with open(tmp_path / "out.jsonl", "w") as f:
+        f.write(json.dumps({"id": "d0", "line": 0, "error": "overloaded"}) + "\n")
+        f.write(json.dumps({"id": "d1", "line": 1, "analysis": {}}) + "\n")
+        f.write(json.dumps({"id": "d2", "line": 2, "analysis": {}}) + "\n")
+    with open(tmp_path / "out.jsonl.checkpoint", "w") as f:
+        json.dump({"next_line": 3}, f)
+
+    analyzer = FlakyAnalyzer()
+    _, stats = run(tmp_path, analyzer)
+    assert analyzer.calls == ["dialogue 0"]
+    assert [r["line"] for r in results(tmp_path / "out.jsonl")] == [1, 2, 0]
+
+
+def test_torn_final_line_is_ignored(tmp_path):
+    write_corpus(tmp_path / "in.jsonl", 2)
+    with open(tmp_path / "out.jsonl", "w") as f:
+        f.write(json.dumps({"id": "d0", "line": 0, "analysis": {}}) + "\n")
+        f.write('{"id": "d1", "li')
+
+    analyzer = FlakyAnalyzer()
+    run(tmp_path, analyzer)
+    assert analyzer.calls == ["dialogue 1"]
+    with open(tmp_path / "out.jsonl") as f:
+        lines = f.read().splitlines()
+    # The new result starts a line of its own, after the torn one
+    assert lines[1] == '{"id": "d1", "li'
+    assert json.loads(lines[2])["line"] == 1
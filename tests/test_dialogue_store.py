@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.dialogue_store import DialogueConflict, DialogueStore, attach, is_current
+from core.socrates import SocraticDialogue
+
+
+class EchoClient:
+    def __init__(self, reply):
+        self.reply = reply
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, **request):
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=self.reply)], usage=None)
+
+
+def worker_dialogue(store, reply):
+    """The same session as loaded by one web worker."""
+    dialogue = attach(SocraticDialogue(api_key="test"), "s1", store)
+    dialogue.client = EchoClient(reply)
+    return dialogue
+
+
+def test_concurrent_append_reports_conflict_and_reloads(tmp_path):
+    store = DialogueStore(str(tmp_path / "dialogues.db"))
+    first = worker_dialogue(store, "What is justice?")
+    first.set_topic("justice")
+    first.respond("Tell me")
+
+    a = worker_dialogue(store, "Reply from A")
+    b = worker_dialogue(store, "Reply from B")
+    a.respond("Is it fairness?")
+    with pytest.raises(DialogueConflict):
+        b.respond("Is it strength?")
+
+    # B now holds A's turns and matches the store again
+    assert [turn["content"] for turn in b.history[-2:]] == ["Is it fairness?", "Reply from A"]
+    assert is_current(b)
+    assert store.load("s1")["history"] == a.history
+
+    b.respond("Then is it strength?")
+    assert len(store.load("s1")["history"]) == 6
+
+
+def test_is_current_sees_other_workers_turns(tmp_path):
+    store = DialogueStore(str(tmp_path / "dialogues.db"))
+    a = worker_dialogue(store, "Why?")
+    a.set_topic("justice")
+    b = worker_dialogue(store, "Why?")
+    assert is_current(b)
+
+    a.respond("Justice is fairness")
+    assert not is_current(b)
+    assert is_current(worker_dialogue(store, "Why?"))
+
+
+def test_generations_and_versions(tmp_path):
+    store = DialogueStore(str(tmp_path / "dialogues.db"))
+    assert store.version("s1") is None
+    assert store.start("s1", "justice", "socratic", False) == 1
+    store.append_many("s1", 1, 0, [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}])
+    assert store.version("s1") == (1, 2)
+
+    # A reset starts a new, empty generation; the old turns stay on disk
+    assert store.start("s1", "courage", "stoic", True) == 2
+    record = store.load("s1")
+    assert (record["topic"], record["mode"], record["security"], record["history"]) == ("courage", "stoic", True, [])
+    assert store.stats()["turns"] == 2
+
+
+def test_session_ids_since(tmp_path):
+    store = DialogueStore(str(tmp_path / "dialogues.db"))
+    store.start("old", "justice", "socratic", False)
+    store.start("extended", "justice", "socratic", False)
+    cutoff = time.time()
+    time.sleep(0.01)
+    store.append("extended", 1, 0, "user", "still here")
+    store.start("new", "courage", "socratic", False)
+    assert store.session_ids(since=cutoff) == ["extended", "new"]
+
+
+def test_leases_exclude_other_owners_until_they_expire(tmp_path):
+    store = DialogueStore(str(tmp_path / "dialogues.db"))
+    assert store.claim_lease("analysis", "worker-1", ttl=60)
+    assert store.claim_lease("analysis", "worker-1", ttl=60)
+    assert not store.claim_lease("analysis", "worker-2", ttl=60)
+    assert store.lease_holder("analysis") == "worker-1"
+
+    store.release_lease("analysis", "worker-2")
+    assert store.lease_holder("analysis") == "worker-1"
+    store.release_lease("analysis", "worker-1")
+    assert store.claim_lease("analysis", "worker-2", ttl=0.01)
+    time.sleep(0.02)
+    assert store.lease_holder("analysis") is None
+    assert store.claim_lease("analysis", "worker-1", ttl=60)
+
+
+class RecordingStore(DialogueStore):
+    """Notes the thread each write runs on."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.write_threads = []
+
+    def start(self, *args):
+        self.write_threads.append(threading.get_ident())
+        return super().start(*args)
+
+    def append(self, *args):
+        self.write_threads.append(threading.get_ident())
+        return super().append(*args)
+
+    def append_many(self, *args):
+        self.write_threads.append(threading.get_ident())
+        return super().append_many(*args)
+
+
+class AsyncEchoClient:
+    def __init__(self, reply):
+        self.reply = reply
+        self.messages = SimpleNamespace(create=self.create)
+
+    async def create(self, **request):
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=self.reply)], usage=None)
+
+
+def test_async_dialogue_writes_the_journal_off_the_event_loop(tmp_path):
+    from core.async_engine import AsyncSocraticDialogue
+
+    store = RecordingStore(str(tmp_path / "dialogues.db"))
+
+    def async_dialogue(reply):
+        dialogue = attach(AsyncSocraticDialogue(api_key="test"), "s1", store)
+        dialogue.client = AsyncEchoClient(reply)
+        return dialogue
+
+    async def converse():
+        loop_thread = threading.get_ident()
+        a = async_dialogue("What is justice?")
+        await a.set_topic("justice")
+        await a.use_opening("What is justice?")
+        b = async_dialogue("Reply from B")
+        await a.respond("Fairness")
+        with pytest.raises(DialogueConflict):
+            await b.respond("Strength")
+        await a.reset()
+        return loop_thread, b
+
+    loop_thread, b = asyncio.run(converse())
+    assert len(store.write_threads) == 5
+    assert loop_thread not in store.write_threads
+    assert b.history[-1]["content"] == "What is justice?" and len(b.history) == 4
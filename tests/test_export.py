@@ -0,0 +1,56 @@
+import gzip
+import json
+
+from core import export
+from core.dialogue_store import DialogueStore
+from core.export import export_jsonl, export_markdown, export_text, gzip_jsonl, stored_records
+
+RECORD = {
+    "id": "s1", "generation": 1, "topic": "Justice", "mode": "socratic", "security": False,
+    "history": [{"role": "user", "content": "What is justice?"}, {"role": "assistant", "content": "Ask yourself."}],
+}
+
+
+def test_exporters_emit_one_chunk_per_turn():
+    lines = [json.loads(line) for line in export_jsonl(RECORD)]
+    assert lines[0] == {"type": "session", "id": "s1", "generation": 1, "topic": "Justice",
+                        "mode": "socratic", "security": False}
+    assert [(line["turn"], line["role"]) for line in lines[1:]] == [(1, "user"), (2, "assistant")]
+
+    for exporter in (export_text, export_markdown):
+        chunks = list(exporter(RECORD))
+        assert len(chunks) == len(RECORD["history"]) + 2
+        assert "Philosopher (Turn 2)" in chunks[2]
+
+
+def test_gzip_jsonl_round_trips_across_chunks(monkeypatch):
+    monkeypatch.setattr(export, "GZIP_CHUNK_BYTES", 512)
+    records = [dict(RECORD, id=f"s{i}") for i in range(50)]
+    consumed = []
+
+    def source():
+        for record in records:
+            consumed.append(record["id"])
+            yield record
+
+    chunks = gzip_jsonl(source())
+    first = next(chunks)
+    # Output starts before the input is exhausted
+    assert len(consumed) < len(records)
+    chunks = [first, *chunks]
+    lines = gzip.decompress(b"".join(chunks)).decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == records
+
+
+def test_gzip_jsonl_of_nothing_is_a_valid_empty_file():
+    assert gzip.decompress(b"".join(gzip_jsonl([]))) == b""
+
+
+def test_stored_records_streams_the_store(tmp_path):
+    store = DialogueStore(str(tmp_path / "dialogues.db"))
+    for session_id in ("a", "b"):
+        generation = store.start(session_id, "Justice", "socratic", False)
+        store.append(session_id, generation, 0, "user", f"hello from {session_id}")
+    records = list(stored_records(store))
+    assert [record["id"] for record in records] == ["a", "b"]
+    assert records[1]["history"] == [{"role": "user", "content": "hello from b"}]
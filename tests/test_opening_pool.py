@@ -0,0 +1,83 @@
+import itertools
+import time
+
+from core import opening_pool
+from core.opening_pool import OpeningPool
+
+KEY = ("justice", "socratic", False)
+
+
+class CountingPool(OpeningPool):
+    """Generates numbered openings instead of calling the API."""
+
+    counter = itertools.count()
+
+    def generate(self, key):
+        return f"What is {key[0]}? ({next(self.counter)})"
+
+
+def drain(pool):
+    """Wait for background refills to finish."""
+    deadline = time.monotonic() + 5
+    while pool.stats()["refilling"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_workers_sharing_a_file_never_hand_out_the_same_opening(tmp_path):
+    path = str(tmp_path / "openings.sqlite")
+    first, second = CountingPool(path, size=4), CountingPool(path, size=4)
+    first.refill(KEY)
+    drain(first)
+    assert second.stats()["ready"] == 4
+
+    taken = [pool.take(*KEY) for pool in (first, second, first, second)]
+    assert None not in taken
+    assert len(set(taken)) == 4
+
+
+def test_a_shared_key_is_not_filled_past_size(tmp_path):
+    path = str(tmp_path / "openings.sqlite")
+    first, second = CountingPool(path, size=2), CountingPool(path, size=2)
+    assert first._add(KEY, "a") and second._add(KEY, "b")
+    assert not first._add(KEY, "c")
+    assert not second._add(KEY, "d")
+    assert first.stats()["ready"] == 2
+
+
+def test_repeats_are_dropped():
+    pool = CountingPool(size=3)
+    assert pool._add(KEY, "a")
+    assert not pool._add(KEY, "a")
+    assert pool.take(*KEY) == "a"
+
+
+def test_take_fills_a_key_on_first_use():
+    pool = CountingPool(size=2)
+    assert pool.take(*KEY) is None
+    drain(pool)
+    assert pool.stats()["ready"] == 2
+    assert "justice/socratic" not in pool.stats()["empty_keys"]
+
+
+def test_custom_topics_are_not_pooled():
+    pool = CountingPool(size=2)
+    assert pool.take("custom", "socratic") is None
+    assert pool.stats()["misses"] == 0
+
+
+def test_pool_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("OPENING_POOL_SIZE", raising=False)
+    monkeypatch.setattr(opening_pool, "_default_pool", None)
+    assert opening_pool.get_opening_pool() is None
+
+
+def test_memory_pool_is_not_warmed(monkeypatch):
+    monkeypatch.setenv("OPENING_POOL_SIZE", "2")
+    monkeypatch.delenv("OPENING_POOL_PATH", raising=False)
+    monkeypatch.setattr(opening_pool, "_default_pool", None)
+    pool = opening_pool.get_opening_pool()
+    try:
+        assert pool is not None
+        assert pool.stats()["refilling"] == 0
+    finally:
+        monkeypatch.setattr(opening_pool, "_default_pool", None)
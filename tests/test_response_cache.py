@@ -0,0 +1,81 @@
+import time
+
+from core.response_cache import ResponseCache, is_cacheable, normalize_text
+
+REQUEST = {"model": "m", "max_tokens": 100, "messages": [{"role": "user", "content": "Is virtue knowledge?"}]}
+
+
+def test_key_covers_the_whole_request():
+    key = ResponseCache.key("extract_claims", REQUEST)
+    assert key == ResponseCache.key("extract_claims", dict(REQUEST))
+    assert key != ResponseCache.key("extract_claims", dict(REQUEST, model="other"))
+    assert key != ResponseCache.key("challenge_assumptions", REQUEST)
+
+
+def test_hits_return_copies_and_are_counted():
+    cache = ResponseCache()
+    key = cache.key("extract_claims", REQUEST)
+    assert cache.get("extract_claims", key) is None
+    cache.set("extract_claims", key, ["virtue is knowledge"])
+
+    hit = cache.get("extract_claims", key)
+    hit.append("mutated")
+    assert cache.get("extract_claims", key) == ["virtue is knowledge"]
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"]) == (2, 1)
+
+
+def test_disk_tier_survives_a_restart_and_entries_expire(tmp_path):
+    path = str(tmp_path / "cache.db")
+    key = ResponseCache.key("extract_claims", REQUEST)
+    ResponseCache(path).set("extract_claims", key, ["a"])
+
+    cache = ResponseCache(path, ttl=0.05)
+    assert cache.get("extract_claims", key) == ["a"]
+    assert cache.stats()["disk_hits"] == 1
+    time.sleep(0.1)
+    assert cache.get("extract_claims", key) is None
+    assert cache.purge_expired() == 1
+
+
+def test_memory_tier_is_bounded():
+    cache = ResponseCache(max_entries=2)
+    for i in range(3):
+        cache.set("m", str(i), i)
+    assert cache.get("m", "0") is None
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_only_successful_results_are_cacheable_and_input_is_normalized():
+    assert not is_cacheable({"error": "overloaded"})
+    assert not is_cacheable([])
+    assert is_cacheable({"claims": []})
+    assert normalize_text("  Virtue\tis   knowledge  \n\n\n\nor not ") == "Virtue is knowledge\n\nor not"
+
+
+def test_async_access_reads_and_writes_the_disk_tier_off_the_loop(tmp_path):
+    import asyncio
+    import threading
+
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    key = cache.key("extract_claims", REQUEST)
+    threads = []
+    get_disk, set_disk = cache._get_disk, cache._set_disk
+
+    def recorded(work):
+        def run(*args):
+            threads.append(threading.get_ident())
+            return work(*args)
+        return run
+
+    cache._get_disk, cache._set_disk = recorded(get_disk), recorded(set_disk)
+
+    async def use():
+        assert await cache.aget("extract_claims", key) is None
+        await cache.aset("extract_claims", key, ["a"])
+        assert await cache.aget("extract_claims", key) == ["a"]  # memory: no thread
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(use())
+    assert len(threads) == 2 and loop_thread not in threads
+    assert ResponseCache(str(tmp_path / "cache.db")).get("extract_claims", key) == ["a"]
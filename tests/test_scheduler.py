@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.budget import TokenBudget, use_budgets
+from core.scheduler import BATCH, INTERACTIVE, RequestScheduler, ScheduledClient, TokenBucket
+
+
+class Overloaded(Exception):
+    status_code = 529
+
+
+class FlakyMessages:
+    """Fails with 529 the first `failures` times, then answers."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        if len(self.requests) <= self.failures:
+            raise Overloaded("Error code: 529 - overloaded")
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text="Why?")],
+                               usage=SimpleNamespace(input_tokens=40, output_tokens=10))
+
+
+def client(messages, scheduler, priority=INTERACTIVE):
+    return ScheduledClient(lambda: SimpleNamespace(messages=messages), scheduler, priority)
+
+
+REQUEST = {"model": "m", "max_tokens": 100, "messages": [{"role": "user", "content": "Is virtue knowledge?"}]}
+
+
+def test_bucket_keeps_the_reserve_for_higher_classes():
+    bucket = TokenBucket(per_minute=10)
+    now = time.monotonic()
+    bucket.take(8, now)
+    assert bucket.wait_time(1, reserve=0.0, now=now) == 0.0
+    assert bucket.wait_time(1, reserve=0.3, now=now) > 0
+
+
+def test_interactive_waiter_is_admitted_before_batch():
+    scheduler = RequestScheduler(requests_per_minute=600)
+    scheduler.requests.level = 0.0
+    admitted = []
+
+    def wait(priority):
+        scheduler.acquire(priority, 10)
+        admitted.append(priority)
+
+    batch = threading.Thread(target=wait, args=(BATCH,))
+    batch.start()
+    time.sleep(0.1)
+    interactive = threading.Thread(target=wait, args=(INTERACTIVE,))
+    interactive.start()
+    interactive.join(10)
+    assert admitted == [INTERACTIVE]
+
+    # Batch must leave its reserve untouched: it goes once the bucket refills
+    scheduler.observe_headers({"anthropic-ratelimit-requests-remaining": "600"})
+    batch.join(10)
+    assert admitted == [INTERACTIVE, BATCH]
+    assert scheduler.stats()["priorities"][BATCH]["max_wait_seconds"] > 0
+
+
+def test_overloaded_calls_are_retried_then_given_up():
+    scheduler = RequestScheduler(max_retries=2, backoff_base=0.01)
+    messages = FlakyMessages(failures=2)
+    response = client(messages, scheduler).messages.create(**REQUEST)
+    assert response.content[0].text == "Why?"
+    assert scheduler.stats()["priorities"][INTERACTIVE]["retries"] == 2
+
+    with pytest.raises(Overloaded):
+        client(FlakyMessages(failures=5), scheduler).messages.create(**REQUEST)
+    assert scheduler.stats()["priorities"][INTERACTIVE]["failed"] == 1
+    assert scheduler.stats()["throttled"]["529"] == 4
+
+
+def test_rate_limit_headers_resync_the_buckets():
+    scheduler = RequestScheduler()
+    scheduler.observe_headers({
+        "anthropic-ratelimit-requests-limit": "50",
+        "anthropic-ratelimit-requests-remaining": "0",
+    })
+    buckets = scheduler.stats()["buckets"]
+    assert buckets["requests"]["per_minute"] == 50
+    assert buckets["requests"]["available"] < 1
+    assert buckets["input_tokens"]["per_minute"] is None
+
+
+def test_calls_are_charged_to_the_active_budgets():
+    session = TokenBudget(10_000)
+    use_budgets(session)
+    try:
+        client(FlakyMessages(), RequestScheduler()).messages.create(**REQUEST)
+    finally:
+        use_budgets()
+    assert session.used == 50
+
+
+def counting_admissions(scheduler):
+    """Wrap _try_admit to count how often waiters look at the queue."""
+    looks = []
+    try_admit = scheduler._try_admit
+
+    def counted(*args):
+        looks.append(args[0])
+        return try_admit(*args)
+
+    scheduler._try_admit = counted
+    return looks
+
+
+def test_queued_threads_sleep_until_they_reach_the_head():
+    scheduler = RequestScheduler(requests_per_minute=60)
+    scheduler.requests.level = 0.0
+    looks = counting_admissions(scheduler)
+    waiters = [threading.Thread(target=scheduler.acquire, args=(BATCH, 10)) for _ in range(10)]
+    for waiter in waiters:
+        waiter.start()
+    time.sleep(0.5)
+    # One look each on arrival, and a few by the head; no polling
+    assert len(looks) < 20
+    assert scheduler.stats()["queue_depth"] == 10
+
+    scheduler.observe_headers({"anthropic-ratelimit-requests-remaining": "60"})
+    for waiter in waiters:
+        waiter.join(5)
+    assert scheduler.stats()["priorities"][BATCH]["admitted"] == 10
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+def test_queued_coroutines_sleep_until_they_reach_the_head():
+    scheduler = RequestScheduler(requests_per_minute=60)
+    scheduler.requests.level = 0.0
+    looks = counting_admissions(scheduler)
+
+    async def run():
+        waiters = [asyncio.ensure_future(scheduler.acquire_async(BATCH, 10)) for _ in range(10)]
+        await asyncio.sleep(0.5)
+        idle_looks = len(looks)
+        # Rate-limit headers may arrive on another thread (a sync client)
+        threading.Thread(target=scheduler.observe_headers,
+                         args=({"anthropic-ratelimit-requests-remaining": "60"},)).start()
+        await asyncio.wait_for(asyncio.gather(*waiters), 5)
+
+        # A cancelled waiter leaves the queue and wakes the one behind it
+        scheduler.requests.level = 0.0
+        first = asyncio.ensure_future(scheduler.acquire_async(INTERACTIVE, 10))
+        second = asyncio.ensure_future(scheduler.acquire_async(INTERACTIVE, 10))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        scheduler.requests.level = 60.0
+        await asyncio.wait_for(second, 5)
+        return idle_looks
+
+    assert asyncio.run(run()) < 20
+    assert scheduler.stats()["queue_depth"] == 0
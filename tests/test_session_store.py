@@ -0,0 +1,91 @@
+import threading
+import time
+
+from core.session_store import SessionStore, estimate_bytes
+
+
+class Dialogue:
+    def __init__(self):
+        self.topic = "justice"
+        self.history = []
+
+
+def add_turns(dialogue, count, start=0):
+    for i in range(start, start + count):
+        dialogue.history.append({"role": "user", "content": f"turn {i} " * 20})
+
+
+def test_memo_charges_only_new_turns_and_matches_a_full_walk():
+    dialogue = Dialogue()
+    add_turns(dialogue, 50)
+    memo = {}
+    assert estimate_bytes(dialogue, memo) == estimate_bytes(dialogue)
+
+    add_turns(dialogue, 10, start=50)
+    assert estimate_bytes(dialogue, memo) == estimate_bytes(dialogue)
+
+    # A popped turn replaced by a different one is re-counted
+    dialogue.history.pop()
+    dialogue.history.append({"role": "assistant", "content": "x" * 5000})
+    assert estimate_bytes(dialogue, memo) == estimate_bytes(dialogue)
+
+    # So is a new history (reset), and the old list is dropped from the memo
+    old = dialogue.history
+    dialogue.history = []
+    add_turns(dialogue, 3)
+    assert estimate_bytes(dialogue, memo) == estimate_bytes(dialogue)
+    assert all(entry[0] is not old for entry in memo.values())
+
+
+def test_touch_measures_outside_the_store_lock(monkeypatch):
+    import core.session_store as session_store
+
+    store = SessionStore()
+    store.put("slow", Dialogue())
+    store.put("other", Dialogue())
+    measuring, release = threading.Event(), threading.Event()
+    estimate = session_store.estimate_bytes
+
+    def slow_estimate(value, memo=None):
+        if value is store.get("slow"):
+            measuring.set()
+            release.wait(5)
+        return estimate(value, memo)
+
+    monkeypatch.setattr(session_store, "estimate_bytes", slow_estimate)
+    toucher = threading.Thread(target=store.touch, args=("slow",))
+    toucher.start()
+    assert measuring.wait(5)
+
+    # Another session's request is not held up by the measurement
+    started = time.monotonic()
+    store.touch("other")
+    assert store.get("other") is not None
+    assert time.monotonic() - started < 1
+    release.set()
+    toucher.join(5)
+    assert store.stats()["total_bytes"] == sum(s["bytes"] for s in store.stats()["sessions"])
+
+
+def test_growing_session_is_evicted_by_bytes():
+    evicted = []
+    store = SessionStore(max_bytes=20_000, on_evict=lambda sid, value, reason: evicted.append((sid, reason)))
+    first, second = Dialogue(), Dialogue()
+    store.put("first", first)
+    store.put("second", second)
+
+    add_turns(second, 10)
+    store.touch("second")
+    assert evicted == []
+    add_turns(second, 100, start=10)
+    store.touch("second")
+    assert evicted == [("first", "bytes")]
+    assert store.stats()["total_bytes"] == estimate_bytes(second)
+
+
+def test_idle_sessions_expire():
+    store = SessionStore(idle_ttl=0.05)
+    store.put("idle", Dialogue())
+    time.sleep(0.1)
+    assert store.get("idle") is None
+    assert store.stats()["evictions"]["ttl"] == 1
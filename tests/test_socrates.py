@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.dialogue_store import DialogueStore, attach
+from core.socrates import SocraticDialogue
+
+
+class Overloaded(Exception):
+    pass
+
+
+class BreakingStream:
+    """Sends `chunks`, then fails if `fail` is set, like a dropped connection."""
+
+    def __init__(self, chunks, fail):
+        self.chunks = chunks
+        self.fail = fail
+
+    def _texts(self):
+        yield from self.chunks
+        if self.fail:
+            raise Overloaded("Error code: 529 - overloaded")
+
+    def __enter__(self):
+        self.text_stream = self._texts()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get_final_message(self):
+        return SimpleNamespace(usage=None)
+
+
+class AsyncBreakingStream(BreakingStream):
+    async def _atexts(self):
+        for text in self._texts():
+            yield text
+
+    async def __aenter__(self):
+        self.text_stream = self._atexts()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get_final_message(self):
+        return SimpleNamespace(usage=None)
+
+
+def streaming(dialogue, stream_class, fail):
+    dialogue.client = SimpleNamespace(messages=SimpleNamespace(
+        stream=lambda **request: stream_class(["Is justice ", "the advantage"], fail)))
+    return dialogue
+
+
+def stored_dialogue(tmp_path, dialogue):
+    dialogue = attach(dialogue, "s1", DialogueStore(str(tmp_path / "dialogues.db")))
+    dialogue.topic = "justice"
+    dialogue.journal.start(dialogue.topic, dialogue.mode, dialogue.is_security)
+    return dialogue
+
+
+def test_failed_stream_keeps_nothing(tmp_path):
+    dialogue = streaming(stored_dialogue(tmp_path, SocraticDialogue(api_key="test")), BreakingStream, fail=True)
+    received = []
+    with pytest.raises(Overloaded):
+        for delta in dialogue.respond_stream("Is justice strength?"):
+            received.append(delta)
+
+    assert received == ["Is justice ", "the advantage"]
+    assert dialogue.history == []
+    assert dialogue.journal.store.load("s1")["history"] == []
+
+
+def test_completed_stream_is_committed(tmp_path):
+    dialogue = streaming(stored_dialogue(tmp_path, SocraticDialogue(api_key="test")), BreakingStream, fail=False)
+    assert "".join(dialogue.respond_stream("Is justice strength?")) == "Is justice the advantage"
+    assert dialogue.journal.store.load("s1")["history"][-1] == {
+        "role": "assistant", "content": "Is justice the advantage"}
+
+
+def test_failed_async_stream_keeps_nothing(tmp_path):
+    from core.async_engine import AsyncSocraticDialogue
+
+    dialogue = streaming(stored_dialogue(tmp_path, AsyncSocraticDialogue(api_key="test")),
+                         AsyncBreakingStream, fail=True)
+
+    async def converse():
+        async for _ in dialogue.respond_stream("Is justice strength?"):
+            pass
+
+    with pytest.raises(Overloaded):
+        asyncio.run(converse())
+    assert dialogue.history == []
+    assert dialogue.journal.store.load("s1")["history"] == []
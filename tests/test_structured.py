@@ -0,0 +1,113 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.structured import (
+    PartialJSON, StructuredOutputError, StructuredStream, parse_structured, response_payload,
+)
+
+REPLY = '{"claims": [{"id": 1, "text": "Justice is fairness"}, {"id": 2, "text": "Fair to wh'
+
+
+def test_partial_json_stops_at_the_last_complete_element():
+    parser = PartialJSON()
+    assert not parser.feed("Here is the analysis: ")
+    assert parser.value() is None
+    assert parser.feed(REPLY)
+    assert parser.value() == {"claims": [{"id": 1, "text": "Justice is fairness"}]}
+    assert not parser.complete
+
+    parser.feed('om?"}], "aporia_reached": false} trailing prose')
+    assert parser.complete
+    assert [claim["id"] for claim in parser.value()["claims"]] == [1, 2]
+
+
+def test_partial_json_ignores_brackets_inside_strings():
+    parser = PartialJSON()
+    parser.feed('["a {not] nested", "b \\"quoted\\" ],')
+    assert parser.value() == ["a {not] nested"]
+
+
+def test_partial_json_holds_back_unfinished_list_items():
+    parser = PartialJSON()
+    parser.feed('{"claims": [{"id": 1}, {"id": 2, "te')
+    assert parser.value() == {"claims": [{"id": 1}]}
+    parser.feed('xt": "x"}')
+    assert parser.value() == {"claims": [{"id": 1}, {"id": 2, "text": "x"}]}
+
+
+def delta(text):
+    return SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="input_json_delta", partial_json=text))
+
+
+class FakeStream:
+    def __init__(self, chunks, final):
+        self.events = [SimpleNamespace(type="message_start")] + [delta(chunk) for chunk in chunks]
+        self.final = final
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def get_final_message(self):
+        return self.final
+
+
+class FakeAsyncStream(FakeStream):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for event in self.events:
+            yield event
+
+    async def get_final_message(self):
+        return self.final
+
+
+def streaming_client(chunks, final, stream_class=FakeStream):
+    return SimpleNamespace(messages=SimpleNamespace(stream=lambda **request: stream_class(chunks, final)))
+
+
+CHUNKS = ['{"items": ["Justice is ', 'fairness", "Fairness is', ' equality"', ']}']
+FINAL = SimpleNamespace(content=[SimpleNamespace(
+    type="tool_use", input={"items": ["Justice is fairness", "Fairness is equality"]})])
+
+
+def test_structured_stream_yields_each_completed_item():
+    stream = StructuredStream()
+    partials = list(stream.run(streaming_client(CHUNKS, FINAL), {}))
+    assert partials == [
+        {"items": []},
+        {"items": ["Justice is fairness"]},
+        {"items": ["Justice is fairness", "Fairness is equality"]},
+    ]
+    assert parse_structured(response_payload(stream.final), "extract_claims") == [
+        "Justice is fairness", "Fairness is equality"]
+
+
+def test_structured_stream_async_matches_sync():
+    async def collect():
+        stream = StructuredStream()
+        return [partial async for partial in stream.arun(streaming_client(CHUNKS, FINAL, FakeAsyncStream), {})], stream.final
+
+    partials, final = asyncio.run(collect())
+    assert partials[-1] == {"items": ["Justice is fairness", "Fairness is equality"]}
+    assert final is FINAL
+
+
+def test_parse_structured_accepts_prose_and_rejects_bad_schema():
+    assert parse_structured('Claims: ["a", "b"] as requested', "extract_claims") == ["a", "b"]
+    with pytest.raises(StructuredOutputError):
+        parse_structured('{"contradicts": "maybe"}', "detect_contradiction")
+    with pytest.raises(StructuredOutputError):
+        parse_structured("no json here", "extract_claims")
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from core import telemetry
+
+
+def metric_lines(text, status):
+    return [line for line in text.splitlines()
+            if line.startswith("http_requests_total{") and f'status="{status}"' in line]
+
+
+@pytest.mark.parametrize("method, path, status", [
+    ("get", "/no/such/route", 404),
+    ("get", "/api/start", 405),
+])
+def test_quart_error_responses_pass_through(method, path, status):
+    import app_asgi
+
+    async def request():
+        client = app_asgi.app.test_client()
+        response = await getattr(client, method)(path)
+        return response.status_code, response.headers.get("X-Request-ID")
+
+    code, trace_id = asyncio.run(request())
+    assert code == status
+    assert trace_id
+    assert metric_lines(telemetry.render(), status)
+
+
+@pytest.mark.parametrize("method, path, status", [
+    ("get", "/no/such/route", 404),
+    ("get", "/api/start", 405),
+])
+def test_flask_error_responses_pass_through(method, path, status):
+    import app_enhanced
+
+    with app_enhanced.app.test_client() as client:
+        response = getattr(client, method)(path)
+        response.close()
+    assert response.status_code == status
+    assert metric_lines(telemetry.render(), status)
+
+
+def test_quart_body_is_timed_once_sent():
+    import app_asgi
+
+    async def request():
+        client = app_asgi.app.test_client()
+        response = await client.get("/api/topics")
+        return response.status_code, await response.get_json()
+
+    code, body = asyncio.run(request())
+    assert code == 200
+    assert body["topics"]
+    assert any('route="/api/topics"' in line for line in metric_lines(telemetry.render(), 200))
@@ -0,0 +1,74 @@
+import json
+from collections import Counter
+from types import SimpleNamespace
+
+from core import tournament
+from core.debate_mode import DebateModerator
+from core.tournament import Tournament, round_robin
+
+
+def test_round_robin_separates_opening_from_position():
+    matches = round_robin(["socratic", "stoic", "nietzschean"], ["Can virtue be taught?"])
+    assert len(matches) == 3 * 2 * 2
+    assert len({match["key"] for match in matches}) == len(matches)
+
+    # Every mode opens with each position, and replies with each, equally often
+    opening = Counter((m["mode_a"], m["position_a"]) for m in matches)
+    replying = Counter((m["mode_b"], m["position_b"]) for m in matches)
+    assert set(opening.values()) == {2} and len(opening) == 6
+    assert set(replying.values()) == {2} and len(replying) == 6
+
+
+class ScriptedClient:
+    """Debate turns and a judgment; raises on the turns listed in `fail_on`."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.turns = 0
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, **request):
+        if "tools" in request:
+            verdict = {"winner": "socratic", "scores": {}, "verdict": "Socratic questioning carried it"}
+            return SimpleNamespace(content=[SimpleNamespace(type="tool_use", input=verdict)])
+        self.turns += 1
+        if self.turns in self.fail_on:
+            raise RuntimeError("Error code: 529 - overloaded")
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=f"Argument {self.turns}")])
+
+
+def test_failed_turn_raises_instead_of_becoming_the_turn():
+    moderator = DebateModerator(api_key="test")
+    moderator.client = ScriptedClient(fail_on={2})
+    moderator.setup_debate("Can virtue be taught?", "socratic", "stoic", "Yes", "No")
+    try:
+        moderator.run_debate(turns=4)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("run_debate did not raise")
+    assert [entry["message"] for entry in moderator.debate_history] == ["Argument 1"]
+
+
+def test_a_match_with_a_failed_turn_is_an_error_and_replayed(tmp_path, monkeypatch):
+    clients = iter([ScriptedClient(fail_on={3}), ScriptedClient()])
+
+    class Moderator(DebateModerator):
+        def __init__(self, api_key=None):
+            super().__init__(api_key=api_key)
+            self.client = next(clients)
+
+    monkeypatch.setattr(tournament, "DebateModerator", Moderator)
+    path = str(tmp_path / "results.jsonl")
+    matches = round_robin(["socratic", "stoic"], ["Can virtue be taught?"])[:1]
+
+    Tournament(path, concurrency=1, turns=4).run(matches)
+    with open(path) as f:
+        first = [json.loads(line) for line in f]
+    assert "error" in first[0] and "judgment" not in first[0]
+
+    rerun = Tournament(path, concurrency=1, turns=4)
+    assert rerun.pending(matches) == matches
+    standings = rerun.run(matches)
+    assert {row["mode"] for row in standings} == {"socratic", "stoic"}
+    assert rerun.pending(matches) == []
@@ -9,14 +9,28 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session, stream_with_context
 from core.socrates import SocraticDialogue, list_topics, list_security_topics, list_modes
+from core.admin import admin_denied
+from core.session_store import SessionStore
+from core.dialogue_store import DialogueConflict, attach, is_current
+from core.opening_pool import get_opening_pool
+from core.telemetry import instrument_flask
+import json
 import secrets
 
 app = Flask(__name__)
-app.secret_key = secrets.token_hex(16)
+# Set SECRET_KEY when running several workers, so they all accept the session cookie
+app.secret_key = os.environ.get('SECRET_KEY') or secrets.token_hex(16)
+instrument_flask(app)
 
-dialogues = {}
+dialogues = SessionStore(
+    max_sessions=int(os.environ.get("SESSION_MAX_COUNT", 1000)),
+    max_bytes=int(os.environ.get("SESSION_MAX_BYTES", 256 * 1024 * 1024)),
+    idle_ttl=float(os.environ.get("SESSION_IDLE_TTL", 3600)),
+    on_evict=lambda session_id, dialogue, reason: app.logger.info(
+        "Evicted session %s (%s)", session_id[:6], reason)
+)
 
 
 def get_dialogue():
@@ -25,10 +39,49 @@ def get_dialogue():
         session_id = secrets.token_hex(8)
         session['id'] = session_id
     
-    if session_id not in dialogues:
-        dialogues[session_id] = SocraticDialogue()
-    
-    return dialogues[session_id]
+    dialogue = dialogues.get(session_id)
+    if dialogue is None or not is_current(dialogue):
+        # New to this worker, or extended by another one since: load from the dialogue store
+        dialogue = attach(SocraticDialogue(), session_id)
+        dialogues.put(session_id, dialogue)
+    return dialogue
+
+
+@app.before_request
+def require_admin_token():
+    """Answer /api/admin/* only for requests carrying ADMIN_TOKEN."""
+    denied = admin_denied(request.path, request.headers)
+    if denied:
+        return jsonify(denied[0]), denied[1]
+    return None
+
+
+@app.errorhandler(DialogueConflict)
+def dialogue_conflict(error):
+    return jsonify({'error': str(error)}), 409
+
+
+@app.after_request
+def measure_session(response):
+    """Re-measure the session after each request so the byte cap stays accurate."""
+    session_id = session.get('id')
+    if session_id:
+        dialogues.touch(session_id)
+    return response
+
+
+def sse_event(data: dict, event: str = None) -> str:
+    """Format a Server-Sent Events message."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+def sse_response(events) -> Response:
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/')
@@ -59,7 +112,9 @@ def api_start():
     dialogue = get_dialogue()
     dialogue.set_mode(mode)
     dialogue.set_topic(topic_key, custom, security=security)
-    opening = dialogue.get_opening()
+    pool = get_opening_pool()
+    pooled = pool.take(topic_key, dialogue.mode, security) if pool else None
+    opening = dialogue.use_opening(pooled) if pooled else dialogue.get_opening()
     
     mode_data = list_modes().get(mode, list_modes()["socratic"])
     
@@ -85,7 +140,42 @@ def api_respond():
         return jsonify({'error': 'No topic selected'}), 400
     
     response = dialogue.respond(user_input)
-    return jsonify({'message': response})
+    return jsonify({'message': response, 'usage': dialogue.last_usage})
+
+
+@app.route('/api/respond/stream', methods=['POST'])
+def api_respond_stream():
+    """Stream the response as Server-Sent Events, one event per text delta."""
+    data = request.json
+    user_input = data.get('message', '')
+    
+    if not user_input.strip():
+        return jsonify({'error': 'Empty message'}), 400
+    
+    dialogue = get_dialogue()
+    
+    if not dialogue.topic:
+        return jsonify({'error': 'No topic selected'}), 400
+    
+    def generate():
+        try:
+            for delta in dialogue.respond_stream(user_input):
+                yield sse_event({'delta': delta})
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+            return
+        yield sse_event({
+            'message': dialogue.history[-1]['content'],
+            'usage': dialogue.last_usage
+        }, event='done')
+    
+    return sse_response(generate())
+
+
+@app.route('/api/admin/sessions')
+def api_admin_sessions():
+    """Live sessions, estimated bytes per session and eviction counts."""
+    return jsonify(dialogues.stats())
 
 
 @app.route('/api/reset', methods=['POST'])
@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""
+Socratic Dialogue Web Demo v3 - ASGI Edition
+Same routes as app_enhanced.py, served by Quart on the async engine so one
+worker holds an open socket, not a thread, per in-flight LLM call.
+
+Run with any ASGI server, e.g.:
+    hypercorn web.app_asgi:app --bind 127.0.0.1:5050
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quart import Quart, Response, render_template, request, jsonify, session
+from quart.utils import run_sync, run_sync_iterable
+from core.socrates import list_topics, list_security_topics, list_modes
+from core.admin import ADMIN_PREFIX, admin_denied
+from core.clients import pool_stats
+from core.session_store import SessionStore
+from core.dialogue_store import DialogueConflict, attach, get_dialogue_store, is_current
+from core.export import FORMATS, bulk_filename, dialogue_record, export_filename, gzip_jsonl, stored_records
+from core.opening_pool import get_opening_pool
+from core.response_cache import get_response_cache
+from core.scheduler import get_scheduler
+from core.budget import (
+    BudgetExceeded, TokenBudget, ROUTE_TOKEN_BUDGETS, SESSION_TOKEN_BUDGET,
+    active_budgets, budget_report, clamp_debate_turns, use_budgets,
+)
+from core.telemetry import current_trace, instrument_quart, start_trace
+# The async engine and the subsystems it wraps are imported by the session
+# getters below, on first use, to keep worker start-up fast
+import json
+import secrets
+
+app = Quart(__name__)
+# Set SECRET_KEY when running several workers, so they all accept the session cookie
+app.secret_key = os.environ.get('SECRET_KEY') or secrets.token_hex(16)
+instrument_quart(app)
+
+sessions = SessionStore(
+    max_sessions=int(os.environ.get("SESSION_MAX_COUNT", 1000)),
+    max_bytes=int(os.environ.get("SESSION_MAX_BYTES", 256 * 1024 * 1024)),
+    idle_ttl=float(os.environ.get("SESSION_IDLE_TTL", 3600)),
+    on_evict=lambda session_id, state, reason: app.logger.info(
+        "Evicted session %s (%s)", session_id[:6], reason)
+)
+
+
+def get_session_state():
+    """Per-session state dict from the bounded session store."""
+    session_id = session.get('id')
+    if not session_id:
+        session_id = secrets.token_hex(8)
+        session['id'] = session_id
+
+    return sessions.get_or_create(session_id, dict)
+
+
+async def get_dialogue():
+    state = get_session_state()
+    store = get_dialogue_store()
+    # The staleness check and the reload are SQLite reads: keep them off the event loop
+    if 'dialogue' in state and (store is None or await run_sync(is_current)(state['dialogue'].base_dialogue)):
+        return state['dialogue']
+
+    from core.async_engine import AsyncAdaptiveSocraticDialogue, AsyncSocraticDialogue
+
+    # New to this worker, or extended by another one since: load from the dialogue store
+    base_dialogue = AsyncSocraticDialogue()
+    if store is not None:
+        await run_sync(attach)(base_dialogue, session['id'], store)
+    state['dialogue'] = AsyncAdaptiveSocraticDialogue(base_dialogue)
+    state.pop('analyzer', None)
+    return state['dialogue']
+
+
+def get_analyzer():
+    state = get_session_state()
+    if 'analyzer' not in state:
+        from core.async_engine import AsyncIncrementalArgumentAnalyzer
+        state['analyzer'] = AsyncIncrementalArgumentAnalyzer()
+    return state['analyzer']
+
+
+def get_threat_interrogator():
+    state = get_session_state()
+    if 'threat_interrogator' not in state:
+        from core.async_engine import AsyncThreatInterrogator
+        state['threat_interrogator'] = AsyncThreatInterrogator()
+    return state['threat_interrogator']
+
+
+def get_debate_moderator():
+    state = get_session_state()
+    if 'debate_moderator' not in state:
+        from core.async_engine import AsyncDebateModerator
+        state['debate_moderator'] = AsyncDebateModerator()
+    return state['debate_moderator']
+
+
+def get_session_budget():
+    state = get_session_state()
+    if 'budget' not in state:
+        state['budget'] = TokenBudget(SESSION_TOKEN_BUDGET)
+    return state['budget']
+
+
+@app.before_request
+async def require_admin_token():
+    """Answer /api/admin/* only for requests carrying ADMIN_TOKEN."""
+    denied = admin_denied(request.path, request.headers)
+    if denied:
+        return jsonify(denied[0]), denied[1]
+    return None
+
+
+@app.before_request
+async def apply_token_budgets():
+    """Charge this request's API calls to the session's budget and the route's."""
+    use_budgets()
+    if request.path not in ROUTE_TOKEN_BUDGETS:
+        return None
+    if request.path.startswith(ADMIN_PREFIX):
+        # Admin runs are not part of anyone's dialogue: only the route's cap applies
+        use_budgets(TokenBudget(ROUTE_TOKEN_BUDGETS[request.path], name='route'))
+        return None
+    budget = get_session_budget()
+    if budget.remaining == 0:
+        return jsonify({'error': 'Token budget exhausted', 'budget': budget.to_dict()}), 429
+    use_budgets(budget, TokenBudget(ROUTE_TOKEN_BUDGETS[request.path], name='route'))
+    return None
+
+
+@app.errorhandler(BudgetExceeded)
+async def budget_exceeded(error):
+    return jsonify({'error': str(error), 'budget': budget_report(get_session_budget())}), 429
+
+
+@app.errorhandler(DialogueConflict)
+async def dialogue_conflict(error):
+    # Rebuild the adaptive state from the reloaded history on the next request
+    state = get_session_state()
+    state.pop('dialogue', None)
+    state.pop('analyzer', None)
+    return jsonify({'error': str(error)}), 409
+
+
+@app.after_request
+async def measure_session(response):
+    """Re-measure the session after each request so the byte cap stays accurate."""
+    session_id = session.get('id')
+    if session_id:
+        sessions.touch(session_id)
+        state = sessions.get(session_id)
+        if state and 'budget' in state:
+            response.headers['X-Token-Budget-Remaining'] = str(state['budget'].remaining)
+    return response
+
+
+def sse_event(data: dict, event: str = None) -> str:
+    """Format a Server-Sent Events message."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+def live_records():
+    """Export records of the dialogues held in memory."""
+    for session_id, state in sessions.items():
+        if 'dialogue' in state and state['dialogue'].base_dialogue.history:
+            yield dialogue_record(state['dialogue'].base_dialogue, session_id)
+
+
+def sse_response(events):
+    # The body is sent from another task, outside this request's context:
+    # carry its token budgets and trace ID over to the stream
+    budgets, trace_id = active_budgets(), current_trace()
+
+    async def in_request_context():
+        use_budgets(*budgets)
+        start_trace(trace_id)
+        async for event in events:
+            yield event
+
+    return in_request_context(), 200, {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+
+
+@app.route('/')
+async def index():
+    return await render_template('index_enhanced.html',
+                                 topics=list_topics(),
+                                 security_topics=list_security_topics(),
+                                 modes=list_modes())
+
+
+@app.route('/api/topics')
+async def api_topics():
+    return jsonify({
+        "topics": list_topics(),
+        "security_topics": list_security_topics(),
+        "modes": list_modes()
+    })
+
+
+@app.route('/api/start', methods=['POST'])
+async def api_start():
+    data = await request.get_json()
+    topic_key = data.get('topic', 'justice')
+    custom = data.get('custom')
+    mode = data.get('mode', 'socratic')
+    security = data.get('security', False)
+
+    dialogue = await get_dialogue()
+    dialogue.base_dialogue.set_mode(mode)
+    await dialogue.base_dialogue.set_topic(topic_key, custom, security=security)
+    pool = get_opening_pool()
+    # A persistent pool claims its opening with a SQLite write: keep it off the event loop
+    pooled = await run_sync(pool.take)(topic_key, dialogue.base_dialogue.mode, security) if pool else None
+    if pooled:
+        opening = await dialogue.base_dialogue.use_opening(pooled)
+    else:
+        opening = await dialogue.base_dialogue.get_opening()
+
+    mode_data = list_modes().get(mode, list_modes()["socratic"])
+
+    return jsonify({
+        'topic': dialogue.base_dialogue.topic,
+        'mode': mode_data['name'],
+        'security': security,
+        'message': opening,
+        'difficulty': dialogue.get_difficulty_info()
+    })
+
+
+@app.route('/api/respond', methods=['POST'])
+async def api_respond():
+    data = await request.get_json()
+    user_input = data.get('message', '')
+
+    if not user_input.strip():
+        return jsonify({'error': 'Empty message'}), 400
+
+    dialogue = await get_dialogue()
+
+    if not dialogue.base_dialogue.topic:
+        return jsonify({'error': 'No topic selected'}), 400
+
+    response = await dialogue.respond(user_input)
+
+    return jsonify({
+        'message': response,
+        'difficulty': dialogue.get_difficulty_info(),
+        'usage': dialogue.base_dialogue.last_usage,
+        'budget': budget_report(get_session_budget())
+    })
+
+
+@app.route('/api/respond/stream', methods=['POST'])
+async def api_respond_stream():
+    """Stream the adaptive response as Server-Sent Events, one event per text delta."""
+    data = await request.get_json()
+    user_input = data.get('message', '')
+
+    if not user_input.strip():
+        return jsonify({'error': 'Empty message'}), 400
+
+    dialogue = await get_dialogue()
+
+    if not dialogue.base_dialogue.topic:
+        return jsonify({'error': 'No topic selected'}), 400
+
+    budget = get_session_budget()
+
+    async def generate():
+        try:
+            async for delta in dialogue.respond_stream(user_input):
+                yield sse_event({'delta': delta})
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+            return
+        yield sse_event({
+            'message': dialogue.base_dialogue.history[-1]['content'],
+            'difficulty': dialogue.get_difficulty_info(),
+            'usage': dialogue.base_dialogue.last_usage,
+            'budget': budget_report(budget)
+        }, event='done')
+
+    return sse_response(generate())
+
+
+@app.route('/api/analyze', methods=['POST'])
+async def api_analyze():
+    """Analyze the current dialogue for argument structure."""
+    dialogue = await get_dialogue()
+    analyzer = get_analyzer()
+
+    if len(dialogue.base_dialogue.history) < 2:
+        return jsonify({'error': 'Not enough dialogue to analyze'}), 400
+
+    analysis = await analyzer.analyze_dialogue(dialogue.base_dialogue.history)
+
+    # Generate argument graph
+    if 'error' not in analysis:
+        analysis['graph'] = analyzer.generate_argument_graph(analysis)
+
+    return jsonify(analysis)
+
+
+@app.route('/api/analyze/stream', methods=['POST'])
+async def api_analyze_stream():
+    """Stream the analysis as Server-Sent Events: partial results, then the full analysis."""
+    dialogue = await get_dialogue()
+    analyzer = get_analyzer()
+
+    if len(dialogue.base_dialogue.history) < 2:
+        return jsonify({'error': 'Not enough dialogue to analyze'}), 400
+
+    async def generate():
+        async for kind, analysis in analyzer.analyze_dialogue_stream(dialogue.base_dialogue.history):
+            if kind == 'partial':
+                yield sse_event(analysis, event='partial')
+                continue
+            if 'error' not in analysis:
+                analysis['graph'] = analyzer.generate_argument_graph(analysis)
+            yield sse_event(analysis, event='done')
+
+    return sse_response(generate())
+
+
+@app.route('/api/threat/analyze', methods=['POST'])
+async def api_threat_analyze():
+    """Analyze a threat model using Socratic questioning."""
+    data = await request.get_json()
+    threat_description = data.get('description', '')
+
+    if not threat_description.strip():
+        return jsonify({'error': 'Empty threat description'}), 400
+
+    interrogator = get_threat_interrogator()
+    analysis = await interrogator.analyze_threat_model(threat_description)
+
+    return jsonify(analysis)
+
+
+@app.route('/api/threat/analyze/stream', methods=['POST'])
+async def api_threat_analyze_stream():
+    """Stream a threat model analysis: assumptions and gaps as they complete, then the result."""
+    data = await request.get_json()
+    threat_description = data.get('description', '')
+
+    if not threat_description.strip():
+        return jsonify({'error': 'Empty threat description'}), 400
+
+    interrogator = get_threat_interrogator()
+
+    async def generate():
+        async for kind, analysis in interrogator.analyze_threat_model_stream(threat_description):
+            yield sse_event(analysis, event='partial' if kind == 'partial' else 'done')
+
+    return sse_response(generate())
+
+
+@app.route('/api/threat/control', methods=['POST'])
+async def api_threat_control():
+    """Interrogate a specific security control."""
+    data = await request.get_json()
+    control = data.get('control', '')
+    context = data.get('context', '')
+
+    if not control.strip():
+        return jsonify({'error': 'Empty control description'}), 400
+
+    interrogator = get_threat_interrogator()
+    analysis = await interrogator.interrogate_control(control, context)
+
+    return jsonify(analysis)
+
+
+@app.route('/api/threat/challenge', methods=['POST'])
+async def api_threat_challenge():
+    """Challenge security assumptions."""
+    data = await request.get_json()
+    claim = data.get('claim', '')
+
+    if not claim.strip():
+        return jsonify({'error': 'Empty claim'}), 400
+
+    interrogator = get_threat_interrogator()
+    questions = await interrogator.challenge_assumptions(claim)
+
+    return jsonify({'questions': questions})
+
+
+def setup_debate(data: dict):
+    """The session's moderator, set up from a request body, and the turns to run; raises ValueError."""
+    turns = clamp_debate_turns(data.get('turns', 6))
+    moderator = get_debate_moderator()
+    moderator.setup_debate(
+        data.get('topic', 'What is justice?'),
+        data.get('mode_a', 'socratic'),
+        data.get('mode_b', 'nietzschean'),
+        data.get('position_a', 'Justice is objective'),
+        data.get('position_b', 'Justice is power'),
+    )
+    return moderator, turns
+
+
+@app.route('/api/debate/start', methods=['POST'])
+async def api_debate_start():
+    """Start an AI vs AI debate."""
+    data = await request.get_json()
+    try:
+        moderator, turns = setup_debate(data)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'turns must be a number'}), 400
+
+    debate_log = await moderator.run_debate(turns=turns)
+    judgment = await moderator.judge_debate()
+
+    return jsonify({
+        'debate': debate_log,
+        'judgment': judgment,
+        'topic': moderator.topic
+    })
+
+
+@app.route('/api/debate/stream', methods=['POST'])
+async def api_debate_stream():
+    """
+    Stream an AI vs AI debate as Server-Sent Events: `token` events as each
+    turn is written, a `turn` event as each completes, then the judgment as
+    `done`, or an `error` event if a turn fails.
+    """
+    data = await request.get_json()
+    try:
+        moderator, turns = setup_debate(data)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'turns must be a number'}), 400
+
+    budget = get_session_budget()
+
+    async def generate():
+        try:
+            async for kind, event in moderator.run_debate_stream(turns=turns):
+                yield sse_event(event, event=kind)
+        except Exception as e:
+            # The failed turn is not part of the debate, and there is nothing to judge
+            yield sse_event({'error': str(e), 'turn': len(moderator.debate_history) + 1}, event='error')
+            return
+        yield sse_event({
+            'judgment': await moderator.judge_debate(),
+            'topic': moderator.topic,
+            'budget': budget_report(budget)
+        }, event='done')
+
+    return sse_response(generate())
+
+
+@app.route('/api/export', methods=['POST'])
+async def api_export():
+    """Stream the dialogue as text, Markdown or JSONL (`format` in the query or body)."""
+    dialogue = await get_dialogue()
+    fmt = request.args.get('format') or (await request.get_json(silent=True) or {}).get('format', 'text')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(FORMATS)}"}), 400
+
+    if not dialogue.base_dialogue.history:
+        return jsonify({'error': 'No dialogue to export'}), 400
+
+    record = dialogue_record(dialogue.base_dialogue, session['id'])
+    exporter, content_type, _ = FORMATS[fmt]
+    return Response(exporter(record), content_type=content_type, headers={
+        'Content-Disposition': f'attachment; filename="{export_filename(record, fmt)}"'
+    })
+
+
+@app.route('/api/budget')
+async def api_budget():
+    """Tokens this session has used and has left."""
+    return jsonify(get_session_budget().to_dict())
+
+
+@app.route('/api/admin/pool')
+async def api_admin_pool():
+    """Shared client and connection reuse counters."""
+    return jsonify(pool_stats())
+
+
+@app.route('/api/admin/scheduler')
+async def api_admin_scheduler():
+    """Outbound request queue depth, waits and throttling per priority class."""
+    return jsonify(get_scheduler().stats())
+
+
+@app.route('/api/admin/sessions')
+async def api_admin_sessions():
+    """Live sessions, estimated bytes per session and eviction counts."""
+    return jsonify(sessions.stats())
+
+
+@app.route('/api/admin/openings')
+async def api_admin_openings():
+    """Pre-generated opening questions: ready, hit rate and refills."""
+    pool = get_opening_pool()
+    return jsonify(pool.stats() if pool else {'enabled': False})
+
+
+@app.route('/api/admin/store')
+async def api_admin_store():
+    """The shared dialogue store: sessions, turns and file size."""
+    store = get_dialogue_store()
+    return jsonify(store.stats() if store else {'enabled': False})
+
+
+@app.route('/api/admin/export')
+async def api_admin_export():
+    """
+    Every dialogue as one gzip-compressed JSONL file, streamed: all stored
+    sessions (or those active after `since`, a Unix time), or the live ones
+    when there is no dialogue store.
+    """
+    store = get_dialogue_store()
+    records = stored_records(store, request.args.get('since', type=float)) if store else live_records()
+    # Store reads and compression run on worker threads, off the event loop
+    return Response(run_sync_iterable(gzip_jsonl(records)), content_type='application/gzip', headers={
+        'Content-Disposition': f'attachment; filename="{bulk_filename()}"'
+    })
+
+
+@app.route('/api/admin/analysis', methods=['POST'])
+async def api_admin_analysis():
+    """
+    Argument quality and difficulty across all sessions, as Server-Sent
+    Events: a `session` event with the running totals as each session is
+    analyzed (or found unchanged since its last analysis), then `done`.
+    Body: workers (default 4), since (Unix time), force to redo all.
+    One run at a time (409 otherwise), within the route's token budget.
+    """
+    from core.session_analysis import (
+        MAX_WORKERS, AnalysisRunning, AnalysisTotals, SessionAnalyzer, get_analysis_ledger,
+    )
+
+    data = (await request.get_json(silent=True)) or {}
+    try:
+        workers = max(1, min(int(data.get('workers', 4)), MAX_WORKERS))
+        since = float(data['since']) if data.get('since') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'workers and since must be numbers'}), 400
+    ledger = get_analysis_ledger()
+    if await run_sync(ledger.run_active)():
+        return jsonify({'error': 'An analysis run is already in progress'}), 409
+    analyzer = SessionAnalyzer(get_dialogue_store(), ledger, workers=workers)
+    force = bool(data.get('force'))
+
+    def generate():
+        totals = AnalysisTotals().to_dict()
+        try:
+            for update in analyzer.run(live_records(), since=since, force=force):
+                totals = update['totals']
+                yield sse_event(update, event='session')
+        except AnalysisRunning as e:
+            # Another run started between the check above and this one
+            yield sse_event({'error': str(e)}, event='error')
+            return
+        yield sse_event(totals, event='done')
+
+    # The fan-out blocks on its workers, so it is driven from a thread
+    return sse_response(run_sync_iterable(generate()))
+
+
+@app.route('/api/admin/cache')
+async def api_admin_cache():
+    """Analyzer response cache hit/miss counters."""
+    return jsonify(get_response_cache().stats())
+
+
+@app.route('/api/reset', methods=['POST'])
+async def api_reset():
+    dialogue = await get_dialogue()
+    await dialogue.base_dialogue.reset()
+    dialogue.current_level = "beginner"
+    dialogue.difficulty_score = 30
+    return jsonify({'status': 'ok'})
+
+
+if __name__ == '__main__':
+    if not os.environ.get("ANTHROPIC_API_KEY"):
+        print("⚠️  ANTHROPIC_API_KEY not set.")
+        sys.exit(1)
+
+    print("\n🏛️  Socratic Dialogue Web Demo v3 - ASGI Edition")
+    print("   Open http://localhost:5050 in your browser\n")
+    app.run(port=5050)